@@ -1,13 +1,1539 @@
 
 from presidio_analyzer import AnalyzerEngine, PatternRecognizer, Pattern, RecognizerResult
+from presidio_analyzer.nlp_engine import NlpArtifacts, NlpEngine, SpacyNlpEngine
 from presidio_anonymizer import AnonymizerEngine
-from presidio_anonymizer.entities import OperatorConfig
-from langdetect import detect
 import re
 import warnings
 import logging
 import unicodedata
 import math
+import time
+import threading
+import asyncio
+import weakref
+import bisect
+import itertools
+import hashlib
+import os
+import json
+import copy
+from collections import Counter, OrderedDict, deque
+from collections.abc import Mapping
+from functools import cached_property
+from types import MappingProxyType
+
+try:
+    from re import _constants as _sre_constants, _parser as _sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants as _sre_constants
+    import sre_parse as _sre_parse
+
+
+class PatternOnlyNlpEngine(NlpEngine):
+    """
+    Presidio NLP engine that never loads or runs spaCy.
+
+    Every call returns empty NlpArtifacts (no tokens, lemmas or NER entities), so the
+    analyzer only pays for the pattern recognizers. Used by PIIFilter(nlp_engine="pattern").
+    """
+
+    def __init__(self, supported_languages=("en",)):
+        self.supported_languages = list(supported_languages)
+
+    def load(self) -> None:
+        pass
+
+    def is_loaded(self) -> bool:
+        return True
+
+    def process_text(self, text: str, language: str) -> NlpArtifacts:
+        return NlpArtifacts(entities=[], tokens=[], tokens_indices=[], lemmas=[], nlp_engine=self, language=language)
+
+    def process_batch(self, texts, language: str, batch_size: int = 1, n_process: int = 1, **kwargs):
+        for text in texts:
+            yield text, self.process_text(text, language)
+
+    def is_stopword(self, word: str, language: str) -> bool:
+        return False
+
+    def is_punct(self, word: str, language: str) -> bool:
+        return False
+
+    def get_supported_entities(self):
+        return []
+
+    def get_supported_languages(self):
+        return list(self.supported_languages)
+
+
+# ====================
+# Lazy, process-wide spaCy model sharing
+# ====================
+# One spaCy pipeline per (model_name, excluded components) per process. Every PIIFilter /
+# LazySpacyNlpEngine in the process reuses it, so N filters cost one model load, not N.
+_SPACY_MODEL_CACHE = {}
+_SPACY_MODEL_LOCK = threading.Lock()
+
+
+def load_shared_spacy_model(model_name, exclude=()):
+    """Load (once per process) and return the spaCy pipeline for ``model_name``."""
+    key = (model_name, tuple(sorted(exclude)))
+    nlp = _SPACY_MODEL_CACHE.get(key)
+    if nlp is None:
+        with _SPACY_MODEL_LOCK:
+            nlp = _SPACY_MODEL_CACHE.get(key)
+            if nlp is None:
+                import spacy
+                SpacyNlpEngine._download_spacy_model_if_needed(model_name)
+                nlp = spacy.load(model_name, exclude=list(key[1]))
+                _SPACY_MODEL_CACHE[key] = nlp
+    return nlp
+
+
+class _LazySpacyModels(Mapping):
+    """lang_code -> spaCy pipeline mapping that loads each model on first lookup."""
+
+    def __init__(self, model_names, exclude=()):
+        self._model_names = dict(model_names)
+        self._exclude = tuple(exclude)
+        self._loaded = {}
+
+    def __getitem__(self, lang):
+        nlp = self._loaded.get(lang)
+        if nlp is None:
+            nlp = load_shared_spacy_model(self._model_names[lang], self._exclude)
+            self._loaded[lang] = nlp
+        return nlp
+
+    def __iter__(self):
+        return iter(self._model_names)
+
+    def __len__(self):
+        return len(self._model_names)
+
+    def loaded_languages(self):
+        return [lang for lang in self._model_names if lang in self._loaded]
+
+
+class LazySpacyNlpEngine(SpacyNlpEngine):
+    """
+    SpacyNlpEngine that defers model loading until a text in that language is processed.
+
+    ``models`` maps language codes to spaCy model names; pipelines come from the process-wide
+    cache (see load_shared_spacy_model), minus the ``exclude``d components.
+    """
+
+    def __init__(self, models, exclude=(), ner_model_configuration=None):
+        super().__init__(
+            models=[{"lang_code": lang, "model_name": name} for lang, name in models.items()],
+            ner_model_configuration=ner_model_configuration,
+        )
+        self.exclude = tuple(exclude)
+
+    def load(self) -> None:
+        self.nlp = _LazySpacyModels(
+            {m["lang_code"]: m["model_name"] for m in self.models}, self.exclude
+        )
+
+    def loaded_languages(self):
+        return self.nlp.loaded_languages() if self.nlp else []
+
+
+# ====================
+# Language routing (picks the spaCy model per text)
+# ====================
+class LanguageRouter:
+    """
+    Cheap, deterministic language guess for routing a text to a spaCy model.
+
+    Looks only at the first ``sample_chars`` characters: a non-Latin script that outweighs Latin
+    letters wins outright, otherwise the language with the most stop-word hits. Guesses are
+    cached per sample (LRU, ``cache_size`` entries), so repeated texts in a session are free.
+    Subclass and override ``_classify`` to plug in another detector.
+    """
+
+    STOPWORDS = {
+        "en": frozenset("the and is are was were of to in my your with for this that have has not you it on at be from please".split()),
+        "de": frozenset("der die das und ist nicht ich mein meine bin wohne mit ein eine den dem des zu von auf für sie wir auch sind im bitte".split()),
+        "es": frozenset("el la los las y es que en mi me llamo con por para una del soy vivo está son no su se".split()),
+        "fr": frozenset("le la les et est je mon ma mes des du une pour avec dans que pas suis sont vous nous il elle au aux sur".split()),
+        "it": frozenset("il lo gli e è di che mi chiamo sono mio mia con per una della del non nel abito vivo".split()),
+        "nl": frozenset("de het een en is van ik mijn niet met voor op zijn wij heet woon dat te".split()),
+        "pt": frozenset("o os as e é do da dos das não meu minha com para uma em sou chamo moro".split()),
+        "tr": frozenset("ve bir bu da de için ile benim adım ben değil çok olarak".split()),
+    }
+    # Non-Latin scripts -> language; checked against the Latin letter count of the sample
+    SCRIPTS = (
+        (re.compile(r"[\u0600-\u06FF]"), "ar"),
+        (re.compile(r"[\u0590-\u05FF]"), "he"),
+        (re.compile(r"[\u0400-\u04FF]"), "ru"),
+        (re.compile(r"[\u0370-\u03FF]"), "el"),
+        (re.compile(r"[\uAC00-\uD7AF]"), "ko"),
+        (re.compile(r"[\u3040-\u30FF]"), "ja"),
+        (re.compile(r"[\u4E00-\u9FFF]"), "zh"),
+    )
+    # Tie-breaker when no stop word matched: letters typical of one language
+    LETTER_HINTS = (
+        (re.compile(r"[äöüß]", re.I), "de"),
+        (re.compile(r"[ñ¿¡]", re.I), "es"),
+        (re.compile(r"[çœêèàù]", re.I), "fr"),
+        (re.compile(r"[ğışİ]"), "tr"),
+    )
+    LATIN_RX = re.compile(r"[A-Za-zÀ-ɏ]")
+    WORD_RX = re.compile(r"[^\W\d_]+")
+
+    def __init__(self, cache_size=1024, sample_chars=2000):
+        self.cache_size = cache_size
+        self.sample_chars = sample_chars
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Locks don't pickle (batch workers get a copy); the cache starts empty there anyway
+        state = dict(self.__dict__)
+        state["_cache"], state["_lock"] = OrderedDict(), None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def detect(self, text):
+        """Best-guess language code for ``text``, or None if there is nothing to go on."""
+        sample = text[:self.sample_chars]
+        with self._lock:
+            if sample in self._cache:
+                self._cache.move_to_end(sample)
+                return self._cache[sample]
+        lang = self._classify(sample)
+        if self.cache_size:
+            with self._lock:
+                self._cache[sample] = lang
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return lang
+
+    def route(self, text, supported, default="en"):
+        """Language to analyze ``text`` with: the detected one if ``supported``, else ``default``."""
+        lang = self.detect(text)
+        return lang if lang in supported else default
+
+    def _classify(self, sample):
+        latin = len(self.LATIN_RX.findall(sample))
+        best, best_n = None, latin
+        for rx, lang in self.SCRIPTS:
+            n = len(rx.findall(sample))
+            if n > best_n:
+                best, best_n = lang, n
+        if best is not None:
+            return best
+        hits = dict.fromkeys(self.STOPWORDS, 0)
+        for w in self.WORD_RX.findall(sample.lower()):
+            for lang, words in self.STOPWORDS.items():
+                if w in words:
+                    hits[lang] += 1
+        lang = max(hits, key=hits.get)  # ties -> earlier entry in STOPWORDS
+        if hits[lang]:
+            return lang
+        for rx, lang in self.LETTER_HINTS:
+            if rx.search(sample):
+                return lang
+        return None
+
+
+class LangdetectRouter(LanguageRouter):
+    """The old routing via langdetect, seeded so it is deterministic. Much slower than LanguageRouter."""
+
+    def __init__(self, cache_size=1024, sample_chars=2000, seed=0):
+        super().__init__(cache_size, sample_chars)
+        from langdetect import DetectorFactory
+        DetectorFactory.seed = seed  # langdetect reads this class attribute for every Detector
+
+    def _classify(self, sample):
+        from langdetect import detect
+        try:
+            return detect(sample)
+        except Exception:
+            return None
+
+
+# ====================
+# Batch workers (see PIIFilter.anonymize_batch)
+# ====================
+# Each pool process builds one PIIFilter in its initializer and keeps it warm for every chunk.
+_BATCH_FILTER = None
+
+
+def _init_batch_worker(init_kwargs):
+    global _BATCH_FILTER
+    _BATCH_FILTER = PIIFilter(**init_kwargs)
+
+
+def _anonymize_chunk(texts, call_kwargs, pf=None):
+    """Anonymize a chunk; per item ``(True, text)`` or ``(False, exception)`` so one bad item can't sink the chunk."""
+    pf = pf or _BATCH_FILTER
+    out = []
+    for text in texts:
+        try:
+            out.append((True, pf.anonymize_text(text, **call_kwargs)))
+        except Exception as exc:
+            out.append((False, exc))
+    return out
+
+
+# ====================
+# Pipeline instrumentation (see PIIFilter.analyze_text(stats=...))
+# ====================
+class PipelineStats:
+    """
+    Opt-in per-stage timings for analyze_text / anonymize_text / the other entry points (``stats=``).
+
+    Accumulates per (language, stage): calls, wall seconds, spans in/out and spans dropped/added
+    (by identity, so a span a stage rewrites counts as one dropped plus one added). Reuse one
+    instance to aggregate over many calls; override ``record`` to forward samples to a metrics system.
+    """
+
+    FIELDS = ("calls", "seconds", "spans_in", "spans_out", "dropped", "added")
+
+    def __init__(self):
+        self.stages = {}  # (language, stage) -> {field: total}, in pipeline order
+        self.last_language = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Process-pool workers get a copy (their samples stay in the worker)
+        state = dict(self.__dict__)
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, spans_in, spans_out, dropped, added, language=None):
+        with self._lock:
+            row = self.stages.get((language, stage))
+            if row is None:
+                row = self.stages[(language, stage)] = dict.fromkeys(self.FIELDS, 0)
+            row["calls"] += 1
+            row["seconds"] += seconds
+            row["spans_in"] += spans_in
+            row["spans_out"] += spans_out
+            row["dropped"] += dropped
+            row["added"] += added
+
+    def report(self):
+        """Plain-text table, slowest stage first."""
+        rows = sorted(self.stages.items(), key=lambda kv: -kv[1]["seconds"])
+        lines = [f"{'lang':<5} {'stage':<45} {'calls':>7} {'ms':>10} {'in':>8} {'out':>8} {'dropped':>8} {'added':>8}"]
+        for (lang, stage), r in rows:
+            lines.append(f"{lang or '-':<5} {stage:<45} {r['calls']:>7} {r['seconds'] * 1000:>10.2f} "
+                         f"{r['spans_in']:>8} {r['spans_out']:>8} {r['dropped']:>8} {r['added']:>8}")
+        return "\n".join(lines)
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+
+
+class _StageClock:
+    """Times consecutive pipeline stages; each lap() closes the stage that just ran."""
+
+    __slots__ = ("stats", "prev", "language", "t")
+
+    def __init__(self, stats):
+        self.stats, self.prev, self.language = stats, (), None
+        self.t = time.perf_counter()
+
+    def lap(self, stage, items, language=None):
+        elapsed = time.perf_counter() - self.t
+        if language is not None:
+            self.language = self.stats.last_language = language
+        before, after = {id(r) for r in self.prev}, {id(r) for r in items}
+        self.stats.record(stage, elapsed, len(self.prev), len(items), len(before - after),
+                          len(after - before), language=self.language)
+        self.prev = items
+        self.t = time.perf_counter()  # keep our own bookkeeping out of the next stage
+
+
+class _ProfiledPattern:
+    """re.Pattern proxy that charges every scan to one PatternProfiler row."""
+
+    __slots__ = ("_rx", "_name", "_profiler")
+
+    def __init__(self, rx, name, profiler):
+        self._rx, self._name, self._profiler = rx, name, profiler
+
+    def __getattr__(self, name):
+        return getattr(self._rx, name)
+
+    def __repr__(self):
+        return f"_ProfiledPattern({self._name!r})"
+
+    def _one(self, method, string, args):
+        t0 = time.perf_counter()
+        m = getattr(self._rx, method)(string, *args)
+        self._profiler._charge(self._name, time.perf_counter() - t0, string, () if m is None else (m.span(),))
+        return m
+
+    def search(self, string, *args):
+        return self._one("search", string, args)
+
+    def match(self, string, *args):
+        return self._one("match", string, args)
+
+    def fullmatch(self, string, *args):
+        return self._one("fullmatch", string, args)
+
+    def finditer(self, string, *args):
+        it = self._rx.finditer(string, *args)
+        charge, calls = self._profiler._charge, True
+        while True:
+            # Only time spent inside the regex engine counts, not the caller's loop body
+            t0 = time.perf_counter()
+            m = next(it, None)
+            charge(self._name, time.perf_counter() - t0, string, () if m is None else (m.span(),), calls=calls)
+            calls = False
+            if m is None:
+                return
+            yield m
+
+    def _bulk(self, method, string, args, count):
+        t0 = time.perf_counter()
+        out = getattr(self._rx, method)(string, *args)
+        self._profiler._charge(self._name, time.perf_counter() - t0, None, (), matches=count(out))
+        return out
+
+    def findall(self, string, *args):
+        return self._bulk("findall", string, args, len)
+
+    def split(self, string, *args):
+        return self._bulk("split", string, args, lambda parts: len(parts) - 1)
+
+    def sub(self, repl, string, *args):
+        return self._bulk("sub", repl, (string, *args), lambda out: 0)
+
+    def subn(self, repl, string, *args):
+        return self._bulk("subn", repl, (string, *args), lambda out: out[1])
+
+
+class PatternProfiler:
+    """
+    Per-pattern cost accounting for the regex bank (a tuning aid; not thread-safe).
+
+    Builds its own PIIFilter in which every compiled pattern of the shared bank (also the ones
+    inside tuples/mappings, named like ``IP_RXS[1]`` or ``POSTAL_EU_RXS[GB]``)
+    and every registry recognizer (``recognizer:<name>[<entities>]@<language>``) is wrapped. Per row it accumulates calls,
+    scan seconds, matches produced and matches that survived, i.e. nest with (contain or lie
+    inside) a span of the final output. Only scans of the analyzed text itself can survive; scans of
+    windows and lower-cased copies count as matches only.
+
+    Not covered: the inline ``re.search``/``re.match``/``re.sub`` calls that only test a candidate
+    span or a few characters around it (e.g. ``re.search(r"\\d", span)``); every scan of the full
+    text goes through the bank.
+    """
+
+    FIELDS = ("calls", "seconds", "matches", "survived")
+
+    def __init__(self, **filter_kwargs):
+        self.rows = {}  # name -> {field: total}, in wrapping order
+        self._text, self._spans = None, {}
+        snap = filter_kwargs.get("snapshot")
+        bank = dict(PIIFilter.shared_pattern_bank(load_snapshot(snap) if snap else None))
+        bank.update(filter_kwargs.pop("pattern_overrides", None) or {})
+        overrides = {}
+        for name, value in bank.items():
+            wrapped = self._wrap(name, value)
+            if wrapped is not value:
+                overrides[name] = wrapped
+        self.filter = PIIFilter(pattern_overrides=overrides, **filter_kwargs)
+        for rec in self.filter.analyzer.registry.recognizers:
+            rec.analyze = self._wrap_recognizer(rec)
+
+    def _row(self, name):
+        base, n = name, 1
+        while name in self.rows:
+            n += 1
+            name = f"{base}#{n}"
+        self.rows[name] = dict.fromkeys(self.FIELDS, 0)
+        return name
+
+    def _wrap(self, name, value):
+        return _map_patterns(name, value, lambda path, rx: _ProfiledPattern(rx, self._row(path), self))
+
+    def _wrap_recognizer(self, rec):
+        entities = "/".join(rec.supported_entities)
+        name, analyze = self._row(f"recognizer:{rec.name}[{entities}]@{rec.supported_language}"), rec.analyze
+
+        def profiled_analyze(*args, **kwargs):
+            text = kwargs["text"] if "text" in kwargs else args[0]
+            t0 = time.perf_counter()
+            results = analyze(*args, **kwargs)
+            self._charge(name, time.perf_counter() - t0, text, [(r.start, r.end) for r in results or ()])
+            return results
+
+        return profiled_analyze
+
+    def _charge(self, name, seconds, string, spans, matches=None, calls=True):
+        row = self.rows[name]
+        row["calls"] += calls
+        row["seconds"] += seconds
+        row["matches"] += len(spans) if matches is None else matches
+        if spans and string is not None and (string is self._text or string == self._text):
+            self._spans.setdefault(name, []).extend(spans)
+
+    def _settle(self, final):
+        starts = [r.start for r in final]
+        reach, top = [], -1  # reach[i]: furthest end among final[:i + 1]
+        for r in final:
+            top = max(top, r.end)
+            reach.append(top)
+        for name, spans in self._spans.items():
+            survived = 0
+            for s, e in spans:
+                i = bisect.bisect_right(starts, s)
+                if i and reach[i - 1] >= e:  # inside a final span
+                    survived += 1
+                    continue
+                for r in final[bisect.bisect_left(starts, s):]:
+                    if r.start > e:
+                        break
+                    if r.end <= e:  # contains a final span
+                        survived += 1
+                        break
+            self.rows[name]["survived"] += survived
+        self._text, self._spans = None, {}
+
+    def analyze_text(self, text, **kwargs):
+        """PIIFilter.analyze_text on the profiled filter; survivors are judged against its result."""
+        self._text, self._spans = unicodedata.normalize("NFC", text), {}
+        final = []
+        try:
+            final = self.filter.analyze_text(text, **kwargs)
+        finally:
+            self._settle(final)
+        return final
+
+    def anonymize_text(self, text, *, mode="replace", **kwargs):
+        """PIIFilter.anonymize_text on the profiled filter (rendering itself is not charged)."""
+        if not text or not text.strip():
+            return text
+        text = unicodedata.normalize("NFC", text)
+        return self.filter._render(text, self.analyze_text(text, **kwargs), mode=mode)
+
+    def report(self, top=None):
+        """Plain-text table of the patterns that ran, most expensive first; ``top`` keeps the first N rows."""
+        rows = sorted((kv for kv in self.rows.items() if kv[1]["calls"]), key=lambda kv: (-kv[1]["seconds"], kv[0]))
+        lines = [f"{'pattern':<50} {'calls':>8} {'ms':>10} {'matches':>8} {'survived':>8}"]
+        for name, r in rows[:top]:
+            lines.append(f"{name:<50} {r['calls']:>8} {r['seconds'] * 1000:>10.2f} {r['matches']:>8} {r['survived']:>8}")
+        return "\n".join(lines)
+
+    def reset(self):
+        for row in self.rows.values():
+            row.update(dict.fromkeys(self.FIELDS, 0))
+
+
+# ====================
+# Async facade (see PIIFilter.anonymize_async)
+# ====================
+class _AsyncDispatcher:
+    """
+    Executor + per-event-loop semaphore + counters behind PIIFilter.anonymize_async.
+
+    A slot is held from submission until the executor job really finishes, so timed-out or
+    cancelled calls whose job is already running still count against ``max_in_flight``.
+    """
+
+    EXECUTORS = ("thread", "process")
+
+    def __init__(self, pf, executor="thread", max_workers=4, max_in_flight=None):
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"executor must be one of {self.EXECUTORS}, got {executor!r}")
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be >= 1, got {max_workers!r}")
+        self.pf = pf
+        self.kind = executor
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight or 2 * max_workers
+        self._executor = None
+        self._semaphores = weakref.WeakKeyDictionary()  # event loop -> asyncio.Semaphore
+        self.counts = dict.fromkeys(("waiting", "in_flight", "peak_in_flight", "completed",
+                                     "failed", "timed_out", "cancelled"), 0)
+
+    def executor(self):
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+            if self.kind == "thread":
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="pii-async")
+            else:
+                self._executor = ProcessPoolExecutor(
+                    self.max_workers, initializer=_init_batch_worker, initargs=(self.pf._init_kwargs,),
+                )
+        return self._executor
+
+    def semaphore(self, loop):
+        sem = self._semaphores.get(loop)
+        if sem is None:
+            sem = self._semaphores[loop] = asyncio.Semaphore(self.max_in_flight)
+        return sem
+
+    async def run(self, text, kwargs):
+        loop = asyncio.get_running_loop()
+        sem = self.semaphore(loop)
+        counts = self.counts
+        counts["waiting"] += 1
+        try:
+            await sem.acquire()
+        finally:
+            counts["waiting"] -= 1
+        counts["in_flight"] += 1
+        counts["peak_in_flight"] = max(counts["peak_in_flight"], counts["in_flight"])
+
+        def _release(_future):
+            counts["in_flight"] -= 1
+            sem.release()
+
+        try:
+            if self.kind == "thread":
+                cf = self.executor().submit(self.pf.anonymize_text, text, **kwargs)
+            else:
+                cf = self.executor().submit(_anonymize_chunk, [text], kwargs)
+        except BaseException:
+            _release(None)
+            raise
+        cf.add_done_callback(lambda f: loop.call_soon_threadsafe(_release, f) if not loop.is_closed() else None)
+        try:
+            out = await asyncio.wrap_future(cf)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            counts["failed"] += 1
+            raise
+        if self.kind == "process":
+            [(ok, out)] = out
+            if not ok:
+                counts["failed"] += 1
+                raise out
+        counts["completed"] += 1
+        return out
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+# ====================
+# Process-wide pattern bank (see PIIFilter.shared_pattern_bank)
+# ====================
+_PATTERN_BANK_LOCK = threading.Lock()
+
+
+def _freeze_pattern_value(value):
+    # Lists/sets/dicts become tuple/frozenset/read-only mapping so no instance can mutate the shared copy
+    if isinstance(value, list):
+        return tuple(value)
+    if isinstance(value, set):
+        return frozenset(value)
+    if isinstance(value, dict):
+        return MappingProxyType(value)
+    return value
+
+
+def _postal_run_lengths(code):
+    """
+    Possible lengths of the first digit run a POSTAL_EU_FORMATS code regex can match
+    (e.g. r"(\\d{3}\\s?\\d{2})" -> {3, 5}); None if the code uses syntax not understood here.
+    """
+    lengths, n = set(), 0
+    for tok in re.findall(r"\\d\{\d+\}|\\d|\\s\?|\(\?:MD-\)\?|.", code):
+        if tok in ("(", ")", "(?:MD-)?"):
+            continue
+        if tok.startswith("\\d{"):
+            n += int(tok[3:-1])
+        elif tok == "\\d" or tok.isdigit():
+            n += 1
+        elif tok == "\\s?":
+            lengths.add(n)
+        elif tok in ("-", "["):
+            break
+        else:
+            return None
+    lengths.add(n)
+    return lengths
+
+
+# Gap between two same-type spans that Presidio merges when rendering: its r"^( )+$" check,
+# i.e. spaces plus at most one trailing newline ($ also matches before a final "\n")
+_SPACES_ONLY_RX = re.compile(r"( )+\n?\Z")
+
+# Presidio's EmailRecognizer regex with the local part capped at RFC 5321's 64 chars. Its original
+# "{0,}" made every start inside a long '@'-less run rescan the run (quadratic in the run length).
+_EMAIL_RECOGNIZER_REGEX = (
+    r"\b((([!#$%&'*+\-/=?^_`{|}~\w])|([!#$%&'*+\-/=?^_`{|}~\w][!#$%&'*+\-/=?^_`{|}~\.\w]{0,62}"
+    r"[!#$%&'*+\-/=?^_`{|}~\w]))[@]\w+([-.]\w+)*\.\w+([-.]\w+)*)\b"
+)
+
+
+def _map_patterns(name, value, fn, proxies=False):
+    """
+    Bank value with every compiled pattern replaced by fn(path, pattern), recursing into tuples and
+    mappings; ``value`` itself when nothing changed. Paths name the pattern inside its bank entry:
+    ``IP_RXS[1]`` by index, ``POSTAL_CODE_RXS_BY_LEN[5]`` by key, ``POSTAL_EU_RXS[GB]`` by the label
+    of an (rx, "label") style row. proxies=True also counts profiled/budgeted wrappers as patterns.
+    """
+    if _is_pattern(value, proxies):
+        return fn(name, value)
+    if isinstance(value, Mapping):
+        items = {k: _map_patterns(f"{name}[{k}]", v, fn, proxies) for k, v in value.items()}
+        return MappingProxyType(items) if any(items[k] is not v for k, v in value.items()) else value
+    if isinstance(value, tuple):
+        label = _row_label(value, proxies)
+        if label is not None:
+            out = tuple(v if isinstance(v, str) else _map_patterns(f"{name}[{label}]", v, fn, proxies) for v in value)
+        else:
+            out = tuple(_map_patterns(name if _row_label(v, proxies) else f"{name}[{i}]", v, fn, proxies)
+                        for i, v in enumerate(value))
+        return out if any(a is not b for a, b in zip(out, value)) else value
+    return value
+
+
+def _is_pattern(value, proxies=False):
+    return isinstance(value, (re.Pattern, _LazyPattern)) or proxies and isinstance(value, (_ProfiledPattern, _BudgetedPattern))
+
+
+def _row_label(value, proxies=False):
+    # (rx, "label") style rows such as ID_RXS or POSTAL_EU_RXS -> "label"
+    if isinstance(value, tuple) and sum(_is_pattern(v, proxies) for v in value) == 1:
+        return next((v for v in value if isinstance(v, str)), None)
+    return None
+
+
+# ====================
+# "regex" execution engine with per-pattern time budgets (see PIIFilter(regex_engine="regex"))
+# ====================
+# One regex-package compile per (pattern, flags) per process, shared by every filter using the engine
+_REGEX_CACHE = {}
+_REGEX_LOCK = threading.Lock()
+_REGEX_FLAG_NAMES = ("IGNORECASE", "MULTILINE", "DOTALL", "UNICODE", "VERBOSE", "ASCII")
+_log = logging.getLogger(__name__)
+
+
+def _compile_regex(rx):
+    """regex-package (V0, i.e. re-compatible) compile of the re.Pattern / _LazyPattern ``rx``."""
+    key = (rx.pattern, int(rx.flags))
+    compiled = _REGEX_CACHE.get(key)
+    if compiled is None:
+        with _REGEX_LOCK:
+            compiled = _REGEX_CACHE.get(key)
+            if compiled is None:
+                import regex
+                flags = regex.V0
+                for flag in _REGEX_FLAG_NAMES:
+                    if rx.flags & getattr(re, flag):
+                        flags |= getattr(regex, flag)
+                compiled = _REGEX_CACHE[key] = regex.compile(rx.pattern, flags)
+    return compiled
+
+
+class _BudgetedPattern:
+    """
+    regex-package pattern whose every scan gets ``timeout`` seconds. An overrun is reported through
+    ``on_overrun(name, text)`` and degrades to "no (further) match" instead of stalling the caller.
+    """
+
+    __slots__ = ("_rx", "_name", "_timeout", "_on_overrun")
+
+    def __init__(self, rx, name, timeout, on_overrun):
+        self._rx, self._name, self._timeout, self._on_overrun = rx, name, timeout, on_overrun
+
+    def __getattr__(self, name):
+        return getattr(self._rx, name)
+
+    def __repr__(self):
+        return f"_BudgetedPattern({self._name!r}, timeout={self._timeout})"
+
+    def _run(self, method, string, args, fallback):
+        try:
+            return getattr(self._rx, method)(*args, timeout=self._timeout)
+        except TimeoutError:
+            self._on_overrun(self._name, string)
+            return fallback
+
+    def search(self, string, *args):
+        return self._run("search", string, (string, *args), None)
+
+    def match(self, string, *args):
+        return self._run("match", string, (string, *args), None)
+
+    def fullmatch(self, string, *args):
+        return self._run("fullmatch", string, (string, *args), None)
+
+    def finditer(self, string, *args):
+        try:
+            yield from self._rx.finditer(string, *args, timeout=self._timeout)
+        except TimeoutError:
+            self._on_overrun(self._name, string)  # matches already yielded stand
+
+    def findall(self, string, *args):
+        return self._run("findall", string, (string, *args), [])
+
+    def split(self, string, *args):
+        return self._run("split", string, (string, *args), [string])
+
+    def sub(self, repl, string, *args):
+        return self._run("sub", string, (repl, string, *args), string)
+
+    def subn(self, repl, string, *args):
+        return self._run("subn", string, (repl, string, *args), (string, 0))
+
+
+# ====================
+# Span index for injected candidates (see PIIFilter._inject_custom_matches)
+# ====================
+class _IndexedResults(list):
+    """
+    List of RecognizerResult that also indexes spans per entity type (starts kept sorted, bisect),
+    so "does [s, e) overlap an injected X" costs O(log n + hits) instead of a scan of the list.
+
+    Only append/extend/remove may mutate it; filter by building a new _IndexedResults.
+    """
+
+    def __init__(self, items=()):
+        super().__init__()
+        self._seq = itertools.count()
+        self._seq_of = {}
+        self._by_type = {}  # entity_type -> [keys [(start, seq)], results, longest span]
+        self.extend(items)
+
+    def append(self, r):
+        super().append(r)
+        seq = self._seq_of[id(r)] = next(self._seq)
+        entry = self._by_type.setdefault(r.entity_type, [[], [], 0])
+        keys, results, _ = entry
+        i = bisect.bisect_left(keys, (r.start, seq))
+        keys.insert(i, (r.start, seq))
+        results.insert(i, r)
+        entry[2] = max(entry[2], r.end - r.start)
+
+    def extend(self, items):
+        for r in items:
+            self.append(r)
+
+    def remove(self, r):
+        # Same element list.remove would drop (first equal one)
+        obj = self[self.index(r)]
+        super().remove(obj)
+        keys, results, _ = self._by_type[obj.entity_type]
+        i = bisect.bisect_left(keys, (obj.start, self._seq_of.pop(id(obj))))
+        del keys[i], results[i]
+
+    def overlapping(self, s, e, entity_types):
+        """Results of the given types overlapping [s, e), in list order."""
+        hits = []
+        for ent in dict.fromkeys(entity_types):
+            entry = self._by_type.get(ent)
+            if not entry:
+                continue
+            keys, results, longest = entry
+            lo = bisect.bisect_left(keys, (s - longest + 1,))
+            hi = bisect.bisect_left(keys, (e,))
+            hits.extend((keys[i][1], results[i]) for i in range(lo, hi)
+                        if not (e <= results[i].start or s >= results[i].end))
+        return [r for _seq, r in sorted(hits, key=lambda h: h[0])]
+
+    def overlaps(self, s, e, entity_types):
+        for ent in entity_types:
+            entry = self._by_type.get(ent)
+            if not entry:
+                continue
+            keys, results, longest = entry
+            lo = bisect.bisect_left(keys, (s - longest + 1,))
+            hi = bisect.bisect_left(keys, (e,))
+            if any(not (e <= results[i].start or s >= results[i].end) for i in range(lo, hi)):
+                return True
+        return False
+
+
+# ====================
+# Keyword automaton (see PIIFilter.KEYWORD_CLASSES)
+# ====================
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over named keyword classes, compiled to a DFA (pure Python).
+
+    scan(text) finds every occurrence of every keyword in one pass over the text; the returned
+    KeywordHits answers "does a keyword of class X lie within text[lo:hi]" with one bisect.
+    """
+
+    def __init__(self, classes):
+        self.classes = {name: tuple(dict.fromkeys(kws)) for name, kws in classes.items()}
+        goto, out = [{}], [set()]
+        for name, kws in self.classes.items():
+            for kw in kws:
+                state = 0
+                for ch in kw:
+                    nxt = goto[state].get(ch)
+                    if nxt is None:
+                        nxt = goto[state][ch] = len(goto)
+                        goto.append({})
+                        out.append(set())
+                    state = nxt
+                out[state].add((name, len(kw)))
+        # Breadth-first, so a state's fail target (always shallower) is complete before it is used
+        delta = [dict(g) for g in goto]
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                out[nxt] |= out[fail[nxt]]
+                queue.append(nxt)
+            for ch, nxt in delta[fail[state]].items():
+                delta[state].setdefault(ch, nxt)
+        self._delta = delta
+        self._out = [tuple(sorted(o)) for o in out]
+
+    def scan(self, text):
+        """Every occurrence of every keyword in ``text``, as KeywordHits."""
+        delta, out = self._delta, self._out
+        found = {}  # only classes with a hit, so many rarely-hit classes cost nothing per text
+        state = 0
+        for end, ch in enumerate(text, 1):
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                for name, n in out[state]:
+                    found.setdefault(name, []).append((end - n, end))
+        return KeywordHits(found, len(text))
+
+
+class KeywordHits:
+    """Keyword occurrences of one text per class: ends ascending, with the running max of starts."""
+
+    def __init__(self, found, length):
+        self.length = length
+        self._index = {}
+        for name, hits in found.items():
+            ends, max_starts, best = [], [], -1
+            for s, e in hits:  # scan order: ascending end
+                best = max(best, s)
+                ends.append(e)
+                max_starts.append(best)
+            self._index[name] = (ends, max_starts)
+
+    def within(self, name, lo, hi):
+        """Does a keyword of class ``name`` lie within text[max(0, lo):hi]? (hi < 0 counts from the end, as in a slice)"""
+        if hi < 0:
+            hi += self.length
+        if name not in self._index:
+            return False
+        ends, max_starts = self._index[name]
+        i = bisect.bisect_right(ends, hi)
+        return bool(i) and max_starts[i - 1] >= max(0, lo)
+
+    def found(self, name):
+        """Does a keyword of class ``name`` occur anywhere in the text?"""
+        return name in self._index
+
+
+# ====================
+# Required literals of bank patterns (see PIIFilter._literal_gates)
+# ====================
+# Lowercase chars re.IGNORECASE treats as one although str.lower() keeps them apart (CPython's
+# re._casefix table): a literal "s" in an IGNORECASE pattern also matches "ſ"
+_IGNORECASE_EQUIVALENTS = (
+    "iı", "sſ", "µμ", "ͅιι", "ΐΐ", "ΰΰ",
+    "βϐ", "εϵ", "θϑ", "κϰ", "πϖ", "ρϱ",
+    "ςσ", "φϕ", "вᲀ", "дᲁ", "оᲂ", "сᲃ",
+    "тᲄᲅ", "ъᲆ", "ѣᲇ", "ꙋᲈ", "ṡẛ", "ﬅﬆ",
+)
+_CASE_VARIANTS = {ch: frozenset(group) for group in _IGNORECASE_EQUIVALENTS for ch in group}
+_LITERAL_FLAGS = re.IGNORECASE | re.VERBOSE | re.MULTILINE | re.DOTALL  # same bits in the regex package
+_LITERAL_MIN_LEN = 3  # shorter literals (":", "id") are in nearly every text and gate nothing
+_LITERAL_MAX_ALTERNATIVES = 64
+_LITERAL_CACHE = {}  # (pattern, flags) -> _required_literals result, one parse per pattern per process
+
+
+def _literal_chars(code, ignorecase):
+    low = chr(code).lower()
+    if len(low) != 1:
+        return None
+    return _CASE_VARIANTS.get(low, frozenset(low)) if ignorecase else frozenset(low)
+
+
+def _literal_class(items, ignorecase):
+    # [...] of a few plain chars/short ranges -> their lowercase forms; None for anything wider
+    chars = set()
+    for op, av in items:
+        if op is _sre_constants.LITERAL:
+            codes = (av,)
+        elif op is _sre_constants.RANGE and av[1] - av[0] < 12:
+            codes = range(av[0], av[1] + 1)
+        else:
+            return None
+        for code in codes:
+            more = _literal_chars(code, ignorecase)
+            if more is None:
+                return None
+            chars |= more
+    return chars if len(chars) <= 8 else None
+
+
+def _best_literals(factors):
+    # The requirement whose shortest literal is longest (fewest alternatives on ties), i.e. the rarest
+    factors = [f for f in factors if f and "" not in f]
+    return max(factors, key=lambda f: (min(map(len, f)), -len(f)), default=None)
+
+
+def _sequence_literals(items, ignorecase):
+    """
+    (exact, factors) of a parsed sequence. exact: the lowercased strings it can match when they are
+    few and fixed, else None. factors: literal sets of which every match contains at least one.
+    """
+    run, factors, exact = {""}, [], True
+    for op, av in items:
+        fixed, more = None, []
+        if op is _sre_constants.LITERAL:
+            fixed = _literal_chars(av, ignorecase)
+        elif op is _sre_constants.IN:
+            fixed = _literal_class(av, ignorecase)
+        elif op is _sre_constants.AT or op is _sre_constants.ASSERT_NOT:
+            fixed = {""}  # zero-width: the strings on either side stay adjacent
+        elif op is _sre_constants.ASSERT:
+            sub_exact, more = _sequence_literals(av[1], ignorecase)
+            fixed = {""}
+            more = more + ([frozenset(sub_exact)] if sub_exact is not None else [])
+        elif op is _sre_constants.SUBPATTERN:
+            _group, add_flags, del_flags, sub = av
+            sub_ignorecase = (ignorecase or bool(add_flags & re.IGNORECASE)) and not del_flags & re.IGNORECASE
+            fixed, more = _sequence_literals(sub, sub_ignorecase)
+        elif op is getattr(_sre_constants, "ATOMIC_GROUP", None):
+            fixed, more = _sequence_literals(av, ignorecase)
+        elif op is _sre_constants.BRANCH:
+            branches = [_sequence_literals(sub, ignorecase) for sub in av[1]]
+            if all(e is not None for e, _ in branches) and sum(len(e) for e, _ in branches) <= _LITERAL_MAX_ALTERNATIVES:
+                fixed = set().union(*(e for e, _ in branches))
+            else:
+                needed = [_best_literals(([frozenset(e)] if e is not None else []) + f) for e, f in branches]
+                if None not in needed:
+                    more = [frozenset().union(*needed)]
+        elif op in (_sre_constants.MAX_REPEAT, _sre_constants.MIN_REPEAT,
+                    getattr(_sre_constants, "POSSESSIVE_REPEAT", None)):
+            lo, hi, sub = av
+            sub_exact, sub_factors = _sequence_literals(sub, ignorecase)
+            if lo == hi == 1:
+                fixed, more = sub_exact, sub_factors
+            elif lo >= 1:
+                more = sub_factors + ([frozenset(sub_exact)] if sub_exact is not None else [])
+        if fixed is not None and len(run) * len(fixed) <= _LITERAL_MAX_ALTERNATIVES:
+            run = {r + x for r in run for x in fixed}
+        else:
+            exact = False
+            factors.append(frozenset(run))
+            if fixed is not None:
+                factors.append(frozenset(fixed))
+            run = {""}
+        factors.extend(more)
+    factors.append(frozenset(run))
+    return (run if exact else None), factors
+
+
+def _required_literals(rx):
+    """
+    Sorted lowercase strings of which text.lower() holds at least one wherever ``rx`` matches (the
+    label words of a labeled pattern), or None if no such literal of _LITERAL_MIN_LEN+ chars is found.
+    Derived from the stdlib parse of the pattern, so also for proxies of re.Pattern.
+    """
+    key = (rx.pattern, int(rx.flags) & _LITERAL_FLAGS)
+    if key not in _LITERAL_CACHE:
+        literals = None
+        try:
+            parsed = _sre_parse.parse(*key)
+        except (re.error, TypeError, ValueError):
+            parsed = None
+        if parsed is not None:
+            exact, factors = _sequence_literals(list(parsed), bool(parsed.state.flags & re.IGNORECASE))
+            best = _best_literals(factors + ([frozenset(exact)] if exact is not None else []))
+            if best is not None and min(map(len, best)) >= _LITERAL_MIN_LEN:
+                literals = tuple(sorted(best))
+        _LITERAL_CACHE[key] = literals
+    return _LITERAL_CACHE[key]
+
+
+# ====================
+# Combined scans of label-led families (see PIIFilter.LABELED_ID_FAMILIES)
+# ====================
+_INLINE_FLAGS = {re.IGNORECASE: "i", re.MULTILINE: "m", re.DOTALL: "s", re.VERBOSE: "x", re.ASCII: "a"}
+_LEADING_FLAGS_RX = re.compile(r"\A\(\?[aiLmsux]+\)")
+
+
+def _first_chars(items, ignorecase):
+    """
+    (chars, nullable) of a parsed sequence: the lowercase forms of every char a match can start with
+    (None if unbounded) and whether it can match empty.
+    """
+    chars = set()
+    for op, av in items:
+        if op in (_sre_constants.AT, _sre_constants.ASSERT, _sre_constants.ASSERT_NOT):
+            continue
+        if op is _sre_constants.LITERAL or op is _sre_constants.IN:
+            more = _literal_chars(av, ignorecase) if op is _sre_constants.LITERAL else _literal_class(av, ignorecase)
+            return (None if more is None else chars | more), False
+        if op is _sre_constants.SUBPATTERN:
+            _group, add_flags, del_flags, sub = av
+            more, nullable = _first_chars(sub, (ignorecase or bool(add_flags & re.IGNORECASE)) and not del_flags & re.IGNORECASE)
+        elif op is _sre_constants.BRANCH:
+            branches = [_first_chars(sub, ignorecase) for sub in av[1]]
+            if any(more is None for more, _ in branches):
+                return None, False
+            more, nullable = set().union(*(more for more, _ in branches)), any(n for _, n in branches)
+        elif op in (_sre_constants.MAX_REPEAT, _sre_constants.MIN_REPEAT):
+            lo, _hi, sub = av
+            more, nullable = _first_chars(sub, ignorecase)
+            nullable = nullable or lo == 0
+        else:
+            return None, False
+        if more is None:
+            return None, False
+        chars |= more
+        if not nullable:
+            return chars, False
+    return chars, True
+
+
+def _group_refs(items):
+    for op, av in items:
+        if op in (_sre_constants.GROUPREF, _sre_constants.GROUPREF_EXISTS):
+            return True
+        subs = ()
+        if op in (_sre_constants.SUBPATTERN, _sre_constants.MAX_REPEAT, _sre_constants.MIN_REPEAT,
+                  getattr(_sre_constants, "POSSESSIVE_REPEAT", None)):
+            subs = (av[-1],)
+        elif op in (_sre_constants.ASSERT, _sre_constants.ASSERT_NOT):
+            subs = (av[1],)
+        elif op is _sre_constants.BRANCH:
+            subs = av[1]
+        elif op is getattr(_sre_constants, "ATOMIC_GROUP", None):
+            subs = (av,)
+        if any(_group_refs(sub) for sub in subs):
+            return True
+    return False
+
+
+class PatternUnion:
+    """
+    Member patterns scanned in one pass: an alternation of the members, each closed by an empty
+    group named after it, so ``lastgroup`` names the first member matching at a position. A lookahead
+    on the chars the members can start with rejects most positions before any member is tried.
+
+    scan() turns those positions into exactly what each member's own finditer() yields: members after
+    the named one are tried there with match(), and every member resumes only past its previous match.
+    Members that cannot be merged (profiled/budgeted wrappers, named groups, backreferences, empty
+    matches) are scanned with their own finditer().
+    """
+
+    def __init__(self, members):
+        self.members = dict(members)
+        self._sources = {name: self._merge_source(name, rx) for name, rx in self.members.items()}
+        self._combined = {}  # merged member names -> (combined pattern, their order) or None
+
+    @staticmethod
+    def _merge_source(name, rx):
+        """``rx`` as a self-contained (?flags:...) group, or None if it cannot be merged."""
+        if not isinstance(rx, (re.Pattern, _LazyPattern)) or not name.isidentifier():
+            return None
+        try:
+            parsed = _sre_parse.parse(rx.pattern, rx.flags)
+        except re.error:
+            return None
+        if parsed.state.groupdict or parsed.getwidth()[0] == 0 or _group_refs(list(parsed)):
+            return None
+        flags = "".join(letter for flag, letter in _INLINE_FLAGS.items() if parsed.state.flags & flag)
+        body = _LEADING_FLAGS_RX.sub("", rx.pattern)
+        source = f"(?{flags}:{body}\n)" if "x" in flags else f"(?{flags}:{body})" if flags else f"(?:{body})"
+        try:  # flags set anywhere but the start would leak into the other members
+            if _sre_parse.parse(source).state.flags & (re.IGNORECASE | re.MULTILINE | re.DOTALL | re.VERBOSE | re.ASCII):
+                return None
+        except re.error:
+            return None
+        return source, parsed
+
+    def _compile(self, names):
+        if names not in self._combined:
+            starts = set()
+            for name in names:
+                parsed = self._sources[name][1]
+                chars, nullable = _first_chars(list(parsed), bool(parsed.state.flags & re.IGNORECASE))
+                starts = None if starts is None or chars is None or nullable else starts | chars
+            guard = f"(?i:(?=[{re.escape(''.join(sorted(starts)))}]))" if starts else ""
+            alternation = "|".join(f"{self._sources[name][0]}(?P<{name}>)" for name in names)
+            try:
+                combined = re.compile(f"{guard}(?:{alternation})")
+            except re.error:
+                combined = None
+            self._combined[names] = combined and (combined, {name: i for i, name in enumerate(names)})
+        return self._combined[names]
+
+    def scan(self, text, names=None):
+        """{name: matches} for the members ``names`` (default all), each exactly list(member.finditer(text))."""
+        names = list(self.members if names is None else names)
+        merged = tuple(name for name in names if self._sources[name] is not None)
+        compiled = self._compile(merged) if len(merged) > 1 else None
+        found = {}
+        for name in names:
+            if compiled is None or name not in compiled[1]:
+                found[name] = list(self.members[name].finditer(text))
+        if compiled is None:
+            return found
+        combined, order = compiled
+        for name in merged:
+            found[name] = []
+        resume = dict.fromkeys(merged, 0)
+        pos = 0
+        while True:
+            m = combined.search(text, pos)
+            if m is None:
+                return found
+            p = m.start()
+            for name in merged[order[m.lastgroup]:]:
+                if resume[name] <= p:
+                    hit = self.members[name].match(text, p)
+                    if hit is not None:
+                        found[name].append(hit)
+                        resume[name] = hit.end()
+            pos = p + 1
+
+
+# ====================
+# Per-call analysis context (see PIIFilter._analysis_context)
+# ====================
+class AnalysisContext:
+    """
+    Data the pipeline stages derive from one text, each computed at most once per call: lowercased
+    windows, line breaks, e-mail spans and keyword hits. Everything is computed on first use, so
+    a stage called on its own with a fresh context only pays for what it reads.
+
+    ``gates`` maps id(pattern) to (pattern, automaton class of its required literals), see
+    PIIFilter._literal_gates; finditer skips a gated pattern whose literals the text lacks.
+    """
+
+    # Same pattern _span_inside_email always scanned the whole text with, once per call
+    EMAIL_SPAN_RX = re.compile(r"[\w\.\-+%]+@[\w\.\-]+\.[A-Za-z]{2,}")
+
+    def __init__(self, text, automaton, gates=None):
+        self.text = text
+        self.automaton = automaton
+        self.gates = gates or {}
+
+    @cached_property
+    def lower(self):
+        """text.lower() if it keeps offsets, else None (a char lowering to two, or a context-dependent Σ)."""
+        low = self.text.lower()
+        return low if len(low) == len(self.text) and "Σ" not in self.text else None
+
+    def window(self, start, end):
+        """text[max(0, start):end].lower()"""
+        start = max(0, start)
+        if self.lower is None:
+            return self.text[start:end].lower()
+        return self.lower[start:end]
+
+    @cached_property
+    def newlines(self):
+        return [m.start() for m in re.finditer("\n", self.text)]
+
+    def line_break_before(self, pos):
+        """text.rfind("\\n", 0, pos)"""
+        if pos < 0:
+            return self.text.rfind("\n", 0, pos)
+        i = bisect.bisect_left(self.newlines, pos)
+        return self.newlines[i - 1] if i else -1
+
+    @cached_property
+    def email_spans(self):
+        spans = [m.span() for m in self.EMAIL_SPAN_RX.finditer(self.text)]
+        return [s for s, _ in spans], [e for _, e in spans]
+
+    def inside_email(self, s, e):
+        """Is [s, e) within one e-mail address? Matches don't overlap, so only the last one starting at or before s can hold it."""
+        starts, ends = self.email_spans
+        i = bisect.bisect_right(starts, s)
+        return bool(i) and ends[i - 1] >= e
+
+    @cached_property
+    def keyword_hits(self):
+        return self.automaton.scan(self.lower)
+
+    def has(self, name, start, end):
+        """any(kw in text[max(0, start):end].lower() for kw in <keyword class name>)"""
+        if self.lower is None:
+            low = self.window(start, end)
+            return any(kw in low for kw in self.automaton.classes[name])
+        return self.keyword_hits.within(name, start, end)
+
+    def may_match(self, rx):
+        """False only if ``rx`` is gated and the text holds none of its required literals."""
+        gate = self.gates.get(id(rx))
+        return gate is None or gate[0] is not rx or self.lower is None or self.keyword_hits.found(gate[1])
+
+    def finditer(self, rx):
+        """rx.finditer(text), skipping the scan when may_match rules out every match."""
+        return rx.finditer(self.text) if self.may_match(rx) else iter(())
+
+
+# ====================
+# Result cache (see PIIFilter(result_cache_size=...))
+# ====================
+class ResultCache:
+    """
+    Thread-safe LRU of detection results, at most ``maxsize`` entries, each dropped ``ttl`` seconds
+    after it was stored (None: kept until evicted).
+
+    Keys are fingerprints and values tuples of RecognizerResult, so no entry holds the analyzed
+    text. Fingerprints are keyed with a random per-cache secret (see fingerprint), so short texts
+    cannot be recovered by hashing guesses. Expired entries are dropped on every get/put/len and by
+    purge(), oldest first; nothing outlives its TTL unless the cache goes untouched meanwhile.
+    """
+
+    def __init__(self, maxsize=4096, ttl=None):
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be >= 1, got {maxsize!r}")
+        if ttl is not None and ttl <= 0:
+            raise ValueError(f"ttl must be > 0 seconds or None, got {ttl!r}")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._expiry = deque()  # (expires_at, key) in insertion order = expiry order
+        self._lock = threading.Lock()
+        self._secret = os.urandom(32)  # never leaves the process; fingerprints are only comparable within it
+
+    def __len__(self):
+        self.purge()
+        return len(self._entries)
+
+    def fingerprint(self, data):
+        """Keyed 16-byte digest of ``data`` (bytes)."""
+        return hashlib.blake2b(data, digest_size=16, key=self._secret).digest()
+
+    def purge(self):
+        """Drop every expired entry now (a no-op without ttl)."""
+        if self.ttl is not None:
+            with self._lock:
+                self._purge(time.monotonic())
+
+    def _purge(self, now):
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, key = self._expiry.popleft()
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == expires_at:
+                del self._entries[key]
+
+    def get(self, key):
+        """Cached value for ``key`` or None; counts a hit or a miss."""
+        with self._lock:
+            if self.ttl is not None:
+                self._purge(time.monotonic())
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            expires_at = None
+            if self.ttl is not None:
+                now = time.monotonic()
+                self._purge(now)
+                expires_at = now + self.ttl
+                self._expiry.append((expires_at, key))
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._expiry.clear()
+
+
+# ====================
+# Incremental chat transcripts (see PIIFilter.chat_session)
+# ====================
+class ChatSession:
+    """
+    A transcript that grows one message at a time, with the resolved spans of earlier turns kept.
+
+    add() analyzes the new message plus about ``context`` characters of the transcript before it,
+    widened back to a line start (also the line start before any stored span it would cut), so a
+    turn costs O(len(message) + line length), not O(len(transcript)). The spans found in that
+    window replace the stored ones there: the left
+    context feeds intro cues, name plausibility and address blocks continued on the next line,
+    and the new message may revise what its left context resolved to. Spans before the window
+    are final.
+    """
+
+    def __init__(self, pf, context=None, separator="\n", mode="replace", **kwargs):
+        if context is None:
+            context = pf.STREAM_OVERLAP_DEFAULT
+        if context < 0:
+            raise ValueError(f"context must be >= 0, got {context!r}")
+        if mode not in pf.RENDER_MODES:
+            raise ValueError(f"mode must be one of {pf.RENDER_MODES}, got {mode!r}")
+        self.pf = pf
+        self.context = context
+        self.separator = separator
+        self.mode = mode
+        self.kwargs = kwargs  # go to analyze_text on every turn
+        self.spans = []  # RecognizerResult with transcript offsets, sorted by start
+        self._parts = []  # messages with their leading separator
+        self._starts = []  # transcript offset of each part
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def text(self):
+        return "".join(self._parts)
+
+    def _line_start(self, pos):
+        """Transcript offset of the line containing ``pos`` (0 when no line break precedes it)."""
+        i = bisect.bisect_right(self._starts, pos) - 1
+        while i >= 0:
+            nl = self._parts[i].rfind("\n", 0, pos - self._starts[i])
+            if nl != -1:
+                return self._starts[i] + nl + 1
+            pos = self._starts[i]
+            i -= 1
+        return 0
+
+    def _suffix(self, pos):
+        """``self.text[pos:]`` without joining the whole transcript."""
+        i = bisect.bisect_right(self._starts, pos) - 1
+        if i < 0:
+            return ""
+        return self._parts[i][pos - self._starts[i]:] + "".join(self._parts[i + 1:])
+
+    def add(self, message):
+        """Append ``message`` to the transcript; returns it anonymized."""
+        message = unicodedata.normalize("NFC", message)
+        piece = (self.separator if self._parts else "") + message
+        start = self._length + len(piece) - len(message)  # transcript offset of the message
+        if self.kwargs.get("language") is None:
+            supported = getattr(self.pf.analyzer, "supported_languages", {"en"})
+            self.kwargs["language"] = self.pf.language_router.route(message, supported)
+
+        # Whole lines as left context; a stored span the window would cut pulls it back to the
+        # start of that span's line, so its label/cue is re-analyzed with it
+        offset = self._line_start(max(0, self._length - self.context))
+        for r in reversed(self.spans):
+            if r.end <= offset:
+                break
+            if r.start < offset:
+                offset = self._line_start(r.start)
+
+        found = self.pf.analyze_text(self._suffix(offset) + piece, **self.kwargs)
+        for r in found:
+            r.start += offset
+            r.end += offset
+        while self.spans and self.spans[-1].end > offset:
+            self.spans.pop()
+        self.spans.extend(found)
+        new = [r for r in found if r.end > start]
+
+        self._parts.append(piece)
+        self._starts.append(self._length)
+        self._length += len(piece)
+        clipped = [
+            RecognizerResult(r.entity_type, max(r.start, start) - start, r.end - start, r.score)
+            for r in new
+        ]
+        return self.pf._render(message, clipped, mode=self.mode)
+
+    def anonymized(self):
+        """The whole transcript anonymized with the current spans (later turns may revise earlier ones)."""
+        return self.pf._render(self.text, self.spans, mode=self.mode)
+
+
+# ====================
+# Detector snapshot (see PIIFilter.export_snapshot)
+# ====================
+SNAPSHOT_FORMAT = 1
+
+
+class _LazyPattern:
+    """Stand-in for re.Pattern that compiles on first use; snapshot-loaded banks hold these."""
+
+    __slots__ = ("pattern", "flags", "_rx")
+
+    def __init__(self, pattern, flags):
+        self.pattern = pattern
+        self.flags = flags
+        self._rx = None
+
+    def __getattr__(self, name):
+        if self._rx is None:
+            self._rx = re.compile(self.pattern, self.flags)
+        return getattr(self._rx, name)
+
+    def __repr__(self):
+        return f"_LazyPattern({self.pattern[:40]!r}, {self.flags})"
+
+
+def _source_sha256():
+    with open(__file__, "rb") as fh:
+        return hashlib.sha256(fh.read()).hexdigest()
+
+
+def _encode_snapshot_value(value):
+    if isinstance(value, (re.Pattern, _LazyPattern)):
+        return {"re": value.pattern, "flags": int(value.flags)}
+    if isinstance(value, tuple):
+        return {"tuple": [_encode_snapshot_value(v) for v in value]}
+    if isinstance(value, frozenset):
+        return {"set": sorted(value)}
+    if isinstance(value, Mapping):
+        return {"dict": [[_encode_snapshot_value(k), _encode_snapshot_value(v)] for k, v in value.items()]}
+    return value
+
+
+def _decode_snapshot_value(value):
+    if isinstance(value, dict):
+        if "re" in value:
+            return _LazyPattern(value["re"], value["flags"])
+        if "tuple" in value:
+            return tuple(_decode_snapshot_value(v) for v in value["tuple"])
+        if "set" in value:
+            return frozenset(value["set"])
+        if "dict" in value:
+            return MappingProxyType({_decode_snapshot_value(k): _decode_snapshot_value(v) for k, v in value["dict"]})
+    return value
+
+
+def load_snapshot(path):
+    """
+    Read a snapshot written by PIIFilter.export_snapshot.
+
+    Returns None when the file is missing or was exported from a different pii_filter.py
+    (content hash mismatch), so callers fall back to building patterns from source.
+    """
+    try:
+        with open(path, encoding="utf-8") as fh:
+            snap = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if snap.get("format") != SNAPSHOT_FORMAT or snap.get("source_sha256") != _source_sha256():
+        return None
+    return snap
+
 
 class PIIFilter:
     """
@@ -123,7 +1649,136 @@ class PIIFilter:
         "FILE_NUMBER", "TRANSACTION_NUMBER", "CUSTOMER_NUMBER", "TICKET_ID",
     ]
 
-    def __init__(self, person_false_positive_samples=None, non_name_after_ich_bin=None):
+    # Named entity subsets for PIIFilter(entities=...) and anonymize_text(..., entities=...)
+    ENTITY_PROFILES = {
+        "secrets": ("API_KEY", "SESSION_ID", "ACCESS_TOKEN", "REFRESH_TOKEN", "ACCESS_CODE", "OTP_CODE",
+                    "PASSWORD", "PIN", "TAN", "PUK", "RECOVERY_CODE"),
+        "financial": ("CREDIT_CARD", "BANK_ACCOUNT", "ROUTING_NUMBER", "ACCOUNT_NUMBER", "PAYMENT_TOKEN",
+                      "CRYPTO_ADDRESS"),
+        "contact": ("PERSON", "EMAIL_ADDRESS", "PHONE_NUMBER", "FAX_NUMBER", "ADDRESS", "LOCATION"),
+    }
+    # Types whose candidates can suppress, absorb, outrank or turn into spans of the key type; an
+    # entity subset also detects these (transitively) and then drops them, so its output matches the
+    # full pipeline's output restricted to the subset. Found by differential runs over combined test
+    # texts (tests/unit/test_entity_subset.py keeps the cases); the chains reach most types
+    ENTITY_DEPENDENCIES = {
+        "PERSON": ("DATE", "RECOVERY_CODE", "BENEFIT_ID"),
+        "EMAIL_ADDRESS": ("ADDRESS",),
+        "PHONE_NUMBER": ("ADDRESS", "DATE", "HEALTH_ID", "ID_NUMBER", "CASE_REFERENCE", "ROUTING_NUMBER",
+                         "BANK_ACCOUNT", "MAC_ADDRESS", "ADVERTISING_ID", "INSURANCE_ID", "SERVICEKONTO",
+                         "FILE_NUMBER", "TRANSACTION_NUMBER", "CUSTOMER_NUMBER", "API_KEY", "PUK"),
+        "ADDRESS": ("LOCATION", "PERSON", "DATE", "PHONE_NUMBER", "ID_NUMBER", "API_KEY", "PASSWORD", "PUK"),
+        "LOCATION": ("ADDRESS", "PHONE_NUMBER", "MEETING_ID", "COMMERCIAL_REGISTER", "CUSTOMER_NUMBER",
+                     "TICKET_ID", "MESSAGING_ID", "OTP_CODE", "PIN", "TAN", "TRANSACTION_NUMBER", "MRN",
+                     "EMPLOYEE_ID", "RECOVERY_CODE", "PRO_LICENSE", "ELSTER_ID", "FAX_NUMBER", "IP_ADDRESS",
+                     "HEALTH_INFO", "VOTER_ID", "LICENSE_PLATE", "PASSPORT"),
+        "DATE": ("MEETING_ID", "CASE_REFERENCE"),
+        "PASSPORT": ("ID_NUMBER", "TAX_ID", "DRIVER_LICENSE", "VOTER_ID", "RESIDENCE_PERMIT", "BENEFIT_ID",
+                     "MILITARY_ID", "FILE_NUMBER", "CUSTOMER_NUMBER", "DEVICE_ID"),
+        "ID_NUMBER": ("TAX_ID", "BUND_ID", "API_KEY", "PHONE_NUMBER"),
+        "CREDIT_CARD": ("IMEI", "ADDRESS"),
+        "IMEI": ("CREDIT_CARD",),
+        "BANK_ACCOUNT": ("LOCATION",),
+        "ACCOUNT_NUMBER": ("PHONE_NUMBER", "RESIDENCE_PERMIT"),
+        "PAYMENT_TOKEN": ("API_KEY", "ACCESS_TOKEN"),
+        "API_KEY": ("SESSION_ID", "ACCESS_TOKEN", "REFRESH_TOKEN", "ACCESS_CODE", "OTP_CODE", "PAYMENT_TOKEN",
+                    "CRYPTO_ADDRESS"),
+        "ACCESS_TOKEN": ("API_KEY",),
+        "ACCESS_CODE": ("PIN", "PUK", "TICKET_ID", "RECOVERY_CODE", "PASSWORD"),
+        "OTP_CODE": ("PASSWORD",),
+        "PIN": ("PUK", "FILE_NUMBER", "TICKET_ID", "CUSTOMER_NUMBER", "TRANSACTION_NUMBER"),
+        "TAN": ("TRANSACTION_NUMBER", "COMMERCIAL_REGISTER"),
+        "MEETING_ID": ("PHONE_NUMBER",),
+        "MRN": ("CASE_REFERENCE",),
+        "CASE_REFERENCE": ("CUSTOMER_NUMBER", "TICKET_ID", "ID_NUMBER", "RECOVERY_CODE"),
+        "COMMERCIAL_REGISTER": ("TICKET_ID", "API_KEY", "BENEFIT_ID"),
+        "SERVICEKONTO": ("ACCOUNT_NUMBER",),
+        "MAC_ADDRESS": ("ADVERTISING_ID", "TRANSACTION_NUMBER", "API_KEY", "PHONE_NUMBER", "TAN"),
+        "GEO_COORDINATES": ("LOCATION", "RECOVERY_CODE", "ELSTER_ID", "STUDENT_NUMBER", "DEVICE_ID"),
+        "PLUS_CODE": ("ACCESS_CODE",),
+        "ELSTER_ID": ("PASSWORD", "PIN"),
+        "HEALTH_INFO": ("TAN",),
+        "IP_ADDRESS": ("ADDRESS",),
+        "LICENSE_PLATE": ("LOCATION", "COMMERCIAL_REGISTER"),
+        "MESSAGING_ID": ("LOCATION", "STUDENT_NUMBER"),
+        "PASSWORD": ("TRANSACTION_NUMBER", "FILE_NUMBER", "TICKET_ID"),
+        "RECOVERY_CODE": ("IMEI", "ADDRESS"),
+        "SESSION_ID": ("PASSWORD",),
+        "TAX_ID": ("EORI", "ID_NUMBER", "TRANSACTION_NUMBER", "RECOVERY_CODE", "CASE_REFERENCE"),
+        "BUND_ID": ("PIN", "PASSWORD"),
+        "EMPLOYEE_ID": ("ADDRESS",),
+        "ROUTING_NUMBER": ("BANK_ACCOUNT", "COMMERCIAL_REGISTER"),
+        "SOCIAL_HANDLE": ("ADDRESS",),
+        "INSURANCE_ID": ("BANK_ACCOUNT",),
+        "CRYPTO_ADDRESS": ("PASSWORD",),
+        "HEALTH_ID": ("BUND_ID", "ADDRESS"),
+        "PRO_LICENSE": ("PASSWORD", "TAN"),
+        "TRANSACTION_NUMBER": ("IMEI",),
+        "FAX_NUMBER": ("IMEI",),
+        "STUDENT_NUMBER": ("ADDRESS",),
+        "ADVERTISING_ID": ("COMMERCIAL_REGISTER",),
+        "PUK": ("IMEI",),
+        "REFRESH_TOKEN": ("PASSWORD",),
+    }
+
+    # Analyzer back-ends: "spacy" runs Presidio's default spaCy NER (PERSON/LOCATION) next to the
+    # pattern recognizers; "pattern" skips spaCy entirely and relies on regex + injections only.
+    NLP_ENGINES = ("spacy", "pattern")
+
+    # spaCy model per detected language; each model is loaded lazily on the first text in that
+    # language and shared process-wide. Languages not listed here are analyzed with "en".
+    SPACY_MODEL_PROFILES = {
+        "lg": {"en": "en_core_web_lg", "de": "de_core_news_sm", "es": "es_core_news_sm", "fr": "fr_core_news_sm"},
+        "sm": {"en": "en_core_web_sm", "de": "de_core_news_sm", "es": "es_core_news_sm", "fr": "fr_core_news_sm"},
+    }
+    # Pipeline components we never read (only doc.ents feed SpacyRecognizer)
+    SPACY_EXCLUDE_DEFAULT = ("parser", "lemmatizer")
+
+    # Engine for the bank's compiled patterns: "re" (stdlib), or "regex" (the regex package, which
+    # Presidio's recognizers already use) with a time budget per scan, see _BudgetedPattern
+    REGEX_ENGINES = ("re", "regex")
+    PATTERN_TIMEOUT_DEFAULT = 1.0
+
+    def __init__(self, person_false_positive_samples=None, non_name_after_ich_bin=None, nlp_engine="spacy",
+                 spacy_profile="lg", spacy_exclude=SPACY_EXCLUDE_DEFAULT, pattern_overrides=None,
+                 snapshot=None, language_router=None, regex_engine="re", pattern_timeout=None, entities=None,
+                 result_cache_size=0, result_cache_ttl=None):
+        if nlp_engine not in self.NLP_ENGINES:
+            raise ValueError(f"nlp_engine must be one of {self.NLP_ENGINES}, got {nlp_engine!r}")
+        if regex_engine not in self.REGEX_ENGINES:
+            raise ValueError(f"regex_engine must be one of {self.REGEX_ENGINES}, got {regex_engine!r}")
+        if pattern_timeout is not None and regex_engine != "regex":
+            raise ValueError("pattern_timeout needs regex_engine='regex' (the re module has no timeouts)")
+        if result_cache_ttl is not None and not result_cache_size:
+            raise ValueError("result_cache_ttl needs result_cache_size > 0")
+        # Default entity subset (None = everything); analyze_text/anonymize_text can override per call
+        self._default_entities = self._entity_selection(entities)
+        self.entities = self._default_entities[0]
+        if isinstance(spacy_profile, str):
+            if spacy_profile not in self.SPACY_MODEL_PROFILES:
+                raise ValueError(f"spacy_profile must be one of {tuple(self.SPACY_MODEL_PROFILES)} or a dict, got {spacy_profile!r}")
+            spacy_profile = self.SPACY_MODEL_PROFILES[spacy_profile]
+        if "en" not in spacy_profile:
+            raise ValueError("spacy_profile must include an 'en' model (fallback language)")
+        # Constructor arguments, replayed by anonymize_batch worker processes
+        self._init_kwargs = dict(
+            person_false_positive_samples=person_false_positive_samples,
+            non_name_after_ich_bin=non_name_after_ich_bin, nlp_engine=nlp_engine,
+            spacy_profile=spacy_profile, spacy_exclude=spacy_exclude,
+            pattern_overrides=pattern_overrides, snapshot=snapshot, language_router=language_router,
+            regex_engine=regex_engine, pattern_timeout=pattern_timeout, entities=entities,
+            result_cache_size=result_cache_size, result_cache_ttl=result_cache_ttl,
+        )
+        self._batch_pool = None
+        self._batch_pool_workers = 0
+        self._async = None
+        self.nlp_engine_name = nlp_engine
+        self.spacy_models = dict(spacy_profile)
+        self.spacy_exclude = tuple(spacy_exclude)
+        # Picks the spaCy model per text when anonymize_text gets no explicit language
+        self.language_router = language_router if language_router is not None else LanguageRouter()
+        self._analyzer_entity_cache = {}  # language -> entity types the analyzer has recognizers for
+
         if person_false_positive_samples is None:
             person_false_positive_samples = []
         
@@ -138,8 +1793,40 @@ class PIIFilter:
         # Feature flag to include loose unlabeled TAX fallbacks (default off)
         self.ENABLE_LOOSE_TAX = False
         self.STRICT_LOCATION_POSTAL_ONLY = True
-        self._build_patterns()
-        self._setup_analyzer()
+        # Stale or missing snapshot -> None -> build from source as usual
+        snap = load_snapshot(snapshot) if snapshot else None
+        self.snapshot_loaded = snap is not None
+        # Compiled patterns/lexicons are shared process-wide; overrides only shadow them on this instance
+        bank = self.shared_pattern_bank(snap)
+        self.__dict__.update(bank)
+        if pattern_overrides:
+            unknown = sorted(set(pattern_overrides) - set(bank))
+            if unknown:
+                raise ValueError(f"pattern_overrides has unknown pattern names: {unknown}")
+            self.__dict__.update(pattern_overrides)
+        self.regex_engine = regex_engine
+        self.pattern_timeouts = Counter()  # bank pattern name -> budget overruns (regex engine only)
+        if regex_engine == "regex":
+            self.pattern_timeout = self.PATTERN_TIMEOUT_DEFAULT if pattern_timeout is None else pattern_timeout
+            for name in bank:
+                value = self.__dict__[name]
+                budgeted = _map_patterns(name, value, lambda path, rx: _BudgetedPattern(
+                    _compile_regex(rx), path, self.pattern_timeout, self._pattern_overrun))
+                if budgeted is not value:
+                    self.__dict__[name] = budgeted
+        self.literal_gates, literal_classes = self._literal_gates(bank)
+        self.keyword_automaton = self._keyword_automaton(literal_classes)
+        self.family_unions = {table: PatternUnion({name: getattr(self, name) for name, _, _ in getattr(self, table)})
+                              for table in self.FAMILY_TABLES}
+        self._setup_analyzer(snap)
+        # Optional analyze_text result cache; its keys include the version of the patterns in use
+        self.result_cache = ResultCache(result_cache_size, result_cache_ttl) if result_cache_size else None
+        self.pattern_bank_version = None
+        if self.result_cache is not None:
+            self.pattern_bank_version = hashlib.sha256(
+                json.dumps([_source_sha256(), {k: _encode_snapshot_value(v) for k, v in (pattern_overrides or {}).items()}],
+                           sort_keys=True, default=repr).encode("utf-8")
+            ).hexdigest()
         # --- German-specific "not-a-name" tokens after "ich bin"
         self.DE_NON_NAME_AFTER_ICH_BIN = {
             "beschäftigt","arbeitslos","krank","gesund","müde","wach","allein","verheiratet",
@@ -160,22 +1847,77 @@ class PIIFilter:
             if isinstance(_w, str) and _w.strip():
                 self.DE_NON_NAME_AFTER_ICH_BIN.add(_w.strip().lower())
 
+    # ===========================
+    # Shared pattern bank
+    # ===========================
+    def _pattern_overrun(self, name, text):
+        """A bank pattern ran out of its time budget on ``text`` (its scan then counts as no match)."""
+        self.pattern_timeouts[name] += 1
+        # ERROR, not WARNING: __init__ lowers the root logger to ERROR, which would swallow a warning
+        _log.error("pattern %s exceeded its %.2fs budget on a %d-char text; treated as no match",
+                     name, self.pattern_timeout, len(text))
+
+    @classmethod
+    def shared_pattern_bank(cls, snapshot=None):
+        """
+        Read-only name -> pattern/lexicon mapping, built once per process (per class).
+
+        Built by _build_patterns, or taken from a loaded ``snapshot`` (patterns then compile
+        lazily on first use). Only the first call in a process decides which.
+        """
+        bank = cls.__dict__.get("_PATTERN_BANK")
+        if bank is None:
+            with _PATTERN_BANK_LOCK:
+                bank = cls.__dict__.get("_PATTERN_BANK")
+                if bank is None:
+                    if snapshot is not None:
+                        values = {k: _decode_snapshot_value(v) for k, v in snapshot["bank"].items()}
+                    else:
+                        proto = object.__new__(cls)
+                        proto._build_patterns()
+                        values = {k: _freeze_pattern_value(v) for k, v in vars(proto).items()}
+                    bank = MappingProxyType(values)
+                    cls._PATTERN_BANK = bank
+        return bank
+
+    def export_snapshot(self, path):
+        """
+        Write the built detector configuration (shared pattern bank: pattern sources, flags and
+        lexicons; custom recognizers with their scores; priorities) to ``path`` as JSON.
+
+        The file is keyed by the content hash of pii_filter.py; PIIFilter(snapshot=path) ignores it
+        once the source changes.
+        """
+        snap = {
+            "format": SNAPSHOT_FORMAT,
+            "source_sha256": _source_sha256(),
+            "bank": {k: _encode_snapshot_value(v) for k, v in self.shared_pattern_bank().items()},
+            "recognizers": [rec.to_dict() for rec in self._build_pattern_recognizers()],
+            "priority": dict(self.PRIORITY),
+        }
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(snap, fh, ensure_ascii=False)
+        return path
+
     # ===========================
     # Build all regex components
     # ===========================
     def _build_patterns(self):
+        # Street-name tokens are capped at 64 chars: every word start inside a long junk run (e.g.
+        # "Abc-Abc-...") otherwise rescans the rest of the run, which is quadratic in its length
         self.NAME_WORD = (
             r"(?:[A-Za-zÀ-ÖØ-öø-ÿĀ-ſ\u00C0-\u024F\u0370-\u03FF"
             r"\u0400-\u04FF\u0590-\u05FF\u0600-\u06FF\u0750-\u077F"
             r"\u08A0-\u08FF]"
             r"[A-Za-z0-9À-ÖØ-öø-ÿĀ-ſ\u00C0-\u024F\u0370-\u03FF"
             r"\u0400-\u04FF\u0590-\u05FF\u0600-\u06FF\u0750-\u077F"
-            r"\u08A0-\u08FF'’\.-]*)"
+            r"\u08A0-\u08FF'’\.-]{0,63})"
         )
         self.HOUSE_NO_LABEL = r"(?:No\.?|Nr\.?|Nº|nº|N°|n°|№)"
+        # One possessive run instead of word(?:[-\s]word)* (same language; the nested
+        # quantifiers backtracked exponentially on an unclosed "(A- - - ...")
         self.PAREN_DISTRICT = (
-            r"(?:\s*\(\s*(?:[A-Z0-9ÄÖÜ][\wÀ-ÖØ-öø-ÿÄÖÜäöüß'’\.-]*"
-            r"(?:[-\s][\wÀ-ÖØ-öø-ÿÄÖÜäöüß'’\.-]*)*)\s*\))?"
+            r"(?:\s*\(\s*[A-Z0-9ÄÖÜ][\wÀ-ÖØ-öø-ÿÄÖÜäöüß'’\.\s-]*+\))?"
         )
 
         self.STREET_TYPES = (
@@ -361,7 +2103,7 @@ class PIIFilter:
 
         self.PATTERN_DE_SUFFIX_NUM = rf"""
         \b
-        [A-ZÄÖÜ][\wÄÖÜäöüß'’-]*?(?:straße|strasse|str\.)
+        [A-ZÄÖÜ][\wÄÖÜäöüß'’-]{{0,63}}?(?:straße|strasse|str\.)
         \s*
         \d{{1,5}}[A-Za-z]?
         (?:\s*[-–]\s*\d+[A-Za-z]?)?
@@ -386,7 +2128,7 @@ class PIIFilter:
 
         self.PATTERN_ANY_COMPOUND_SUFFIX = rf"""
         \b
-        [A-ZÀ-ÖØ-ÝÄÖÜ][\wÀ-ÖØ-öø-ÿÄÖÜäöüß'’-]*?(?:{self.STREET_SUFFIX_COMPOUND})
+        [A-ZÀ-ÖØ-ÝÄÖÜ][\wÀ-ÖØ-öø-ÿÄÖÜäöüß'’-]{{0,63}}?(?:{self.STREET_SUFFIX_COMPOUND})
         [\s\.,]*
         \d{{0,5}}[A-Za-z]?
         (?:\s*[-–]\s*\d+[A-Za-z]?)?
@@ -446,64 +2188,108 @@ class PIIFilter:
         self.STRICT_ADDRESS_RX = re.compile(self.STRICT_ADDRESS_REGEX, re.I | re.UNICODE | re.VERBOSE)
         # Conservative fallback: street name + suffix + house number (captures variants missed by STRICT_ADDRESS)
         # Accept either the compact suffix list or the broader street type list (cover English 'Street', 'Avenue', etc.)
+        # The name run is possessive (it cannot contain the whitespace that must follow it, so giving
+        # characters back never helped) and capped at 64 chars like the other street-name tokens
         self.FALLBACK_STREET_RX = re.compile(
-            r"\b[A-ZÀ-ÖØ-ÝÄÖÜ][\wÀ-ÖØ-öø-ÿÄÖÜäöüß'’\.-]*(?:\s+(?:" + self.STREET_SUFFIX_COMPOUND + r"|" + self.STREET_TYPES + r"))[\s\.,]*\d{1,4}[A-Za-z]?(?:\s*[-–]\s*\d+[A-Za-z]?)?\b",
+            r"\b[A-ZÀ-ÖØ-ÝÄÖÜ][\wÀ-ÖØ-öø-ÿÄÖÜäöüß'’\.-]{0,63}+(?:\s+(?:" + self.STREET_SUFFIX_COMPOUND + r"|" + self.STREET_TYPES + r"))[\s\.,]*\d{1,4}[A-Za-z]?(?:\s*[-–]\s*\d+[A-Za-z]?)?\b",
             re.I | re.UNICODE
         )
+        # Fully labeled 3-line address block: street_label:value\nnumber_label:value\ncity_label:value
+        # Requires labels to be followed by colon or whitespace (to avoid matching "St." as a label when it's part of an address value)
+        self.ADDRESS_BLOCK_RX = re.compile(
+            r"(?im)"
+            r"(?:straße|strasse|str|street|adresse|address|rue)(?:\.|:|\s)(?:\s*:?\s*)([^\n:]+)"
+            r"(?:\n\s*(?:nr|no|number|nummer|num)(?:\.|:|\s)(?:\s*:?\s*)([^\n:]+))?"
+            r"(?:\n\s*(?:plz(?:/ort)?|postal|city|stadt|ort|ville|ciudad)(?:\.|:|\s)(?:\s*:?\s*)([^\n:]+))?"
+        )
         # POSTAL codes + City
         self.CITY_TOKEN = r"[A-ZÀ-ÖØ-ÝÄÖÜ][A-Za-zÀ-ÖØ-öø-ÿĀ-ſ\u00C0-\u024F\u0370-\u03FF\u0400-\u04FFÄÖÜäöüß'’\.]+"
         self.CITY_OR_DISTRICT = rf"{self.CITY_TOKEN}(?:[-\s]{self.CITY_TOKEN})*"
 
         
+        # Per-country postal formats: (country, optional prefixes, code) for "<code> <City>" rules,
+        # (country, None, full regex) for codes that stand alone (GB/IE/GI/AD/MT).
+        self.POSTAL_EU_FORMATS = [
+            ("DE", ("DE", "D"), r"(\d{5})"),
+            ("AT", ("AT", "A"), r"(\d{4})"),
+            ("CH", ("CH",), r"(\d{4})"),
+            ("LI", ("LI",), r"(\d{4})"),
+            ("NL", ("NL",), r"(\d{4}\s?[A-Z]{2})"),
+            ("BE", ("BE",), r"(\d{4})"),
+            ("LU", ("LU", "L"), r"(\d{4})"),
+            ("DK", ("DK",), r"(\d{4})"),
+            ("SE", ("SE",), r"(\d{3}\s?\d{2})"),
+            ("NO", ("NO",), r"(\d{4})"),
+            ("FI", ("FI",), r"(\d{5})"),
+            ("IS", ("IS",), r"(\d{3})"),
+            ("FO", ("FO",), r"(\d{3})"),
+            ("GB", None, r"(?i)\b((?:GIR\s?0AA)|(?:[A-HK-Y]?\d{1,2}|[A-HK-Y]\d[A-HJKPSTUW]|[A-HK-Y]\d{1,2}[A-HJKPSTUW]|[0-9][A-HJKPSTUW])\s?\d[ABD-HJLNP-UW-Z]{2}|(?:IM|JE|GY)\d[\dA-Z]?\s?\d[ABD-HJLNP-UW-Z]{2}|BFPO\s?\d{1,4}|(?:ASCN|STHL|TDCU|BBND|BIQQ|FIQQ|GX11)\s?1AA)\b"),
+            ("IE", None, r"(?i)\b([AC-FHKNPRTV-Y]\d{2}\s?[0-9AC-HJ-NP-Z]{4})\b"),
+            ("GI", None, r"(?i)\b(GX11\s?1AA)\b"),
+            ("FR", ("FR",), r"(\d{5})"),
+            ("MC", ("MC",), r"(980\d{2})"),
+            ("ES", ("ES",), r"(\d{5})"),
+            ("PT", ("PT",), r"(\d{4}-\d{3})"),
+            ("IT", ("IT",), r"(\d{5})"),
+            ("SM", ("SM",), r"(4789\d)"),
+            ("VA", ("VA",), r"(00120)"),
+            ("AD", None, r"\b(AD\d{3})\b"),
+            ("MT", None, r"(?i)\b([A-Z]{3}\s?\d{2,4})\b"),
+            ("HR", ("HR",), r"(\d{5})"),
+            ("SI", ("SI",), r"(\d{4})"),
+            ("BA", ("BA",), r"(\d{5})"),
+            ("RS", ("RS",), r"(\d{5})"),
+            ("ME", ("ME",), r"(\d{5})"),
+            ("MK", ("MK",), r"(\d{4})"),
+            ("AL", ("AL",), r"(\d{4})"),
+            ("GR", ("GR",), r"(\d{3}\s?\d{2})"),
+            ("CY", ("CY",), r"(\d{4})"),
+            ("PL", ("PL",), r"(\d{2}-\d{3})"),
+            ("CZ", ("CZ",), r"(\d{3}\s?\d{2})"),
+            ("SK", ("SK",), r"(\d{3}\s?\d{2})"),
+            ("HU", ("HU", "H"), r"(\d{4})"),
+            ("RO", ("RO",), r"(\d{6})"),
+            ("BG", ("BG",), r"(\d{4})"),
+            ("EE", ("EE",), r"(\d{5})"),
+            ("LV", ("LV",), r"(\d{4})"),
+            ("LT", ("LT",), r"(\d{5})"),
+            ("UA", ("UA",), r"(\d{5})"),
+            ("BY", ("BY",), r"(\d{6})"),
+            ("MD", ("MD",), r"(?:MD-)?(\d{4})"),
+            ("TR", ("TR",), r"(\d{5})"),
+        ]
         self.POSTAL_EU_PATTERNS = [
-            rf"\b(?:DE|D)?\s*[-–]?\s*(\d{{5}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:AT|A)?\s*[-–]?\s*(\d{{4}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:CH)?\s*[-–]?\s*(\d{{4}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:LI)?\s*[-–]?\s*(\d{{4}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:NL)?\s*[-–]?\s*(\d{{4}}\s?[A-Z]{{2}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:BE)?\s*[-–]?\s*(\d{{4}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:LU|L)?\s*[-–]?\s*(\d{{4}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:DK)?\s*[-–]?\s*(\d{{4}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:SE)?\s*[-–]?\s*(\d{{3}}\s?\d{{2}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:NO)?\s*[-–]?\s*(\d{{4}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:FI)?\s*[-–]?\s*(\d{{5}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:IS)?\s*[-–]?\s*(\d{{3}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:FO)?\s*[-–]?\s*(\d{{3}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            r"(?i)\b((?:GIR\s?0AA)|(?:[A-HK-Y]?\d{1,2}|[A-HK-Y]\d[A-HJKPSTUW]|[A-HK-Y]\d{1,2}[A-HJKPSTUW]|[0-9][A-HJKPSTUW])\s?\d[ABD-HJLNP-UW-Z]{2}|(?:IM|JE|GY)\d[\dA-Z]?\s?\d[ABD-HJLNP-UW-Z]{2}|BFPO\s?\d{1,4}|(?:ASCN|STHL|TDCU|BBND|BIQQ|FIQQ|GX11)\s?1AA)\b",
-            r"(?i)\b([AC-FHKNPRTV-Y]\d{2}\s?[0-9AC-HJ-NP-Z]{4})\b",
-            r"(?i)\b(GX11\s?1AA)\b",
-            rf"\b(?:FR)?\s*[-–]?\s*(\d{{5}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:MC)?\s*[-–]?\s*(980\d{{2}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:ES)?\s*[-–]?\s*(\d{{5}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:PT)?\s*[-–]?\s*(\d{{4}}-\d{{3}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:IT)?\s*[-–]?\s*(\d{{5}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:SM)?\s*[-–]?\s*(4789\d)\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:VA)?\s*[-–]?\s*(00120)\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            r"\b(AD\d{3})\b",
-            r"(?i)\b([A-Z]{3}\s?\d{2,4})\b",
-            rf"\b(?:HR)?\s*[-–]?\s*(\d{{5}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:SI)?\s*[-–]?\s*(\d{{4}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:BA)?\s*[-–]?\s*(\d{{5}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:RS)?\s*[-–]?\s*(\d{{5}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:ME)?\s*[-–]?\s*(\d{{5}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:MK)?\s*[-–]?\s*(\d{{4}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:AL)?\s*[-–]?\s*(\d{{4}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:GR)?\s*[-–]?\s*(\d{{3}}\s?\d{{2}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:CY)?\s*[-–]?\s*(\d{{4}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:PL)?\s*[-–]?\s*(\d{{2}}-\d{{3}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:CZ)?\s*[-–]?\s*(\d{{3}}\s?\d{{2}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:SK)?\s*[-–]?\s*(\d{{3}}\s?\d{{2}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:HU|H)?\s*[-–]?\s*(\d{{4}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:RO)?\s*[-–]?\s*(\d{{6}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:BG)?\s*[-–]?\s*(\d{{4}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:EE)?\s*[-–]?\s*(\d{{5}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:LV)?\s*[-–]?\s*(\d{{4}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:LT)?\s*[-–]?\s*(\d{{5}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:UA)?\s*[-–]?\s*(\d{{5}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:BY)?\s*[-–]?\s*(\d{{6}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:MD)?\s*[-–]?\s*(?:MD-)?(\d{{4}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
-            rf"\b(?:TR)?\s*[-–]?\s*(\d{{5}})\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b",
+            patt if prefixes is None else
+            rf"\b(?:{'|'.join(prefixes)})?\s*[-–]?\s*{patt}\s+{self.CITY_OR_DISTRICT}{self.PAREN_DISTRICT}\b"
+            for _country, prefixes, patt in self.POSTAL_EU_FORMATS
         ]
+        # Compiled once for _scan_postal_codes: (country, code format or None, regex). A "<code> <City>"
+        # rule can only start at a word boundary followed by <=2 prefix chars, separators and a digit.
+        self.POSTAL_EU_RXS = [
+            (country, None if prefixes is None else code, re.compile(patt, re.I | re.UNICODE))
+            for (country, prefixes, code), patt in zip(self.POSTAL_EU_FORMATS, self.POSTAL_EU_PATTERNS)
+        ]
+        self.POSTAL_ANCHOR_RX = re.compile(r"\b(?=\w{0,2}[\s\-–]*(?:MD-)?\d)", re.I | re.UNICODE)
+        # Anchor at a digit/separator: one regex per code format stands in for all its rules.
+        # Anchor at a letter: only rules with a prefix starting with it (None -> non-ASCII, try all).
+        code_rxs, prefix_rules = {}, {None: []}
+        for k, (country, code, rx) in enumerate(self.POSTAL_EU_RXS):
+            if code is None:
+                continue
+            code_rxs.setdefault(code, rx)
+            prefix_rules[None].append(k)
+            firsts = {pfx[0] for pfx in self.POSTAL_EU_FORMATS[k][1]} | ({"M"} if code.startswith("(?:MD-)") else set())
+            for ch in firsts:
+                prefix_rules.setdefault(ch, []).append(k)
+        by_len = {}
+        for code, rx in code_rxs.items():
+            for n in _postal_run_lengths(code) or (None,):
+                by_len.setdefault(n, []).append((code, rx))
+        any_len = by_len.pop(None, [])
+        self.POSTAL_CODE_RXS_BY_LEN = {n: tuple(rxs + any_len) for n, rxs in by_len.items()}
+        self.POSTAL_CODE_RXS_ANY_LEN = tuple(any_len)
+        self.POSTAL_RUN_RX = re.compile(r"[\s\-–]*(?:MD-)?(\d+)", re.I | re.UNICODE)
+        self.POSTAL_PREFIX_RULES = {ch: tuple(ids) for ch, ids in prefix_rules.items()}
 
         # Phone (precompiled; no inline flags) - stricter to avoid matching TAX IDs
         self.PHONE_REGEX = r"""
@@ -615,6 +2401,16 @@ class PIIFilter:
             (r"\b(\d{8})\b", "mt_vat_unlabeled"),
             (r"\b(\d{8})\b", "lu_vat_unlabeled"),
         ]
+        # Compiled once here instead of re.finditer(patt, ...) per call (also lets PatternProfiler wrap them)
+        self.ID_RXS = [(re.compile(patt, re.I | re.UNICODE), name) for patt, name in self.ID_PATTERNS]
+        self.TAX_RXS_STRICT = [(re.compile(patt, re.I | re.UNICODE), name) for patt, name in self.TAX_PATTERNS_STRICT]
+        self.TAX_RXS_LOOSE = [(re.compile(patt, re.I | re.UNICODE), name) for patt, name in self.TAX_PATTERNS_LOOSE]
+        self.DATE_RXS = [
+            re.compile(patt, re.I | re.UNICODE)
+            for patt in (self.DATE_REGEX_1, self.DATE_REGEX_2, self.DATE_REGEX_3, self.DATE_REGEX_4, self.DATE_REGEX_5)
+        ]
+        self.US_PASSPORT_RX = re.compile(self.US_PASSPORT_REGEX)
+        self.EU_PASSPORT_RX = re.compile(self.EU_PASSPORT_REGEX)
 
         # EORI — explicitly labeled forms (e.g., 'EORI: DE123456789000' or 'EORI DE123456789')
         # We'll match a two-letter country code followed by 6-20 alphanumeric/ dash characters
@@ -823,6 +2619,8 @@ class PIIFilter:
             r"(?:[A-Z0-9]{2,4}[\s\-]?)?(?=[A-Z0-9]*\d)[A-Z0-9]{4,20}",
             re.UNICODE | re.MULTILINE | re.IGNORECASE
         )
+        # Labeled customer name: 'Customer Name: John Smith' (name in group 1)
+        self.CUSTOMER_NAME_LABEL_RX = re.compile(r"(?i)\bcustomer\s+name\s*[:#\-]\s*([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3})")
 
         # TICKET_ID: Labeled ticket/issue/task identifiers (multilingual)
         self.TICKET_ID_RX = re.compile(
@@ -849,6 +2647,7 @@ class PIIFilter:
             r")"
         )
         self.IPV6_REGEX = r"(?i)(?<![A-F0-9:])" + ipv6_core + r"(?![A-F0-9:])"
+        self.IP_RXS = [re.compile(patt, re.I | re.UNICODE) for patt in (self.IPV4_REGEX, self.IPV6_REGEX)]
 
         # PERSON intros (limit to max 2 tokens capture)
 
@@ -1165,6 +2964,8 @@ class PIIFilter:
             rf"(?i)\b{card_labels}(?:\s*(?:[:#\-]?\s*|(?:is|ist)\s+))(([0-9][0-9 \-]{{11,25}}[0-9]))",
             re.UNICODE
         )
+        # Unlabeled card number candidates (13-20 digits, single spaces/hyphens); Luhn is checked by the caller
+        self.CC_CANDIDATE_RX = re.compile(r"(?:(?<!\w)(?:\d[ -]?){13,19}\d(?!\w))", re.I | re.UNICODE)
         self.ROUTING_RX = re.compile(r"(?<!\d)(\d{9})(?!\d)")
         self.ACCT_LABEL_RX = re.compile(
             rf"(?i)\b(?:{bank_labels})(?:[:#\-]\s*|\s+(?:is|ist)\s+|\s+)([A-Z0-9][A-Z0-9 \-]{{6,34}})",
@@ -1229,6 +3030,13 @@ class PIIFilter:
             (re.compile(patt, re.UNICODE), name)
             for patt, name in self.API_KEY_PROVIDER_PATTERNS
         ]
+        # Provider-specific labeled keys (value in group 1)
+        self.SLACK_TOKEN_LABEL_RX = re.compile(r"(?i)\bslack[_\s-]*(?:api_?)?token\s*[:=]\s*([A-Za-z0-9_\-]{12,})")
+        self.STRIPE_KEY_LABEL_RX = re.compile(r"(?i)(?:stripe[_\s-]*)?(?:secret|public)[_\s-]*key\s*[:=]\s*([a-z0-9_]{16,})")
+        self.CLOUDFLARE_TOKEN_LABEL_RX = re.compile(r"(?i)\bcloudflare[_\s-]*(?:api_?)?token\s*[:=]\s*([a-z0-9]{32,})")
+        self.PROVIDER_API_KEY_LABEL_RX = re.compile(
+            r"(?i)\b(?:google|azure|github|sendgrid|mailchimp|twilio|digitalocean|firebase|openai|stripe|aws)[_\s-]*(?:api[_-]?)?key\s*[:=]\s*([A-Za-z0-9._\-+/=]{12,})"
+        )
 
         # Session, Access Token, Refresh Token patterns
         # ORDER MATTERS - more specific patterns should come first
@@ -1257,6 +3065,8 @@ class PIIFilter:
         ]
         # Compile Token patterns
         self.TOKEN_RXS = [(re.compile(patt, re.UNICODE), name) for patt, name in self.TOKEN_PATTERNS]
+        # Long key-like runs, entropy-checked by _looks_like_api_key after the token detectors
+        self.API_KEY_CANDIDATE_RX = re.compile(r"\b[A-Za-z0-9._\-+/=]{28,}\b")
         # Crypto patterns
         self.CRYPTO_BTC_LEGACY = re.compile(r"\b[13][a-km-zA-HJ-NP-Z1-9]{26,33}\b")
         self.CRYPTO_BTC_BECH32 = re.compile(r"\b(?:bc1)[0-9a-z]{11,71}\b")
@@ -1290,7 +3100,8 @@ class PIIFilter:
 
         self.FAX_LABEL_RX = re.compile(r"(?i)\bfax(?:nummer)?\b[:\s\-]*")
         # Email detection (used to prevent partial replacements inside email addresses)
-        self.EMAIL_RX = re.compile(r"[\w\.\-+%]+@[\w\.\-]+\.[A-Za-z]{2,}", re.IGNORECASE)
+        # Local part capped at RFC 5321's 64 chars: uncapped, every start in a long '@'-less run rescanned it
+        self.EMAIL_RX = re.compile(r"[\w\.\-+%]{1,64}@[\w\.\-]+\.[A-Za-z]{2,}", re.IGNORECASE)
 
         # Devices/Network
         self.MAC_RX = re.compile(r"\b(?:[0-9A-F]{2}[:-]){5}[0-9A-F]{2}\b|\b[0-9A-F]{12}\b", re.IGNORECASE)
@@ -1315,9 +3126,24 @@ class PIIFilter:
     # ====================
     # Analyzer setup
     # ====================
-    def _setup_analyzer(self):
+    def _setup_analyzer(self, snapshot=None):
         from presidio_analyzer import RecognizerRegistry
-        self.analyzer = AnalyzerEngine(registry=RecognizerRegistry(recognizers=[]))
+        if self.nlp_engine_name == "pattern":
+            # No spaCy model is loaded; seed the registry with the only predefined recognizer that
+            # contributes ALLOWED_ENTITIES without NER (EmailRecognizer), so the default set is never built.
+            from presidio_analyzer.predefined_recognizers import EmailRecognizer
+            self.analyzer = AnalyzerEngine(
+                registry=RecognizerRegistry(recognizers=[EmailRecognizer()]),
+                nlp_engine=PatternOnlyNlpEngine(),
+            )
+        else:
+            # Models load on first use per language (LazySpacyNlpEngine), not here
+            langs = list(self.spacy_models)
+            self.analyzer = AnalyzerEngine(
+                registry=RecognizerRegistry(recognizers=[], supported_languages=langs),
+                nlp_engine=LazySpacyNlpEngine(self.spacy_models, exclude=self.spacy_exclude),
+                supported_languages=langs,
+            )
         self.anonymizer = AnonymizerEngine()
         
         # Remove conflicting default recognizers, keep only the ones we want
@@ -1325,7 +3151,23 @@ class PIIFilter:
             r for r in self.analyzer.registry.recognizers 
             if r.name in ['DateRecognizer', 'EmailRecognizer', 'UrlRecognizer', 'SpacyRecognizer']
         ]
+        for r in self.analyzer.registry.recognizers:
+            if r.name == "EmailRecognizer":
+                r.patterns = [Pattern(p.name, _EMAIL_RECOGNIZER_REGEX, p.score) for p in r.patterns]
+
+        if snapshot is not None:
+            # from_dict replaces the "patterns" entry, so hand it a copy
+            recognizers = [PatternRecognizer.from_dict(dict(d)) for d in snapshot["recognizers"]]
+        else:
+            recognizers = self._build_pattern_recognizers()
+        for rec in recognizers:
+            self.analyzer.registry.add_recognizer(rec)
+
+        # Note: CREDIT_CARD and BANK_ACCOUNT are validated via custom injections
+        # (Luhn / IBAN checks) in _inject_custom_matches to avoid high-recall base-regex false positives.
 
+    def _build_pattern_recognizers(self):
+        """Custom PatternRecognizers registered next to Presidio's defaults, in registration order."""
         self.address_recognizer = PatternRecognizer(
             supported_entity="ADDRESS", supported_language="all",
             patterns=[Pattern("strict_address", self.STRICT_ADDRESS_REGEX, 1.0)],
@@ -1470,16 +3312,12 @@ class PIIFilter:
             ),
         ]
 
-        for rec in [
+        return [
             self.address_recognizer, self.phone_recognizer, self.date_recognizer,
             self.passport_recognizer, self.id_recognizer, self.ip_recognizer,
             self.mac_recognizer, self.imei_recognizer,
             self.health_recognizer, self.plate_recognizer
-        ] + additional_recognizers:
-            self.analyzer.registry.add_recognizer(rec)
-
-        # Note: CREDIT_CARD and BANK_ACCOUNT are validated via custom injections
-        # (Luhn / IBAN checks) in _inject_custom_matches to avoid high-recall base-regex false positives.
+        ] + additional_recognizers
 
     # ====================
     # Person helpers
@@ -1492,7 +3330,8 @@ class PIIFilter:
                 return span[off:], off
         return span, 0
 
-    def _plausible_person(self, span: str, text: str, start: int):
+    def _plausible_person(self, span: str, text: str, start: int, ctx=None):
+        ctx = ctx or self._analysis_context(text)
         s = span.strip()
         if not s:
             return False
@@ -1530,7 +3369,7 @@ class PIIFilter:
         # If an intro cue precedes this span, prefer PERSON even if the first token looks like a street word
 
 
-        if self._has_intro_prefix(text, start):
+        if self._has_intro_prefix(text, start, ctx=ctx):
             # do not accept if tokens contain identity/tax/passport labels
             label_guard = ({kw.lower() for kw in self.ID_KEYWORDS}
                         | {kw.lower() for kw in self.TAX_KEYWORDS}
@@ -1541,7 +3380,7 @@ class PIIFilter:
             else:
                 # accept only if intro is very close and same sentence (no prior .?!)
                 left_ctx = text[max(0, start - 40):start]
-                if any(cue in left_ctx.lower() for cue in self.INTRO_CUES):
+                if ctx.has("INTRO_CUES", start - 40, start):
                     punct_break = re.search(r"[\.!?]", left_ctx)
                     if not punct_break or punct_break.end() < len(left_ctx) - 20:
                         if tokens and low[-1] not in self.STREET_BLOCKERS \
@@ -1550,7 +3389,7 @@ class PIIFilter:
         
 
         if re.search(r"(?i)\bich\s+bin\s*$", text[max(0, start - 12):start]):
-            right = text[start:min(len(text), start + 20)].lower()
+            right = ctx.window(start, start + 20)
             if re.match(r"(und|habe|hab|heute|sehr|einfach|beschäftigt|gemacht)\b", right):
                 return False
 
@@ -1569,8 +3408,7 @@ class PIIFilter:
             # If there are Latin-script tokens, require at least one capitalized Latin token
             #  skip capitalization rule when introduced by cue ---
             if latin_tokens and not any(t[0].isupper() for t in latin_tokens):
-                left_ctx = text[max(0, start - 40):start].lower()
-                if not any(cue in left_ctx for cue in self.INTRO_CUES):
+                if not ctx.has("INTRO_CUES", start - 40, start):
                     return False
             
 
@@ -1618,7 +3456,7 @@ class PIIFilter:
                 return False
 
             # Accept if clearly introduced ("my name is Anna")
-            if self._has_intro_prefix(text, start):
+            if self._has_intro_prefix(text, start, ctx=ctx):
                 return True
             # Accept if immediately preceded by a title (Herr/Frau/Dr/Mr/etc.)
             left = text[max(0, start - 40):start]
@@ -1628,21 +3466,19 @@ class PIIFilter:
         
         
         # 🚫 single-token near street word? Drop
-        left_ctx = text[max(0, start - 24):start].lower()
-        prefix = text[max(0, start - 40):start].lower()
+        cue_before = ctx.has("INTRO_CUES", start - 40, start)
         # If there is an intro cue immediately before the span, allow PERSON even if it contains a street token
-        if any(sb in left_ctx for sb in self.STREET_BLOCKERS) and not any(cue in prefix for cue in self.INTRO_CUES):
+        if ctx.has("STREET_BLOCKERS", start - 24, start) and not cue_before:
             return False
 
         # 
         # intro cue check (if present, we'll accept a person span)
         # BUT: only if the span is close to the intro cue (within ~20 chars) to avoid false positives
         # where an intro cue appears much earlier but is followed by unrelated text
-        if any(cue in prefix for cue in self.INTRO_CUES):
+        if cue_before:
             # Check if the intro cue is CLOSE (recent) - within last 20 characters
             # This filters out cases like "mein name ist Frank Verz, [20+ chars later] Gewerbe"
-            close_prefix = text[max(0, start - 20):start].lower()
-            if any(cue in close_prefix for cue in self.INTRO_CUES):
+            if ctx.has("INTRO_CUES", start - 20, start):
                 # Intro cue is very close, likely directly connected to this span - accept it
                 return True
             else:
@@ -1650,7 +3486,7 @@ class PIIFilter:
                 # For multi-token spans, be extra conservative and don't accept
                 if len(tokens) > 1:
                     # Check for context-breaking words that confirm this isn't a name
-                    intervening = text[max(0, start - 40):start + 15].lower()
+                    intervening = ctx.window(start - 40, start + 15)
                     context_breakers = {
                         "möchte", "kann", "werde", "würde", "habe", "hab", "bin", "ist", "sind", "hat", "had", "have",
                         "für", "von", "zu", "zum", "zur", "auf", "bei", "mit", "ohne",
@@ -1689,20 +3525,21 @@ class PIIFilter:
                 return True
         return False
 
-    def _inject_name_intro_persons(self, text, results):
+    def _inject_name_intro_persons(self, text, results, ctx=None):
+        ctx = ctx or self._analysis_context(text)
         add = []
         for rx in self.INTRO_PATTERNS:
-            for m in rx.finditer(text):
+            for m in ctx.finditer(rx):
                 s, e = m.start(1), m.end(1)
                 span = text[s:e]
-                if self._plausible_person(span, text, s):
+                if self._plausible_person(span, text, s, ctx):
                     add.append(RecognizerResult("PERSON", s, e, 0.96))
-        return self._resolve_overlaps(text, results + add) if add else results
+        return self._resolve_overlaps(text, results + add, ctx) if add else results
 
-    def _has_intro_prefix(self, text: str, start: int, window: int = 48) -> bool:
+    def _has_intro_prefix(self, text: str, start: int, window: int = 48, ctx=None) -> bool:
         """Heuristic: is there an intro cue immediately before this span?"""
-        prefix = text[max(0, start - window):start].lower()
-        return any(cue in prefix for cue in self.INTRO_CUES)
+        ctx = ctx or self._analysis_context(text)
+        return ctx.has("INTRO_CUES", start - window, start)
     
     def _looks_like_name_token(self, token: str) -> bool:
             """
@@ -1724,11 +3561,11 @@ class PIIFilter:
             return True
     
 
-    def _effective_priority(self, text: str, r) -> int:
+    def _effective_priority(self, text: str, r, ctx=None) -> int:
         """Bump PERSON priority above ADDRESS if preceded by an intro cue."""
         base = self.PRIORITY.get(r.entity_type, 1)
         if r.entity_type == "PERSON":
-            if self._has_intro_prefix(text, r.start):
+            if self._has_intro_prefix(text, r.start, ctx=ctx):
                 # Make PERSON outrank ADDRESS (8) when intro precedes the span
                 return max(base, 9)
         return base
@@ -1736,7 +3573,8 @@ class PIIFilter:
     # ====================
     # Overlaps / filters
     # ====================
-    def _resolve_overlaps(self, text, items):
+    def _resolve_overlaps(self, text, items, ctx=None):
+        ctx = ctx or self._analysis_context(text)
         # Sort by score desc, priority desc, span length desc so stronger/higher-priority
         # recognizers are considered first.
         items = sorted(
@@ -1747,57 +3585,67 @@ class PIIFilter:
                 -(r.end - r.start),
             ),
         )
-        kept = []
+        # Kept spans sorted by (start, insertion seq). A kept span overlapping r starts in
+        # (r.start - longest, r.end), so only that window is scanned; among the overlaps the
+        # earliest-kept one decides, exactly like walking the kept list in insertion order.
+        keys, kept = [], []
+        seq = itertools.count()
+        longest = 0
+        eff = {}
+
+        def priority(x):
+            p = eff.get(id(x))
+            if p is None:
+                p = eff[id(x)] = self._effective_priority(text, x, ctx)
+            return p
+
+        def keep(x):
+            nonlocal longest
+            key = (x.start, next(seq))
+            i = bisect.bisect_left(keys, key)
+            keys.insert(i, key)
+            kept.insert(i, x)
+            longest = max(longest, x.end - x.start)
+
+        def drop(i):
+            del keys[i], kept[i]
+
         for r in items:
-            conflict = False
-            for k in list(kept):
-                if not (r.end <= k.start or r.start >= k.end):
-                    pr = self._effective_priority(text, r)
-                    pk = self._effective_priority(text, k)
-
-                    # Special-case: prefer PHONE_NUMBER over FAX_NUMBER unless 'fax' explicitly appears near the span
-                    if {r.entity_type, k.entity_type} == {"FAX_NUMBER", "PHONE_NUMBER"}:
-                        # Check for explicit 'fax' token in a small neighborhood
-                        left = text[max(0, min(r.start, k.start) - 24):min(r.start, k.start)].lower()
-                        right = text[max(r.end, k.end):min(len(text), max(r.end, k.end) + 24)].lower()
-                        if ("fax" in left) or ("fax" in right):
-                            # Let standard scoring/priority decide when an explicit 'fax' label exists
-                            pass
-                        else:
-                            # Prefer PHONE_NUMBER (drop FAX)
-                            if r.entity_type == "FAX_NUMBER":
-                                # existing kept item wins (we drop r)
-                                conflict = True
-                                break
-                            else:
-                                # r is PHONE_NUMBER and should replace k (FAX)
-                                try:
-                                    kept.remove(k)
-                                except ValueError:
-                                    pass
-                                kept.append(r)
-                                conflict = True
-                                break
+            lo = bisect.bisect_left(keys, (r.start - longest + 1,))
+            hi = bisect.bisect_left(keys, (r.end,))
+            first = None
+            for i in range(lo, hi):
+                k = kept[i]
+                if not (r.end <= k.start or r.start >= k.end) and (first is None or keys[i][1] < keys[first][1]):
+                    first = i
+            if first is None:
+                keep(r)
+                continue
+            k = kept[first]
+
+            # Special-case: prefer PHONE_NUMBER over FAX_NUMBER unless 'fax' explicitly appears near the span
+            if {r.entity_type, k.entity_type} == {"FAX_NUMBER", "PHONE_NUMBER"}:
+                # Check for explicit 'fax' token in a small neighborhood
+                left = ctx.window(min(r.start, k.start) - 24, min(r.start, k.start))
+                right = ctx.window(max(r.end, k.end), max(r.end, k.end) + 24)
+                if not (("fax" in left) or ("fax" in right)):
+                    # Prefer PHONE_NUMBER (drop FAX): r is PHONE_NUMBER and replaces k (FAX),
+                    # otherwise the existing kept item wins
+                    if r.entity_type == "PHONE_NUMBER":
+                        drop(first)
+                        keep(r)
+                    continue
+                # Let standard scoring/priority decide when an explicit 'fax' label exists
 
-                    # If r has strictly higher score or higher effective priority, replace k
-                    if (r.score > k.score) or (r.score == k.score and pr > pk) or (
-                        r.score == k.score and pr == pk and (r.end - r.start) > (k.end - k.start)
-                    ):
-                        # remove k and keep r (r is stronger)
-                        try:
-                            kept.remove(k)
-                        except ValueError:
-                            pass
-                        kept.append(r)
-                        conflict = True
-                        break
-                    else:
-                        # existing kept item wins -> drop r
-                        conflict = True
-                        break
-            if not conflict:
-                kept.append(r)
-        return sorted(kept, key=lambda x: x.start)
+            pr, pk = priority(r), priority(k)
+            # If r has strictly higher score or higher effective priority, replace k
+            if (r.score > k.score) or (r.score == k.score and pr > pk) or (
+                r.score == k.score and pr == pk and (r.end - r.start) > (k.end - k.start)
+            ):
+                drop(first)
+                keep(r)
+            # else: existing kept item wins -> drop r
+        return kept
 
     def _demote_phone_over_date(self, text, items):
         dates = [(r.start, r.end) for r in items if r.entity_type == "DATE"]
@@ -1829,39 +3677,42 @@ class PIIFilter:
             out.append(r)
         return out
 
-    def _promote_meeting_over_phone(self, text, items, window: int = 20):
+    def _promote_meeting_over_phone(self, text, items, window: int = 20, ctx=None):
+        ctx = ctx or self._analysis_context(text)
         out = []
         for r in items:
             if r.entity_type == "PHONE_NUMBER":
-                left = text[max(0, r.start - window):r.start].lower()
-                right = text[r.end:min(len(text), r.end + window)].lower()
+                left = ctx.window(r.start - window, r.start)
+                right = ctx.window(r.end, r.end + window)
                 if "meeting id" in left or "meeting id" in right:
                     out.append(RecognizerResult("MEETING_ID", r.start, r.end, max(0.90, r.score)))
                     continue
             out.append(r)
-        return self._resolve_overlaps(text, out)
+        return self._resolve_overlaps(text, out, ctx)
 
-    def _filter_label_leading_locations(self, text, items):
+    def _filter_label_leading_locations(self, text, items, ctx=None):
+        ctx = ctx or self._analysis_context(text)
         tail_keywords = set(self.PASSPORT_KEYWORDS) | set(self.ID_KEYWORDS) | set(self.TAX_KEYWORDS)
         out = []
         for r in items:
             if r.entity_type == "LOCATION":
-                tail = text[r.end:r.end + 24].lower()
+                tail = ctx.window(r.end, r.end + 24)
                 tail = re.sub(r"^[\s:,\-\–\—\|]+", "", tail)
                 if any(tail.startswith(k) for k in tail_keywords):
                     continue
             out.append(r)
         return out
 
-    def _filter_label_adjacent_locations(self, text, items, window: int = 26):
+    def _filter_label_adjacent_locations(self, text, items, window: int = 26, ctx=None):
+        ctx = ctx or self._analysis_context(text)
         label_tokens = set(self.PASSPORT_KEYWORDS) | set(self.ID_KEYWORDS) | set(self.TAX_KEYWORDS)
         out = []
         for r in items:
             if r.entity_type != "LOCATION":
                 out.append(r)
                 continue
-            left = text[max(0, r.start - window):r.start].lower()
-            right = text[r.end:min(len(text), r.end + window)].lower()
+            left = ctx.window(r.start - window, r.start)
+            right = ctx.window(r.end, r.end + window)
             left_norm = re.sub(r"[\s:,\-–—\|]+$", " ", left)
             right_norm = re.sub(r"^[\s:,\-–—\|]+", " ", right)
             if any(kw in left_norm for kw in label_tokens) or any(kw in right_norm for kw in label_tokens):
@@ -1921,13 +3772,13 @@ class PIIFilter:
             # Digit inside LOCATION span?
             has_digit = any(ch.isdigit() for ch in span_text)
 
-            # Validate as EU postal?
+            # Validate as EU postal? (postal injections already carry the matching country rules)
             is_postal = False
             if has_digit:
-                for patt in self.POSTAL_EU_PATTERNS:
-                    if re.search(patt, span_text, flags=re.I | re.UNICODE):
-                        is_postal = True
-                        break
+                if (r.recognition_metadata or {}).get("postal_countries"):
+                    is_postal = True
+                else:
+                    is_postal = any(rx.search(span_text) for _country, _code, rx in self.POSTAL_EU_RXS)
 
             # Keep LOCATION if EU postal (correct)
             if has_digit and is_postal:
@@ -2068,10 +3919,11 @@ class PIIFilter:
             out.append(r)
         return out
 
-    def _guard_requires_context(self, text: str, items, keywords: tuple, window: int):
+    def _guard_requires_context(self, text: str, items, keyword_class: str, window: int, ctx=None):
+        """Drop ADDRESS spans without a digit unless a keyword of ``keyword_class`` is within ``window`` chars."""
         if not items:
             return items
-        lower = text.lower()
+        ctx = ctx or self._analysis_context(text)
         out = []
         for r in items:
             if r.entity_type == "ADDRESS":
@@ -2079,13 +3931,18 @@ class PIIFilter:
                 if not re.search(r"\d", span):
                     left = max(0, r.start - window)
                     right = min(len(text), r.end + window)
-                    ctx = lower[left:right]
-                    if not any(k in ctx for k in keywords):
+                    if ctx.lower is None:
+                        # text.lower() does not line up with text here; slice it at the same offsets as always
+                        near = text.lower()[left:right]
+                        found = any(k in near for k in ctx.automaton.classes[keyword_class])
+                    else:
+                        found = ctx.has(keyword_class, left, right)
+                    if not found:
                         continue
             out.append(r)
         return out
 
-    def _trim_address_spans(self, text, items):
+    def _trim_address_spans(self, text, items, ctx=None):
         """Trim ADDRESS spans at first newline or before label words to avoid bleed."""
         label_stops = re.compile(r"(?i)\b(email|e-mail|mail|meine|la mia email|mon email|adresse|für|gründung|unternehmen)\b")
         multiline_addr = re.compile(r"(?i)(?:nr\.?|no\.?|number|nummer|num)\s*:?\s*\d|(?:plz\/ort|plz|postal|city|stadt|ort)", re.MULTILINE)
@@ -2131,7 +3988,7 @@ class PIIFilter:
                 out.append(RecognizerResult("ADDRESS", s, s + len(trimmed), r.score))
             else:
                 out.append(r)
-        return self._resolve_overlaps(text, out)
+        return self._resolve_overlaps(text, out, ctx)
 
     def _filter_idnumber_false_positives(self, text, items):
         out = []
@@ -2149,22 +4006,20 @@ class PIIFilter:
             out.append(r)
         return out
 
-    def _span_inside_email(self, text: str, s: int, e: int) -> bool:
+    def _span_inside_email(self, text: str, s: int, e: int, ctx=None) -> bool:
         """Return True if the span [s,e) is fully contained within an email address in the text."""
-        for m in re.finditer(r"[\w\.\-+%]+@[\w\.\-]+\.[A-Za-z]{2,}", text):
-            if m.start() <= s and m.end() >= e:
-                return True
-        return False
+        return (ctx or self._analysis_context(text)).inside_email(s, e)
 
-    def _promote_phone_to_account_if_labeled(self, text: str, items):
+    def _promote_phone_to_account_if_labeled(self, text: str, items, ctx=None):
         """Promote PHONE_NUMBER spans to ACCOUNT_NUMBER when immediately preceded by a bank/account label.
         This handles cases like 'Kontonummer: 1234-567890-12' where the labeled numeric should be an account.
         """
+        ctx = ctx or self._analysis_context(text)
         out = []
         bank_label_rx = re.compile(r"\b(?:iban|bic|swift|account(?:\s*no\.? )?|acct|acct\.?|konto(?:nummer)?|kontonr|kontonummer|bank|konto|rib|bban)\b", re.I)
         for r in items:
             if r.entity_type == 'PHONE_NUMBER':
-                left = text[max(0, r.start - 28):r.start].lower()
+                left = ctx.window(r.start - 28, r.start)
                 if bank_label_rx.search(left):
                     digits = re.sub(r"\D", "", text[r.start:r.end])
                     if len(digits) >= 6:
@@ -2251,6 +4106,56 @@ class PIIFilter:
     def _geo_in_bounds(lat: float, lon: float) -> bool:
         return -90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0
 
+    def _scan_postal_codes(self, text: str):
+        """
+        Single-pass equivalent of re.finditer over every POSTAL_EU_PATTERNS entry.
+
+        Returns {(start, end): [countries]} in the order the per-pattern loops first produced each span.
+        "<code> <City>" rules are only tried at POSTAL_ANCHOR_RX positions (one scan of the text). Where no
+        country prefix can start, the attempt is shared by all rules with the same code format (e.g. the
+        13 five-digit countries); at letters only rules whose prefix starts with that letter are tried.
+        """
+        shared = {}  # code format -> [(start, end)] at digit/separator anchors
+        own = {}     # rule index -> [(start, end)] at letter anchors (prefix matches)
+        for a in self.POSTAL_ANCHOR_RX.finditer(text):
+            i = a.start()
+            c = text[i]
+            if c.isdecimal() or c.isspace() or c in "-–":
+                run = len(self.POSTAL_RUN_RX.match(text, i).group(1))
+                for code, rx in self.POSTAL_CODE_RXS_BY_LEN.get(run, self.POSTAL_CODE_RXS_ANY_LEN):
+                    m = rx.match(text, i)
+                    if m:
+                        shared.setdefault(code, []).append((i, m.end()))
+            else:
+                rules = self.POSTAL_PREFIX_RULES.get(c.upper(), ()) if c.isascii() else self.POSTAL_PREFIX_RULES[None]
+                for k in rules:
+                    m = self.POSTAL_EU_RXS[k][2].match(text, i)
+                    if m:
+                        own.setdefault(k, []).append((i, m.end()))
+
+        def replay(hits):
+            # finditer order: next match is the first hit at/after the previous match end
+            seq, pos = [], 0
+            for i, end in hits:
+                if i >= pos:
+                    seq.append((i, end))
+                    pos = end
+            return seq
+
+        spans, replayed = {}, {}
+        for k, (country, code, rx) in enumerate(self.POSTAL_EU_RXS):
+            if code is None:
+                seq = [m.span() for m in rx.finditer(text)]
+            elif k in own:
+                seq = replay(sorted(shared.get(code, []) + own[k]))
+            else:
+                if code not in replayed:
+                    replayed[code] = replay(shared.get(code, []))
+                seq = replayed[code]
+            for span in seq:
+                spans.setdefault(span, []).append(country)
+        return spans
+
     def _looks_like_api_key(self, token: str) -> bool:
         """Generic unseen-provider API key detector."""
         if len(token) < 28:
@@ -2277,28 +4182,45 @@ class PIIFilter:
     # ====================
     # CUSTOM INJECTIONS
     # ====================
-    def _inject_custom_matches(self, text, results):
-        add = []
+    def _inject_custom_matches(self, text, results, detect=None, ctx=None):
+        # detect: entity types to look for (see _entity_selection); None runs every family
+        ctx = ctx or self._analysis_context(text)
+        def want(*types):
+            return detect is None or not detect.isdisjoint(types)
+
+        def add_families(table):
+            # One combined scan for the table's families that are wanted and whose labels occur
+            rows = [row for row in getattr(self, table) if want(row[1]) and ctx.may_match(getattr(self, row[0]))]
+            found = self.family_unions[table].scan(text, [name for name, _, _ in rows])
+            for name, entity_type, score in rows:
+                for m in found[name]:
+                    s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
+                    add.append(RecognizerResult(entity_type, s, e, score))
+
+        add = _IndexedResults()
 
         # Precompute validated IBAN/BIC spans so other detectors (e.g., CREDIT_CARD) won't hijack parts
+        # (only the card scan reads them; empty when it doesn't run)
         validated_iban_spans = []
-        for m in self.IBAN_RX.finditer(text):
-            try:
-                if self._iban_ok(m.group()):
-                    validated_iban_spans.append((m.start(), m.end()))
-            except Exception:
-                pass
         validated_bic_spans = []
-        for m in self.BIC_RX.finditer(text):
-            try:
-                if m.group(2) in self.ISO_COUNTRIES:
-                    validated_bic_spans.append((m.start(), m.end()))
-            except Exception:
-                pass
+        if want("CREDIT_CARD"):
+            for m in ctx.finditer(self.IBAN_RX):
+                try:
+                    if self._iban_ok(m.group()):
+                        validated_iban_spans.append((m.start(), m.end()))
+                except Exception:
+                    pass
+            for m in ctx.finditer(self.BIC_RX):
+                try:
+                    if m.group(2) in self.ISO_COUNTRIES:
+                        validated_bic_spans.append((m.start(), m.end()))
+                except Exception:
+                    pass
 
         # Emails — inject early so other matches can't replace parts of addresses/domains
-        for m in self.EMAIL_RX.finditer(text):
-            add.append(RecognizerResult("EMAIL_ADDRESS", m.start(), m.end(), 1.0))
+        if want("EMAIL_ADDRESS", "ADDRESS", "LOCATION", "BANK_ACCOUNT", "ACCOUNT_NUMBER"):
+            for m in ctx.finditer(self.EMAIL_RX):
+                add.append(RecognizerResult("EMAIL_ADDRESS", m.start(), m.end(), 1.0))
 
         # ============================================================
         # EARLY API KEY DETECTION — PROVIDER KEYS + api_key=
@@ -2306,58 +4228,57 @@ class PIIFilter:
         # ============================================================
 
         # --- Provider patterns (AWS, GitHub, OpenAI, Cloudflare, Slack…) ---
-        for rx, name in self.API_KEY_PROVIDER_RXS:
-            for m in rx.finditer(text):
-                s, e = m.start(), m.end()
-                # Use capturing groups if available
-                if m.lastindex:
-                    s, e = m.start(1), m.end(1)
-                add.append(RecognizerResult("API_KEY", s, e, 1.20))
-
-        # --- Provider-specific labeled patterns (more targeted) ---
-        # Slack labeled patterns
-        for m in re.finditer(r"(?i)\bslack[_\s-]*(?:api_?)?token\s*[:=]\s*([A-Za-z0-9_\-]{12,})", text):
-            s, e = m.start(1), m.end(1)
-            add.append(RecognizerResult("API_KEY", s, e, 1.19))
+        if want("API_KEY"):
+            for rx, name in self.API_KEY_PROVIDER_RXS:
+                for m in ctx.finditer(rx):
+                    s, e = m.start(), m.end()
+                    # Use capturing groups if available
+                    if m.lastindex:
+                        s, e = m.start(1), m.end(1)
+                    add.append(RecognizerResult("API_KEY", s, e, 1.20))
+
+            # --- Provider-specific labeled patterns (more targeted) ---
+            # Slack labeled patterns
+            for m in ctx.finditer(self.SLACK_TOKEN_LABEL_RX):
+                s, e = m.start(1), m.end(1)
+                add.append(RecognizerResult("API_KEY", s, e, 1.19))
         
-        # Stripe labeled patterns
-        for m in re.finditer(r"(?i)(?:stripe[_\s-]*)?(?:secret|public)[_\s-]*key\s*[:=]\s*([a-z0-9_]{16,})", text):
-            s, e = m.start(1), m.end(1)
-            add.append(RecognizerResult("API_KEY", s, e, 1.19))
+            # Stripe labeled patterns
+            for m in ctx.finditer(self.STRIPE_KEY_LABEL_RX):
+                s, e = m.start(1), m.end(1)
+                add.append(RecognizerResult("API_KEY", s, e, 1.19))
         
-        # Cloudflare labeled patterns
-        for m in re.finditer(r"(?i)\bcloudflare[_\s-]*(?:api_?)?token\s*[:=]\s*([a-z0-9]{32,})", text):
-            s, e = m.start(1), m.end(1)
-            add.append(RecognizerResult("API_KEY", s, e, 1.19))
+            # Cloudflare labeled patterns
+            for m in ctx.finditer(self.CLOUDFLARE_TOKEN_LABEL_RX):
+                s, e = m.start(1), m.end(1)
+                add.append(RecognizerResult("API_KEY", s, e, 1.19))
         
-        # Generic labeled api_key= (lower priority to avoid false positives)
-        for m in re.finditer(
-            r"(?i)\b(?:google|azure|github|sendgrid|mailchimp|twilio|digitalocean|firebase|openai|stripe|aws)[_\s-]*(?:api[_-]?)?key\s*[:=]\s*([A-Za-z0-9._\-+/=]{12,})",
-            text,
-        ):
-            s, e = m.start(1), m.end(1)
-            add.append(RecognizerResult("API_KEY", s, e, 1.18))
+            # Generic labeled api_key= (lower priority to avoid false positives)
+            for m in ctx.finditer(self.PROVIDER_API_KEY_LABEL_RX):
+                s, e = m.start(1), m.end(1)
+                add.append(RecognizerResult("API_KEY", s, e, 1.18))
     
         # ============================================================
         # SESSION_ID, ACCESS_TOKEN, REFRESH_TOKEN, ACCESS_CODE, OTP_CODE — inject early with high scores
-        for rx, ent_name in self.TOKEN_RXS:
-            for m in rx.finditer(text):
-                s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-                token_val = text[s:e].strip()
-                if len(token_val) >= 4:  # Minimum length for tokens/codes
-                    # Check specific patterns first (before generic "code")
-                    if "otp" in ent_name.lower() or "mfa" in ent_name.lower() or "verification" in ent_name.lower():
-                        add.append(RecognizerResult("OTP_CODE", s, e, 1.03))
-                    elif "session" in ent_name.lower() or "sid" in ent_name.lower():
-                        add.append(RecognizerResult("SESSION_ID", s, e, 1.04))
-                    elif "refresh" in ent_name.lower():
-                        add.append(RecognizerResult("REFRESH_TOKEN", s, e, 1.04))
-                    elif "access_token" in ent_name.lower() or "bearer" in ent_name.lower():
-                        add.append(RecognizerResult("ACCESS_TOKEN", s, e, 1.04))
-                    elif "access_code" in ent_name.lower() or "pin" in ent_name.lower() or (ent_name.lower() == "code_labeled"):
-                        add.append(RecognizerResult("ACCESS_CODE", s, e, 1.03))
-                    elif "token" in ent_name.lower():
-                        add.append(RecognizerResult("ACCESS_TOKEN", s, e, 1.04))
+        if want("SESSION_ID", "ACCESS_TOKEN", "REFRESH_TOKEN", "ACCESS_CODE", "OTP_CODE"):
+            for rx, ent_name in self.TOKEN_RXS:
+                for m in ctx.finditer(rx):
+                    s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
+                    token_val = text[s:e].strip()
+                    if len(token_val) >= 4:  # Minimum length for tokens/codes
+                        # Check specific patterns first (before generic "code")
+                        if "otp" in ent_name.lower() or "mfa" in ent_name.lower() or "verification" in ent_name.lower():
+                            add.append(RecognizerResult("OTP_CODE", s, e, 1.03))
+                        elif "session" in ent_name.lower() or "sid" in ent_name.lower():
+                            add.append(RecognizerResult("SESSION_ID", s, e, 1.04))
+                        elif "refresh" in ent_name.lower():
+                            add.append(RecognizerResult("REFRESH_TOKEN", s, e, 1.04))
+                        elif "access_token" in ent_name.lower() or "bearer" in ent_name.lower():
+                            add.append(RecognizerResult("ACCESS_TOKEN", s, e, 1.04))
+                        elif "access_code" in ent_name.lower() or "pin" in ent_name.lower() or (ent_name.lower() == "code_labeled"):
+                            add.append(RecognizerResult("ACCESS_CODE", s, e, 1.03))
+                        elif "token" in ent_name.lower():
+                            add.append(RecognizerResult("ACCESS_TOKEN", s, e, 1.04))
 
         # ============================================= #
         # API KEY DETECTION                             #
@@ -2365,118 +4286,117 @@ class PIIFilter:
         # entropy fallback — AFTER token detectors only #
         #---------------------------------------------- #
 
-        for m in re.finditer(r"\b[A-Za-z0-9._\-+/=]{28,}\b", text):
-            token = m.group(0)
+        if want("API_KEY"):
+            for m in ctx.finditer(self.API_KEY_CANDIDATE_RX):
+                token = m.group(0)
 
-            # Do not override tokens
-            if any(
-                r.entity_type in (
+                # Do not override tokens
+                if add.overlaps(m.start(), m.end(), (
                     "SESSION_ID",
                     "ACCESS_TOKEN",
                     "REFRESH_TOKEN",
                     "ACCESS_CODE",
                     "OTP_CODE",
-                )
-                and not (m.end() <= r.start or m.start() >= r.end)
-                for r in add
-            ):
-                continue
+                )):
+                    continue
 
-            if self._looks_like_api_key(token):
-                add.append(RecognizerResult("API_KEY", m.start(), m.end(), 1.05))
+                if self._looks_like_api_key(token):
+                    add.append(RecognizerResult("API_KEY", m.start(), m.end(), 1.05))
 
-        # ----- Stripe public/secret → Stay as API_KEY (not converting to PAYMENT_TOKEN) -----
-        # Stripe and OpenAI keys are now classified and kept as API_KEY for consistency
-        # This allows tests to properly detect them as <API_KEY>
-        # Users can differentiate by context or use additional flags if needed
+            # ----- Stripe public/secret → Stay as API_KEY (not converting to PAYMENT_TOKEN) -----
+            # Stripe and OpenAI keys are now classified and kept as API_KEY for consistency
+            # This allows tests to properly detect them as <API_KEY>
+            # Users can differentiate by context or use additional flags if needed
 
 
                  
 
         # Reference/Tracking Identifiers — business/legal/government context (inject after CASE_REFERENCE)
         # FILE_NUMBER: Labeled file identifiers
-        for m in self.FILE_NUMBER_RX.finditer(text):
-            s, e = m.start(), m.end()
-            add.append(RecognizerResult("FILE_NUMBER", s, e, 1.00))
+        if want("FILE_NUMBER"):
+            for m in ctx.finditer(self.FILE_NUMBER_RX):
+                s, e = m.start(), m.end()
+                add.append(RecognizerResult("FILE_NUMBER", s, e, 1.00))
 
         # TRANSACTION_NUMBER: Labeled transaction identifiers
-        for m in self.TRANSACTION_NUMBER_RX.finditer(text):
-            s, e = m.start(), m.end()
-            add.append(RecognizerResult("TRANSACTION_NUMBER", s, e, 1.00))
+        if want("TRANSACTION_NUMBER"):
+            for m in ctx.finditer(self.TRANSACTION_NUMBER_RX):
+                s, e = m.start(), m.end()
+                add.append(RecognizerResult("TRANSACTION_NUMBER", s, e, 1.00))
 
         # CUSTOMER_NUMBER: Labeled customer identifiers
-        for m in self.CUSTOMER_NUMBER_RX.finditer(text):
-            s, e = m.start(), m.end()
-            add.append(RecognizerResult("CUSTOMER_NUMBER", s, e, 0.99))
+        if want("CUSTOMER_NUMBER"):
+            for m in ctx.finditer(self.CUSTOMER_NUMBER_RX):
+                s, e = m.start(), m.end()
+                add.append(RecognizerResult("CUSTOMER_NUMBER", s, e, 0.99))
 
         # TICKET_ID: Labeled ticket/case identifiers
-        for m in self.TICKET_ID_RX.finditer(text):
-            s, e = m.start(), m.end()
-            add.append(RecognizerResult("TICKET_ID", s, e, 0.99))
+        if want("TICKET_ID"):
+            for m in ctx.finditer(self.TICKET_ID_RX):
+                s, e = m.start(), m.end()
+                add.append(RecognizerResult("TICKET_ID", s, e, 0.99))
 
         # Addresses
-        for m in self.STRICT_ADDRESS_RX.finditer(text):
-            s, e = m.start(), m.end()
-            span = m.group()
+        if want("ADDRESS"):
+            for m in ctx.finditer(self.STRICT_ADDRESS_RX):
+                s, e = m.start(), m.end()
+                span = m.group()
 
-            if re.match(r"(?i)\b(?:GEW|HRB|HRA|AZ|GZ|BZR)[-_]?\d", span):
-                continue
+                if re.match(r"(?i)\b(?:GEW|HRB|HRA|AZ|GZ|BZR)[-_]?\d", span):
+                    continue
 
-            # Do not let strict-address matches that overlap an email beat email matches
-            if any(not (e <= a.start or s >= a.end) for a in add if a.entity_type in ("EMAIL", "EMAIL_ADDRESS")):
-                continue
-            # If an intro cue immediately precedes this span (e.g., "Je m'appelle Rue Victor"),
-            # prefer PERSON and skip injecting an ADDRESS so the intro-based PERSON can win.
-            # Consider a small right-context as intro cues may overlap the match start
-            prefix = text[max(0, s - 48):s + 16].lower()
-            if any(cue in prefix for cue in self.INTRO_CUES):
-                continue
-            # Guard against matching education/employment IDs as addresses (e.g., "student ID is STU-12345"
-            # where "student" contains "tal" which is a street suffix in German).
-            # Check the broader context to see if this is actually an ID label
-            broader_span = text[max(0, s - 50):e + 10].lower()
-            if any(label in broader_span for label in ["student id", "student number", "studentenausweis",
-                                                       "employee id", "employee number",
-                                                       "professional license", "license number",
-                                                       "pro license", "credential"]):
-                continue
-            # Conservative guard: require either a house number or an explicit street suffix to reduce city-name false positives
-            if not re.search(r"\d", span):
-                # If no digit present but a street suffix exists, try to absorb a following house-number from the right context
-                right = text[e:e+16]
-                mnum = re.match(r"^\s*[,:]?\s*(\d{1,4}[A-Za-z]?(?:\s*[-–]\s*\d+[A-Za-z]?)?)", right)
-                if mnum:
-                    # Expand match to include the house number
-                    e = e + mnum.end()
-                    span = text[s:e]
-                else:
-                    # street suffix check (use existing compound suffix regex)
-                    if not re.search(self.STREET_SUFFIX_COMPOUND, span, flags=re.I | re.UNICODE):
-                        continue
-            # Give strict-address matches a slightly higher score so they win numeric overlaps (house+postal)
-            add.append(RecognizerResult("ADDRESS", s, e, 1.02))
-
-        # Fallback street+number detection (conservative)
-        for m in self.FALLBACK_STREET_RX.finditer(text):
-            s, e = m.start(), m.end()
-            # Do not let fallback-address match overlap an email
-            if any(not (e <= a.start or s >= a.end) for a in add if a.entity_type in ("EMAIL", "EMAIL_ADDRESS")):
-                continue
-            # If an intro cue immediately precedes this span, prefer PERSON and skip injecting ADDRESS
-            # Consider small right-context so intro cues that overlap the match cancel ADDRESS injection
-            prefix = text[max(0, s - 48):s + 16].lower()
-            if any(cue in prefix for cue in self.INTRO_CUES):
-                continue
-            # Avoid duplicate ADDRESS injections
-            if any(not (e <= a.start or s >= a.end) for a in add if a.entity_type == "ADDRESS"):
-                continue
-            add.append(RecognizerResult("ADDRESS", s, e, 1.01))
+                # Do not let strict-address matches that overlap an email beat email matches
+                if add.overlaps(s, e, ("EMAIL", "EMAIL_ADDRESS")):
+                    continue
+                # If an intro cue immediately precedes this span (e.g., "Je m'appelle Rue Victor"),
+                # prefer PERSON and skip injecting an ADDRESS so the intro-based PERSON can win.
+                # Consider a small right-context as intro cues may overlap the match start
+                if ctx.has("INTRO_CUES", s - 48, s + 16):
+                    continue
+                # Guard against matching education/employment IDs as addresses (e.g., "student ID is STU-12345"
+                # where "student" contains "tal" which is a street suffix in German).
+                # Check the broader context to see if this is actually an ID label
+                broader_span = ctx.window(s - 50, e + 10)
+                if any(label in broader_span for label in ["student id", "student number", "studentenausweis",
+                                                           "employee id", "employee number",
+                                                           "professional license", "license number",
+                                                           "pro license", "credential"]):
+                    continue
+                # Conservative guard: require either a house number or an explicit street suffix to reduce city-name false positives
+                if not re.search(r"\d", span):
+                    # If no digit present but a street suffix exists, try to absorb a following house-number from the right context
+                    right = text[e:e+16]
+                    mnum = re.match(r"^\s*[,:]?\s*(\d{1,4}[A-Za-z]?(?:\s*[-–]\s*\d+[A-Za-z]?)?)", right)
+                    if mnum:
+                        # Expand match to include the house number
+                        e = e + mnum.end()
+                        span = text[s:e]
+                    else:
+                        # street suffix check (use existing compound suffix regex)
+                        if not re.search(self.STREET_SUFFIX_COMPOUND, span, flags=re.I | re.UNICODE):
+                            continue
+                # Give strict-address matches a slightly higher score so they win numeric overlaps (house+postal)
+                add.append(RecognizerResult("ADDRESS", s, e, 1.02))
 
-        # Postal → LOCATION
-        for patt in self.POSTAL_EU_PATTERNS:
-            for m in re.finditer(patt, text, flags=re.I | re.UNICODE):
+            # Fallback street+number detection (conservative)
+            for m in ctx.finditer(self.FALLBACK_STREET_RX):
                 s, e = m.start(), m.end()
-                matched = m.group()
+                # Do not let fallback-address match overlap an email
+                if add.overlaps(s, e, ("EMAIL", "EMAIL_ADDRESS")):
+                    continue
+                # If an intro cue immediately precedes this span, prefer PERSON and skip injecting ADDRESS
+                # Consider small right-context so intro cues that overlap the match cancel ADDRESS injection
+                if ctx.has("INTRO_CUES", s - 48, s + 16):
+                    continue
+                # Avoid duplicate ADDRESS injections
+                if add.overlaps(s, e, ("ADDRESS",)):
+                    continue
+                add.append(RecognizerResult("ADDRESS", s, e, 1.01))
+
+        # Postal → LOCATION (one result per span; every country rule that produced it is recorded)
+        if want("LOCATION"):
+            for (s, e), countries in self._scan_postal_codes(text).items():
+                matched = text[s:e]
 
                 if re.match(r"(?i)\b(?:GEW|HRB|HRA|AZ|GZ|BZR)[-_]?\d", matched):
                     continue
@@ -2489,326 +4409,337 @@ class PIIFilter:
                 if alpha and alpha.group(1).islower():
                     continue
 
-                if any(not (e <= a.start or s >= a.end) for a in add if a.entity_type in ("EMAIL","EMAIL_ADDRESS")):
+                if add.overlaps(s, e, ("EMAIL", "EMAIL_ADDRESS")):
                     continue
 
-                add.append(RecognizerResult("LOCATION", s, e, 0.92))
+                add.append(RecognizerResult("LOCATION", s, e, 0.92, recognition_metadata={"postal_countries": countries}))
         # Phones or Meeting IDs
-        for m in self.PHONE_RX.finditer(text):
-            s, e = m.start(), m.end()
-            left = text[max(0, s - 24):s].lower()
-            right = text[e:min(len(text), e + 24)].lower()
-            # If fax appears near the number on either side, skip phone to let FAX handling win
-            if "fax" in left or "fax" in right:
-                continue
-            if "meeting" in left or "meeting" in right:
-                # Meeting IDs should beat other heuristics when labeled (broad match)
-                add.append(RecognizerResult("MEETING_ID", s, e, 1.05))
-            else:
-                digits = re.sub(r"\D", "", m.group())
-                if len(digits) >= 7:
-                    # Avoid tagging address/postal fragments as PHONEs: if street-like tokens are near the number
-                    # or if a postal-like number begins immediately to the right, skip treating as PHONE
-                    left_ctx = left
-                    right_ctx = right
-                    if any(sb in left_ctx for sb in self.STREET_BLOCKERS) or any(sb in right_ctx for sb in self.STREET_BLOCKERS):
-                        continue
-                    # If right context starts with a postal-like fragment (e.g., '- 10115' or ' 10115'), skip
-                    if re.match(r"^\s*[-–]?\s*\d{3,6}\b", right_ctx):
-                        continue
-                    # If ID-like label tokens appear near the number, this is more likely an ID than a phone
-                    if any(k in left or k in right for k in self.ID_KEYWORDS):
-                        continue
-                    add.append(RecognizerResult("PHONE_NUMBER", s, e, 0.90))
+        if want("PHONE_NUMBER", "MEETING_ID"):
+            for m in ctx.finditer(self.PHONE_RX):
+                s, e = m.start(), m.end()
+                left = ctx.window(s - 24, s)
+                right = ctx.window(e, e + 24)
+                # If fax appears near the number on either side, skip phone to let FAX handling win
+                if "fax" in left or "fax" in right:
+                    continue
+                if "meeting" in left or "meeting" in right:
+                    # Meeting IDs should beat other heuristics when labeled (broad match)
+                    add.append(RecognizerResult("MEETING_ID", s, e, 1.05))
+                else:
+                    digits = re.sub(r"\D", "", m.group())
+                    if len(digits) >= 7:
+                        # Avoid tagging address/postal fragments as PHONEs: if street-like tokens are near the number
+                        # or if a postal-like number begins immediately to the right, skip treating as PHONE
+                        if ctx.has("STREET_BLOCKERS", s - 24, s) or ctx.has("STREET_BLOCKERS", e, e + 24):
+                            continue
+                        # If right context starts with a postal-like fragment (e.g., '- 10115' or ' 10115'), skip
+                        if re.match(r"^\s*[-–]?\s*\d{3,6}\b", right):
+                            continue
+                        # If ID-like label tokens appear near the number, this is more likely an ID than a phone
+                        if ctx.has("ID_KEYWORDS", s - 24, s) or ctx.has("ID_KEYWORDS", e, e + 24):
+                            continue
+                        add.append(RecognizerResult("PHONE_NUMBER", s, e, 0.90))
         
         # Combine labeled multi-line address fragments into ADDRESS when possible
         # e.g. "Straße: Hauptstraße\nNr.: 10\nPLZ/Ort: 10115 Berlin" or
         # "Street: Baker St.\nNumber: 221B\nCity: London"
-        locs = [r for r in add if r.entity_type == "LOCATION"]
-        for loc in locs:
-            # find the newline that starts the LOCATION line
-            loc_line_start = text.rfind("\n", 0, loc.start)
-            if loc_line_start == -1:
-                continue
-            # previous line (likely number label)
-            prev_line_end = loc_line_start
-            prev_line_start = text.rfind("\n", 0, prev_line_end - 1)
-            prev_line = text[prev_line_start + 1:prev_line_end].strip() if prev_line_start != -1 else text[:prev_line_end].strip()
-            # line above that (likely street label)
-            prev2_end = prev_line_start
-            if prev2_end == -1:
-                continue
-            prev2_start = text.rfind("\n", 0, prev2_end - 1)
-            prev2_line = text[prev2_start + 1:prev2_end].strip() if prev2_start != -1 else text[:prev2_end].strip()
+        if want("ADDRESS"):
+            locs = [r for r in add if r.entity_type == "LOCATION"]
+            for loc in locs:
+                # find the newline that starts the LOCATION line
+                loc_line_start = ctx.line_break_before(loc.start)
+                if loc_line_start == -1:
+                    continue
+                # previous line (likely number label)
+                prev_line_end = loc_line_start
+                prev_line_start = ctx.line_break_before(prev_line_end - 1)
+                prev_line = text[prev_line_start + 1:prev_line_end].strip() if prev_line_start != -1 else text[:prev_line_end].strip()
+                # line above that (likely street label)
+                prev2_end = prev_line_start
+                if prev2_end == -1:
+                    continue
+                prev2_start = ctx.line_break_before(prev2_end - 1)
+                prev2_line = text[prev2_start + 1:prev2_end].strip() if prev2_start != -1 else text[:prev2_end].strip()
 
-            low2 = prev2_line.lower()
-            low1 = prev_line.lower()
-            # street label detection — use substring checks to tolerate punctuation like ':'
-            if not any(k in low2 for k in ("straße", "strasse", "str.", "street", "st.")):
-                continue
-            # number label detection — tolerate 'Nr', 'No', 'Number', 'Nr.' etc.
-            if not any(k in low1 for k in ("nr", "no", "number", "nummer", "num")):
-                continue
-            # Anchor near first capitalized token in street line
-            mname = re.search(r"[A-ZÀ-ÖØ-ÝÄÖÜ][\w'’\.-]+", prev2_line)
-            if not mname:
-                continue
-            s = prev2_start + 1 + mname.start()
-            e = loc.end
-            # If an overlapping ADDRESS exists, prefer expanding smaller spans to the larger merged span
-            overlaps = [a for a in add if a.entity_type == "ADDRESS" and not (e <= a.start or s >= a.end)]
-            if overlaps:
-                expanded = False
-                for a in overlaps:
-                    # if the new span fully contains an existing smaller ADDRESS, replace it with the expanded span
-                    if s <= a.start and e >= a.end:
-                        try:
-                            add.remove(a)
-                        except ValueError:
-                            pass
-                        add.append(RecognizerResult("ADDRESS", s, e, max(a.score, 1.03)))
-                        expanded = True
-                        break
-                if not expanded:
-                    # otherwise keep existing address(es)
+                low2 = prev2_line.lower()
+                low1 = prev_line.lower()
+                # street label detection — use substring checks to tolerate punctuation like ':'
+                if not any(k in low2 for k in ("straße", "strasse", "str.", "street", "st.")):
                     continue
-            else:
-                add.append(RecognizerResult("ADDRESS", s, e, 1.03))
-        # Also detect fully labeled 3-line address blocks (street + number + city) even when no postal code was matched
-        # Pattern matches: street_label:value\nnumber_label:value\ncity_label:value
-        # Requires labels to be followed by colon or whitespace (to avoid matching "St." as a label when it's part of an address value)
-        block_rx = re.compile(
-            r"(?im)"
-            r"(?:straße|strasse|str|street|adresse|address|rue)(?:\.|:|\s)(?:\s*:?\s*)([^\n:]+)"
-            r"(?:\n\s*(?:nr|no|number|nummer|num)(?:\.|:|\s)(?:\s*:?\s*)([^\n:]+))?"
-            r"(?:\n\s*(?:plz(?:/ort)?|postal|city|stadt|ort|ville|ciudad)(?:\.|:|\s)(?:\s*:?\s*)([^\n:]+))?"
-        )
+                # number label detection — tolerate 'Nr', 'No', 'Number', 'Nr.' etc.
+                if not any(k in low1 for k in ("nr", "no", "number", "nummer", "num")):
+                    continue
+                # Anchor near first capitalized token in street line
+                mname = re.search(r"[A-ZÀ-ÖØ-ÝÄÖÜ][\w'’\.-]+", prev2_line)
+                if not mname:
+                    continue
+                s = prev2_start + 1 + mname.start()
+                e = loc.end
+                # If an overlapping ADDRESS exists, prefer expanding smaller spans to the larger merged span
+                overlaps = add.overlapping(s, e, ("ADDRESS",))
+                if overlaps:
+                    expanded = False
+                    for a in overlaps:
+                        # if the new span fully contains an existing smaller ADDRESS, replace it with the expanded span
+                        if s <= a.start and e >= a.end:
+                            try:
+                                add.remove(a)
+                            except ValueError:
+                                pass
+                            add.append(RecognizerResult("ADDRESS", s, e, max(a.score, 1.03)))
+                            expanded = True
+                            break
+                    if not expanded:
+                        # otherwise keep existing address(es)
+                        continue
+                else:
+                    add.append(RecognizerResult("ADDRESS", s, e, 1.03))
+            # Also detect fully labeled 3-line address blocks (street + number + city) even when no postal code was matched
         
-        _debug_block = False  # "Straße: Hauptstraße" in text and "Nr.:" in text
-        if _debug_block:
-            print(f"[DEBUG] block_rx processing. Current add list has {len(add)} entities:")
-            for i, ent in enumerate(add):
-                print(f"  [{i}] {ent.entity_type:15s} ({ent.start:3d}, {ent.end:3d}): {repr(text[ent.start:min(ent.end,ent.start+30)])}")
+            _debug_block = False  # "Straße: Hauptstraße" in text and "Nr.:" in text
+            if _debug_block:
+                print(f"[DEBUG] ADDRESS_BLOCK_RX processing. Current add list has {len(add)} entities:")
+                for i, ent in enumerate(add):
+                    print(f"  [{i}] {ent.entity_type:15s} ({ent.start:3d}, {ent.end:3d}): {repr(text[ent.start:min(ent.end,ent.start+30)])}")
         
-        for m in block_rx.finditer(text):
-            # Extract the matched groups
-            street_val = m.group(1)
-            number_val = m.group(2)
-            city_val = m.group(3)
+            for m in ctx.finditer(self.ADDRESS_BLOCK_RX):
+                # Extract the matched groups
+                street_val = m.group(1)
+                number_val = m.group(2)
+                city_val = m.group(3)
             
-            # Both number and city must be present for a valid address block
-            if not (number_val and city_val):
-                continue
+                # Both number and city must be present for a valid address block
+                if not (number_val and city_val):
+                    continue
             
-            _debug_block2 = False  # "Straße: Hauptstraße" in text and "Nr.:" in text
-            if _debug_block2:
-                print(f"\n[DEBUG] block_rx matched! Groups: street={street_val!r}, number={number_val!r}, city={city_val!r}")
+                _debug_block2 = False  # "Straße: Hauptstraße" in text and "Nr.:" in text
+                if _debug_block2:
+                    print(f"\n[DEBUG] ADDRESS_BLOCK_RX matched! Groups: street={street_val!r}, number={number_val!r}, city={city_val!r}")
             
-            s = m.start(1)
-            # Calculate the end position: use the furthest non-None group's end
-            if m.group(3):
-                e = m.end(3)
-            elif m.group(2):
-                e = m.end(2)
-            else:
-                e = m.end(1)
+                s = m.start(1)
+                # Calculate the end position: use the furthest non-None group's end
+                if m.group(3):
+                    e = m.end(3)
+                elif m.group(2):
+                    e = m.end(2)
+                else:
+                    e = m.end(1)
             
-            if _debug_block2:
-                print(f"[DEBUG] Creating ADDRESS span: ({s}, {e}) = {repr(text[s:e][:50])}")
+                if _debug_block2:
+                    print(f"[DEBUG] Creating ADDRESS span: ({s}, {e}) = {repr(text[s:e][:50])}")
             
-            overlaps = [a for a in add if a.entity_type == "ADDRESS" and not (e <= a.start or s >= a.end)]
-            if _debug_block2:
-                print(f"[DEBUG] Found {len(overlaps)} overlapping ADDRESS entities")
-                for ov in overlaps:
-                    print(f"  Overlap: ({ov.start}, {ov.end})")
-                    print(f"    Condition 1 (contains): {s <= ov.start and e >= ov.end}")
-                    print(f"    Condition 2 (overlap_start): {s <= ov.start and e > ov.start}")
-                    print(f"    Condition 3 (overlap_end): {s < ov.end and e >= ov.end}")
-                    print(f"    Width comparison: new={e-s}, old={ov.end - ov.start}, new_wider={e > ov.end - ov.start}")
+                overlaps = add.overlapping(s, e, ("ADDRESS",))
+                if _debug_block2:
+                    print(f"[DEBUG] Found {len(overlaps)} overlapping ADDRESS entities")
+                    for ov in overlaps:
+                        print(f"  Overlap: ({ov.start}, {ov.end})")
+                        print(f"    Condition 1 (contains): {s <= ov.start and e >= ov.end}")
+                        print(f"    Condition 2 (overlap_start): {s <= ov.start and e > ov.start}")
+                        print(f"    Condition 3 (overlap_end): {s < ov.end and e >= ov.end}")
+                        print(f"    Width comparison: new={e-s}, old={ov.end - ov.start}, new_wider={e > ov.end - ov.start}")
             
-            if overlaps:
-                expanded = False
-                for a in overlaps:
-                    # If the new merged span fully contains an existing ADDRESS, or overlaps significantly, expand
-                    if (s <= a.start and e >= a.end) or (s <= a.start and e > a.start) or (s < a.end and e >= a.end):
-                        if _debug_block2:
-                            print(f"[DEBUG] Merging: old=({a.start}, {a.end}), new=({s}, {e})")
-                        try:
-                            add.remove(a)
-                        except ValueError:
-                            pass
-                        # Create a new span that covers both the old and new extents
-                        new_s = min(s, a.start)
-                        new_e = max(e, a.end)
-                        add.append(RecognizerResult("ADDRESS", new_s, new_e, max(a.score, 1.03)))
-                        expanded = True
-                        break
-                if not expanded:
-                    # If there's an overlap but can't merge, prefer the larger new span over the smaller old one
+                if overlaps:
+                    expanded = False
                     for a in overlaps:
-                        if e > a.end - a.start:  # New span is wider than old span
+                        # If the new merged span fully contains an existing ADDRESS, or overlaps significantly, expand
+                        if (s <= a.start and e >= a.end) or (s <= a.start and e > a.start) or (s < a.end and e >= a.end):
                             if _debug_block2:
-                                print(f"[DEBUG] Replacing smaller old with new: new=({s}, {e}), old=({a.start}, {a.end})")
+                                print(f"[DEBUG] Merging: old=({a.start}, {a.end}), new=({s}, {e})")
                             try:
                                 add.remove(a)
                             except ValueError:
                                 pass
-                            add.append(RecognizerResult("ADDRESS", s, e, max(a.score, 1.03)))
+                            # Create a new span that covers both the old and new extents
+                            new_s = min(s, a.start)
+                            new_e = max(e, a.end)
+                            add.append(RecognizerResult("ADDRESS", new_s, new_e, max(a.score, 1.03)))
                             expanded = True
                             break
-                if not expanded:
+                    if not expanded:
+                        # If there's an overlap but can't merge, prefer the larger new span over the smaller old one
+                        for a in overlaps:
+                            if e > a.end - a.start:  # New span is wider than old span
+                                if _debug_block2:
+                                    print(f"[DEBUG] Replacing smaller old with new: new=({s}, {e}), old=({a.start}, {a.end})")
+                                try:
+                                    add.remove(a)
+                                except ValueError:
+                                    pass
+                                add.append(RecognizerResult("ADDRESS", s, e, max(a.score, 1.03)))
+                                expanded = True
+                                break
+                    if not expanded:
+                        if _debug_block2:
+                            print(f"[DEBUG] NO expansion happened, skipping new ADDRESS")
+                        continue
+                else:
                     if _debug_block2:
-                        print(f"[DEBUG] NO expansion happened, skipping new ADDRESS")
-                    continue
-            else:
-                if _debug_block2:
-                    print(f"[DEBUG] No overlaps, adding ADDRESS ({s}, {e}) directly")
-                add.append(RecognizerResult("ADDRESS", s, e, 1.03))
+                        print(f"[DEBUG] No overlaps, adding ADDRESS ({s}, {e}) directly")
+                    add.append(RecognizerResult("ADDRESS", s, e, 1.03))
 
         # Fax (label-led)
-        for fax in self.FAX_LABEL_RX.finditer(text):
-            start = fax.end()
-            seg = text[start:start + 64]
-            m = re.search(r"(?:\+?\d{1,3}[ \-]?)?(?:\(?\d{1,4}\)?[ \-]?)?(?:\d[ \-]?){5,12}\d", seg)
-            if m:
-                s = start + m.start()
-                e = start + m.end()
-                add.append(RecognizerResult("FAX_NUMBER", s, e, 1.05))
+        if want("FAX_NUMBER"):
+            for fax in ctx.finditer(self.FAX_LABEL_RX):
+                start = fax.end()
+                seg = text[start:start + 64]
+                m = re.search(r"(?:\+?\d{1,3}[ \-]?)?(?:\(?\d{1,4}\)?[ \-]?)?(?:\d[ \-]?){5,12}\d", seg)
+                if m:
+                    s = start + m.start()
+                    e = start + m.end()
+                    add.append(RecognizerResult("FAX_NUMBER", s, e, 1.05))
 
         # Dates
-        for patt in (self.DATE_REGEX_1, self.DATE_REGEX_2, self.DATE_REGEX_3, self.DATE_REGEX_4, self.DATE_REGEX_5):
-            for m in re.finditer(patt, text, flags=re.I | re.UNICODE):
-                add.append(RecognizerResult("DATE", m.start(), m.end(), 0.93))
+        if want("DATE"):
+            for rx in self.DATE_RXS:
+                for m in ctx.finditer(rx):
+                    add.append(RecognizerResult("DATE", m.start(), m.end(), 0.93))
         # Filter out common relative date words (e.g., 'today') which are not PII in noisy text
         RELATIVE_DATE_WORDS = {"today","yesterday","tomorrow","tonight","this morning","this afternoon","this evening"}
-        add = [r for r in add if not (r.entity_type in ("DATE",) and text[r.start:r.end].strip().lower() in RELATIVE_DATE_WORDS)]
+        add = _IndexedResults(r for r in add if not (r.entity_type in ("DATE",) and text[r.start:r.end].strip().lower() in RELATIVE_DATE_WORDS))
 
         # IDs
-        for patt, _name in self.ID_PATTERNS:
-            for m in re.finditer(patt, text, flags=re.I | re.UNICODE):
-                s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-                left = text[max(0, s - 24):s].lower()
-                # If the left context indicates this is an account/routing number, skip generic ID injection
-                is_account_label = any(k in left for k in self.ACCOUNT_LABELS)
-                if is_account_label:
-                    continue
-                # If ID label cues appear immediately to the left, boost the score so labeled IDs beat PHONE
-                is_labeled = any(k in left for k in self.ID_KEYWORDS)
-                score = 1.03 if is_labeled else 0.92
-                # Map specific ID formats to more precise entities when known (e.g., German Personalausweis -> PASSPORT)
+        if want("ID_NUMBER", "PASSPORT"):
+            for rx, _name in self.ID_RXS:
+                for m in ctx.finditer(rx):
+                    s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
+                    # If the left context indicates this is an account/routing number, skip generic ID injection
+                    is_account_label = ctx.has("ACCOUNT_LABELS", s - 24, s)
+                    if is_account_label:
+                        continue
+                    # If ID label cues appear immediately to the left, boost the score so labeled IDs beat PHONE
+                    is_labeled = ctx.has("ID_KEYWORDS", s - 24, s)
+                    score = 1.03 if is_labeled else 0.92
+                    # Map specific ID formats to more precise entities when known (e.g., German Personalausweis -> PASSPORT)
                
-                val = text[s:e]
-                if "personalausweis" in _name.lower():
-                    # Must contain at least one digit (blocks "Abschluss")
-                    ent_type = "PASSPORT" if re.search(r"\d", val) else "ID_NUMBER"
-                else:
-                    ent_type = "ID_NUMBER"
+                    val = text[s:e]
+                    if "personalausweis" in _name.lower():
+                        # Must contain at least one digit (blocks "Abschluss")
+                        ent_type = "PASSPORT" if re.search(r"\d", val) else "ID_NUMBER"
+                    else:
+                        ent_type = "ID_NUMBER"
 
-                add.append(RecognizerResult(ent_type, s, e, score))
+                    add.append(RecognizerResult(ent_type, s, e, score))
 
         # TAX strict - boost labeled priority
-        for patt, _name in self.TAX_PATTERNS_STRICT:
-            for m in re.finditer(patt, text, flags=re.I | re.UNICODE):
-                s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-                left = text[max(0, m.start() - 24):m.start()].lower()
-                is_labeled = any(k in left for k in ["steuer", "tax id", "tin", "vat"])
-                score = 1.0 if is_labeled else 0.92
-                add.append(RecognizerResult("TAX_ID", s, e, score))
+        if want("TAX_ID"):
+            for rx, _name in self.TAX_RXS_STRICT:
+                for m in ctx.finditer(rx):
+                    s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
+                    left = ctx.window(m.start() - 24, m.start())
+                    is_labeled = any(k in left for k in ["steuer", "tax id", "tin", "vat"])
+                    score = 1.0 if is_labeled else 0.92
+                    add.append(RecognizerResult("TAX_ID", s, e, score))
 
         # EORI explicit labeled matches (prefer EORI when label present)
-        for m in self.EORI_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            # Prefer EORI as distinct entity (higher than generic TAX_ID)
-            add.append(RecognizerResult("EORI", s, e, 1.03))
+        if want("EORI"):
+            for m in ctx.finditer(self.EORI_RX):
+                s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
+                # Prefer EORI as distinct entity (higher than generic TAX_ID)
+                add.append(RecognizerResult("EORI", s, e, 1.03))
 
         # Commercial Register / Handelsregister — multilingual European support
-        for m in self.COMMERCIAL_REGISTER_RX.finditer(text):
-            s, e = m.start(), m.end()
-            # High score to ensure commercial register captures are not misclassified
-            add.append(RecognizerResult("COMMERCIAL_REGISTER", s, e, 1.04))
+        if want("COMMERCIAL_REGISTER"):
+            for m in ctx.finditer(self.COMMERCIAL_REGISTER_RX):
+                s, e = m.start(), m.end()
+                # High score to ensure commercial register captures are not misclassified
+                add.append(RecognizerResult("COMMERCIAL_REGISTER", s, e, 1.04))
 
         # Case Reference / Case ID / Reference Number — multilingual support
-        for m in self.CASE_REFERENCE_RX.finditer(text):
-            s, e = m.start(), m.end()
-            # Score 1.02 to win overlaps with PHONE (0.90) and DATE (0.93)
-            add.append(RecognizerResult("CASE_REFERENCE", s, e, 1.02))
+        if want("CASE_REFERENCE"):
+            for m in ctx.finditer(self.CASE_REFERENCE_RX):
+                s, e = m.start(), m.end()
+                # Score 1.02 to win overlaps with PHONE (0.90) and DATE (0.93)
+                add.append(RecognizerResult("CASE_REFERENCE", s, e, 1.02))
 
         # Labeled customer name — capture 'Customer Name: John Smith' patterns
-        for m in re.finditer(r"(?i)\bcustomer\s+name\s*[:#\-]\s*([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3})", text):
-            s, e = m.start(1), m.end(1)
-            add.append(RecognizerResult("PERSON", s, e, 1.01))
+        if want("PERSON"):
+            for m in ctx.finditer(self.CUSTOMER_NAME_LABEL_RX):
+                s, e = m.start(1), m.end(1)
+                add.append(RecognizerResult("PERSON", s, e, 1.01))
 
         # German e-government identifiers
         # BundID: German Federal Digital Identity
-        for m in self.BUND_ID_RX.finditer(text):
-            s, e = m.start(), m.end()
-            add.append(RecognizerResult("BUND_ID", s, e, 1.05))
+        if want("BUND_ID"):
+            for m in ctx.finditer(self.BUND_ID_RX):
+                s, e = m.start(), m.end()
+                add.append(RecognizerResult("BUND_ID", s, e, 1.05))
 
         # ELSTER_ID: German tax authority login system (Elektronische Steuererklärung)
-        for m in self.ELSTER_ID_RX.finditer(text):
-            s, e = m.start(), m.end()
-            add.append(RecognizerResult("ELSTER_ID", s, e, 1.05))
+        if want("ELSTER_ID"):
+            for m in ctx.finditer(self.ELSTER_ID_RX):
+                s, e = m.start(), m.end()
+                add.append(RecognizerResult("ELSTER_ID", s, e, 1.05))
 
         # SERVICEKONTO: German government service account
-        for m in self.SERVICEKONTO_RX.finditer(text):
-            s, e = m.start(), m.end()
-            add.append(RecognizerResult("SERVICEKONTO", s, e, 1.01))
+        if want("SERVICEKONTO"):
+            for m in ctx.finditer(self.SERVICEKONTO_RX):
+                s, e = m.start(), m.end()
+                add.append(RecognizerResult("SERVICEKONTO", s, e, 1.01))
 
         # Authentication secrets — high priority to prevent false negatives
         # PASSWORD: User account password with label
-        for m in self.PASSWORD_RX.finditer(text):
-            s, e = m.start(), m.end()
-            add.append(RecognizerResult("PASSWORD", s, e, 1.06))
+        if want("PASSWORD"):
+            for m in ctx.finditer(self.PASSWORD_RX):
+                s, e = m.start(), m.end()
+                add.append(RecognizerResult("PASSWORD", s, e, 1.06))
 
         # PIN: Personal identification number with label
-        for m in self.PIN_RX.finditer(text):
-            s, e = m.start(), m.end()
-            add.append(RecognizerResult("PIN", s, e, 1.06))
+        if want("PIN"):
+            for m in ctx.finditer(self.PIN_RX):
+                s, e = m.start(), m.end()
+                add.append(RecognizerResult("PIN", s, e, 1.06))
 
         # TAN: Transaction authentication number with label
-        for m in self.TAN_RX.finditer(text):
-            s, e = m.start(), m.end()
-            add.append(RecognizerResult("TAN", s, e, 1.04))
+        if want("TAN"):
+            for m in ctx.finditer(self.TAN_RX):
+                s, e = m.start(), m.end()
+                add.append(RecognizerResult("TAN", s, e, 1.04))
 
         # PUK: PIN unlock key with label
-        for m in self.PUK_RX.finditer(text):
-            s, e = m.start(), m.end()
-            add.append(RecognizerResult("PUK", s, e, 1.06))
+        if want("PUK"):
+            for m in ctx.finditer(self.PUK_RX):
+                s, e = m.start(), m.end()
+                add.append(RecognizerResult("PUK", s, e, 1.06))
 
         # RECOVERY_CODE: Account recovery code with label
-        for m in self.RECOVERY_CODE_RX.finditer(text):
-            s, e = m.start(), m.end()
-            add.append(RecognizerResult("RECOVERY_CODE", s, e, 1.03))
+        if want("RECOVERY_CODE"):
+            for m in ctx.finditer(self.RECOVERY_CODE_RX):
+                s, e = m.start(), m.end()
+                add.append(RecognizerResult("RECOVERY_CODE", s, e, 1.03))
 
         # Reference/Tracking Identifiers — business/legal/government context (inject early with high scores)
         # FILE_NUMBER: Labeled file identifiers
-        for m in self.FILE_NUMBER_RX.finditer(text):
-            s, e = m.start(), m.end()
-            add.append(RecognizerResult("FILE_NUMBER", s, e, 1.08))
+        if want("FILE_NUMBER"):
+            for m in ctx.finditer(self.FILE_NUMBER_RX):
+                s, e = m.start(), m.end()
+                add.append(RecognizerResult("FILE_NUMBER", s, e, 1.08))
 
         # TRANSACTION_NUMBER: Labeled transaction identifiers
-        for m in self.TRANSACTION_NUMBER_RX.finditer(text):
-            s, e = m.start(), m.end()
-            add.append(RecognizerResult("TRANSACTION_NUMBER", s, e, 1.08))
+        if want("TRANSACTION_NUMBER"):
+            for m in ctx.finditer(self.TRANSACTION_NUMBER_RX):
+                s, e = m.start(), m.end()
+                add.append(RecognizerResult("TRANSACTION_NUMBER", s, e, 1.08))
 
         # CUSTOMER_NUMBER: Labeled customer identifiers
-        for m in self.CUSTOMER_NUMBER_RX.finditer(text):
-            s, e = m.start(), m.end()
-            add.append(RecognizerResult("CUSTOMER_NUMBER", s, e, 1.07))
+        if want("CUSTOMER_NUMBER"):
+            for m in ctx.finditer(self.CUSTOMER_NUMBER_RX):
+                s, e = m.start(), m.end()
+                add.append(RecognizerResult("CUSTOMER_NUMBER", s, e, 1.07))
 
         # TICKET_ID: Labeled ticket/case identifiers
-        for m in self.TICKET_ID_RX.finditer(text):
-            s, e = m.start(), m.end()
-            add.append(RecognizerResult("TICKET_ID", s, e, 1.07))
+        if want("TICKET_ID"):
+            for m in ctx.finditer(self.TICKET_ID_RX):
+                s, e = m.start(), m.end()
+                add.append(RecognizerResult("TICKET_ID", s, e, 1.07))
 
         # TAX loose (optional + guarded)
-        if self.ENABLE_LOOSE_TAX:
-            for patt, _name in self.TAX_PATTERNS_LOOSE:
-                for m in re.finditer(patt, text, flags=re.I | re.UNICODE):
+        if self.ENABLE_LOOSE_TAX and want("TAX_ID"):
+            for rx, _name in self.TAX_RXS_LOOSE:
+                for m in ctx.finditer(rx):
                     s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
                     span = text[s:e]
-                    left_ctx = text[max(0, s - 12):s].lower()
-                    right_ctx = text[e:min(len(text), e + 12)].lower()
+                    left_ctx = ctx.window(s - 12, s)
+                    right_ctx = ctx.window(e, e + 12)
                     looks_like_date = bool(re.search(r"[./-]", span)) or any(k in left_ctx for k in ["born", "geb", "date", "dob"])
                     looks_like_phone = bool(re.search(r"[()\- ]", span)) or any(k in left_ctx for k in ["tel", "phone", "fax", "mob"])
                     looks_like_ip = bool(re.fullmatch(r"\d{1,3}", span)) and (("." in left_ctx or "." in right_ctx or ":" in left_ctx or ":" in right_ctx))
@@ -2817,194 +4748,165 @@ class PIIFilter:
                         continue
                     add.append(RecognizerResult("TAX_ID", s, e, 0.86))
 
-        # Label-based IDs & TAX
-        for m in self.LABELED_ID_VALUE_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            # Labeled IDs should beat phone matches; raise score above PHONE_NUMBER
-            add.append(RecognizerResult("ID_NUMBER", s, e, 1.02))
-        for m in self.LABELED_TAX_VALUE_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            add.append(RecognizerResult("TAX_ID", s, e, 1.0))
-
-        # US SSN/ITIN/EIN label-led
-        for m in self.SSN_LABEL_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            add.append(RecognizerResult("ID_NUMBER", s, e, 0.94))
-        for m in self.ITIN_LABEL_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            add.append(RecognizerResult("ID_NUMBER", s, e, 0.93))
-        for m in self.EIN_LABEL_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            add.append(RecognizerResult("ID_NUMBER", s, e, 0.93))
-
-        # Government/Legal IDs - labeled (BEFORE Passports to win overlaps)
-        for m in self.DRIVER_LICENSE_LABEL_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            # Labeled identity documents should outrank generic passport pattern matches
-            add.append(RecognizerResult("DRIVER_LICENSE", s, e, 1.05))
-        for m in self.VOTER_ID_LABEL_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            add.append(RecognizerResult("VOTER_ID", s, e, 1.05))
-        for m in self.RESIDENCE_PERMIT_LABEL_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            add.append(RecognizerResult("RESIDENCE_PERMIT", s, e, 1.05))
-        for m in self.BENEFIT_ID_LABEL_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            add.append(RecognizerResult("BENEFIT_ID", s, e, 1.05))
-        for m in self.MILITARY_ID_LABEL_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            add.append(RecognizerResult("MILITARY_ID", s, e, 1.05))
+        # Label-based IDs & TAX, US SSN/ITIN/EIN, government/legal IDs (BEFORE Passports to win overlaps)
+        add_families("LABELED_ID_FAMILIES")
 
         # Passports
-        for m in re.finditer(self.US_PASSPORT_REGEX, text):
-            s, e = m.start(), m.end()
-            left = text[max(0, s - 24):s].lower()
-            # Only boost passport score when explicit passport-like keywords are present
-
-            # strict guard – only accept if passport keyword is nearby
-            if any(k in left for k in self.PASSPORT_KEYWORDS):
-                add.append(RecognizerResult("PASSPORT", s, e, 1.05))
-            else:
-                continue  # reject unlabeled passport-like patterns
+        if want("PASSPORT"):
+            for m in ctx.finditer(self.US_PASSPORT_RX):
+                s, e = m.start(), m.end()
+                # Only boost passport score when explicit passport-like keywords are present
+
+                # strict guard – only accept if passport keyword is nearby
+                if ctx.has("PASSPORT_KEYWORDS", s - 24, s):
+                    add.append(RecognizerResult("PASSPORT", s, e, 1.05))
+                else:
+                    continue  # reject unlabeled passport-like patterns
 
-        for m in re.finditer(self.EU_PASSPORT_REGEX, text):
-            s, e = m.start(), m.end()
-            left = text[max(0, s - 24):s].lower()
-            score = 1.05 if any(k in left for k in set(self.PASSPORT_KEYWORDS)) else 0.90
-            add.append(RecognizerResult("PASSPORT", s, e, score))
+            for m in ctx.finditer(self.EU_PASSPORT_RX):
+                s, e = m.start(), m.end()
+                score = 1.05 if ctx.has("PASSPORT_KEYWORDS", s - 24, s) else 0.90
+                add.append(RecognizerResult("PASSPORT", s, e, score))
 
         # IP
-        for patt in (self.IPV4_REGEX, self.IPV6_REGEX):
-            for m in re.finditer(patt, text, flags=re.I | re.UNICODE):
-                add.append(RecognizerResult("IP_ADDRESS", m.start(), m.end(), 0.95))
+        if want("IP_ADDRESS"):
+            for rx in self.IP_RXS:
+                for m in ctx.finditer(rx):
+                    add.append(RecognizerResult("IP_ADDRESS", m.start(), m.end(), 0.95))
 
         # Credit Cards - labeled gets highest score. Prefer card when brand or label present.
         # Skip candidate if it overlaps a validated IBAN/BIC span to avoid splitting IBANs.
-        def _overlaps(spans, s, e):
-            return any(not (e <= ss or s >= ee) for (ss, ee) in spans)
-        for m in re.finditer(r"(?:(?<!\w)(?:\d[ -]?){13,19}\d(?!\w))", text, flags=re.I | re.UNICODE):
-            raw = m.group()
-            digits = re.sub(r"[^\d]", "", raw)
-            if self._luhn_ok(digits):
-                s, e = m.start(), m.end()
-                # avoid hijacking validated IBAN or BIC spans
-                if _overlaps(validated_iban_spans, s, e) or _overlaps(validated_bic_spans, s, e):
-                    continue
-                left = text[max(0, s - 24):s].lower()
-                if re.search(r"\b(visa|mastercard|master card|amex|american express|diners|jcb)\b", left):
-                    # Brand/left-context detected — ensure credit card beats IMEI and other device-like matches
-                    score = 1.14
-                else:
-                    score = 1.02
-                add.append(RecognizerResult("CREDIT_CARD", s, e, score))
-        for m in self.LABELED_CC_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            raw = text[s:e]
-            digits = re.sub(r"[^\d]", "", raw)
-            if self._luhn_ok(digits):
-                add.append(RecognizerResult("CREDIT_CARD", s, e, 1.08))
+        if want("CREDIT_CARD"):
+            def _overlaps(spans, s, e):
+                return any(not (e <= ss or s >= ee) for (ss, ee) in spans)
+            for m in ctx.finditer(self.CC_CANDIDATE_RX):
+                raw = m.group()
+                digits = re.sub(r"[^\d]", "", raw)
+                if self._luhn_ok(digits):
+                    s, e = m.start(), m.end()
+                    # avoid hijacking validated IBAN or BIC spans
+                    if _overlaps(validated_iban_spans, s, e) or _overlaps(validated_bic_spans, s, e):
+                        continue
+                    left = ctx.window(s - 24, s)
+                    if re.search(r"\b(visa|mastercard|master card|amex|american express|diners|jcb)\b", left):
+                        # Brand/left-context detected — ensure credit card beats IMEI and other device-like matches
+                        score = 1.14
+                    else:
+                        score = 1.02
+                    add.append(RecognizerResult("CREDIT_CARD", s, e, score))
+            for m in ctx.finditer(self.LABELED_CC_RX):
+                s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
+                raw = text[s:e]
+                digits = re.sub(r"[^\d]", "", raw)
+                if self._luhn_ok(digits):
+                    add.append(RecognizerResult("CREDIT_CARD", s, e, 1.08))
 
         # IMEI (validated) — handled in the Devices section below with label-aware scoring
         # (kept out of the earlier injection list to avoid duplicate entries)
 
         # IBAN (validated) - high score to win overlaps
-        for m in self.IBAN_RX.finditer(text):
-            # Skip spans that are clearly part of an email
-            if self._span_inside_email(text, m.start(), m.end()):
-                continue
-            # Avoid false positives where a common short preposition (e.g., 'at', 'in', 'am') looks like a country code
-            m_left = re.search(r"(\b\w+)\s*$", text[:m.start()])
-            if m_left and m_left.group(1).lower() in ("at", "in", "on", "am", "an", "im", "bei", "auf"):
-                continue
-            if self._iban_ok(m.group()):
-                # Make validated IBANs win numeric overlaps (e.g., prevent CREDIT_CARD inside IBAN)
-                add.append(RecognizerResult("BANK_ACCOUNT", m.start(), m.end(), 1.12))
+        if want("BANK_ACCOUNT", "ACCOUNT_NUMBER"):
+            for m in ctx.finditer(self.IBAN_RX):
+                # Skip spans that are clearly part of an email
+                if self._span_inside_email(text, m.start(), m.end(), ctx):
+                    continue
+                # Avoid false positives where a common short preposition (e.g., 'at', 'in', 'am') looks like a country code
+                m_left = re.search(r"(\b\w+)\s*$", text[:m.start()])
+                if m_left and m_left.group(1).lower() in ("at", "in", "on", "am", "an", "im", "bei", "auf"):
+                    continue
+                if self._iban_ok(m.group()):
+                    # Make validated IBANs win numeric overlaps (e.g., prevent CREDIT_CARD inside IBAN)
+                    add.append(RecognizerResult("BANK_ACCOUNT", m.start(), m.end(), 1.12))
 
-        # BIC (uppercase + ISO check)
-        for m in self.BIC_RX.finditer(text):
-            if self._span_inside_email(text, m.start(), m.end()):
-                continue
-            if m.group(2) in self.ISO_COUNTRIES:
-                add.append(RecognizerResult("BANK_ACCOUNT", m.start(), m.end(), 0.90))
-
-        # Labeled bank/Account with guards
-        for m in self.ACCT_LABEL_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            val = text[s:e].strip()
-            if '@' in val:
-                continue
-            if self._span_inside_email(text, s, e):
-                continue
-            if re.match(r'^[A-Za-z]{5,}$', val) and ' ' not in val:
-                if not (self._iban_ok(val) or self.BIC_RX.fullmatch(val) or re.search(r'\d', val)):
+            # BIC (uppercase + ISO check)
+            for m in ctx.finditer(self.BIC_RX):
+                if self._span_inside_email(text, m.start(), m.end(), ctx):
                     continue
-            # DEBUG: guard against accidental plain-word bank matches
-            if re.match(r'^[A-Za-z]{3,}$', val) and not re.search(r'\d', val):
-                # If the candidate is a short/all-alpha token without IBAN/BIC/digits, skip – avoid "beispiel"→BANK
-                # (This avoids bank labels capturing nearby words like email domains or stray tokens)
-                continue
-            # If the label explicitly mentions IBAN, treat as BANK_ACCOUNT even if not checksum-valid
-            label_prefix = text[m.start():m.start(1)].lower()
-            if "iban" in label_prefix:
-                add.append(RecognizerResult("BANK_ACCOUNT", s, e, 1.02))
-                continue
-            if self._iban_ok(val):
-                add.append(RecognizerResult("BANK_ACCOUNT", s, e, 0.99))
-                continue
-            m2 = self.BIC_RX.fullmatch(val)
-            if m2 and m2.group(2) in self.ISO_COUNTRIES:
-                add.append(RecognizerResult("BANK_ACCOUNT", s, e, 0.92))
-                continue
-            compact = re.sub(r"[^\w]", "", val)
-            if 8 <= len(compact) <= 34 and re.match(r"^[A-Za-z0-9]+$", compact):
-                # Labeled account numbers should beat common phone/other matches
-                # Boost score above typical PHONE/OTHER matches so labeled account wins overlap resolution
-                add.append(RecognizerResult("ACCOUNT_NUMBER", s, e, 1.02))
+                if m.group(2) in self.ISO_COUNTRIES:
+                    add.append(RecognizerResult("BANK_ACCOUNT", m.start(), m.end(), 0.90))
+
+            # Labeled bank/Account with guards
+            for m in ctx.finditer(self.ACCT_LABEL_RX):
+                s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
+                val = text[s:e].strip()
+                if '@' in val:
+                    continue
+                if self._span_inside_email(text, s, e, ctx):
+                    continue
+                if re.match(r'^[A-Za-z]{5,}$', val) and ' ' not in val:
+                    if not (self._iban_ok(val) or self.BIC_RX.fullmatch(val) or re.search(r'\d', val)):
+                        continue
+                # DEBUG: guard against accidental plain-word bank matches
+                if re.match(r'^[A-Za-z]{3,}$', val) and not re.search(r'\d', val):
+                    # If the candidate is a short/all-alpha token without IBAN/BIC/digits, skip – avoid "beispiel"→BANK
+                    # (This avoids bank labels capturing nearby words like email domains or stray tokens)
+                    continue
+                # If the label explicitly mentions IBAN, treat as BANK_ACCOUNT even if not checksum-valid
+                label_prefix = ctx.window(m.start(), m.start(1))
+                if "iban" in label_prefix:
+                    add.append(RecognizerResult("BANK_ACCOUNT", s, e, 1.02))
+                    continue
+                if self._iban_ok(val):
+                    add.append(RecognizerResult("BANK_ACCOUNT", s, e, 0.99))
+                    continue
+                m2 = self.BIC_RX.fullmatch(val)
+                if m2 and m2.group(2) in self.ISO_COUNTRIES:
+                    add.append(RecognizerResult("BANK_ACCOUNT", s, e, 0.92))
+                    continue
+                compact = re.sub(r"[^\w]", "", val)
+                if 8 <= len(compact) <= 34 and re.match(r"^[A-Za-z0-9]+$", compact):
+                    # Labeled account numbers should beat common phone/other matches
+                    # Boost score above typical PHONE/OTHER matches so labeled account wins overlap resolution
+                    add.append(RecognizerResult("ACCOUNT_NUMBER", s, e, 1.02))
 
         # Routing numbers (ABA) - boost labeled priority
-        for m in self.ROUTING_RX.finditer(text):
-            nine = m.group(1) if m.lastindex else m.group(0)
-            s1, e1 = (m.start(1), m.end(1)) if m.lastindex else (m.start(0), m.end(0))
-            if self._aba_ok(nine):
-                left = text[max(0, s1 - 24):s1].lower()
-                is_labeled = "routing" in left or "aba" in left or "bankleitzahl" in left
-                score = 1.0 if is_labeled else 0.95
-                add.append(RecognizerResult("ROUTING_NUMBER", s1, e1, score))
+        if want("ROUTING_NUMBER"):
+            for m in ctx.finditer(self.ROUTING_RX):
+                nine = m.group(1) if m.lastindex else m.group(0)
+                s1, e1 = (m.start(1), m.end(1)) if m.lastindex else (m.start(0), m.end(0))
+                if self._aba_ok(nine):
+                    left = ctx.window(s1 - 24, s1)
+                    is_labeled = "routing" in left or "aba" in left or "bankleitzahl" in left
+                    score = 1.0 if is_labeled else 0.95
+                    add.append(RecognizerResult("ROUTING_NUMBER", s1, e1, score))
 
         # Payment/API tokens
-        for m in self.PAYMENT_TOKEN_RX.finditer(text):
-            # Determine which capturing group matched (group 1 or group 2)
-            s = e = None
-            if m.lastindex:
-                for gi in range(1, m.lastindex + 1):
-                    if m.group(gi):
-                        s, e = m.start(gi), m.end(gi)
-                        break
-            if s is None:
-                s, e = m.start(), m.end()
-            token = text[s:e]
-            if len(token) >= 16:
-                # If left context explicitly mentions 'api key' (or localizations), prefer PAYMENT_TOKEN
-                left_ctx = text[max(0, s - 128):s].lower()
-                # Simplified multilingual heuristic: look for 'api' + key/schl variants nearby
-                if ("api" in left_ctx) and any(syn in left_ctx for syn in ("key", "schl", "schlu", "schluessel", "schlüssel", "schlussen")):
-                    # Remove any overlapping API_KEY injections so PAYMENT_TOKEN wins
-                    add = [r for r in add if not (r.entity_type == "API_KEY" and not (e <= r.start or s >= r.end))]
-                    add.append(RecognizerResult("PAYMENT_TOKEN", s, e, 1.07))
-                else:
-                    add.append(RecognizerResult("PAYMENT_TOKEN", s, e, 0.92))
+        if want("PAYMENT_TOKEN"):
+            for m in ctx.finditer(self.PAYMENT_TOKEN_RX):
+                # Determine which capturing group matched (group 1 or group 2)
+                s = e = None
+                if m.lastindex:
+                    for gi in range(1, m.lastindex + 1):
+                        if m.group(gi):
+                            s, e = m.start(gi), m.end(gi)
+                            break
+                if s is None:
+                    s, e = m.start(), m.end()
+                token = text[s:e]
+                if len(token) >= 16:
+                    # If left context explicitly mentions 'api key' (or localizations), prefer PAYMENT_TOKEN
+                    left_ctx = ctx.window(s - 128, s)
+                    # Simplified multilingual heuristic: look for 'api' + key/schl variants nearby
+                    if ("api" in left_ctx) and any(syn in left_ctx for syn in ("key", "schl", "schlu", "schluessel", "schlüssel", "schlussen")):
+                        # Remove any overlapping API_KEY injections so PAYMENT_TOKEN wins
+                        for r in add.overlapping(s, e, ("API_KEY",)):
+                            add.remove(r)
+                        add.append(RecognizerResult("PAYMENT_TOKEN", s, e, 1.07))
+                    else:
+                        add.append(RecognizerResult("PAYMENT_TOKEN", s, e, 0.92))
 
         # Crypto
-        for rx in (self.CRYPTO_BTC_LEGACY, self.CRYPTO_BTC_BECH32, self.CRYPTO_ETH):
-            for m in rx.finditer(text):
-                s, e = m.start(), m.end()
-                left_ctx = text[max(0, s - 40):s].lower()
-                # If labeled with BTC/ETH or nearby 'Adresse' cue, boost score so CRYPTO wins
-                if any(k in left_ctx for k in ("btc", "bitcoin", "bech32", "eth", "ethereum", "adresse")):
-                    score = 1.20
-                else:
-                    score = 0.90
-                add.append(RecognizerResult("CRYPTO_ADDRESS", s, e, score))
+        if want("CRYPTO_ADDRESS"):
+            for rx in (self.CRYPTO_BTC_LEGACY, self.CRYPTO_BTC_BECH32, self.CRYPTO_ETH):
+                for m in ctx.finditer(rx):
+                    s, e = m.start(), m.end()
+                    left_ctx = ctx.window(s - 40, s)
+                    # If labeled with BTC/ETH or nearby 'Adresse' cue, boost score so CRYPTO wins
+                    if any(k in left_ctx for k in ("btc", "bitcoin", "bech32", "eth", "ethereum", "adresse")):
+                        score = 1.20
+                    else:
+                        score = 0.90
+                    add.append(RecognizerResult("CRYPTO_ADDRESS", s, e, score))
 
         # Post-process: stripe/openai-like API_KEY tokens remain as API_KEY
         # for consistency and to meet test requirements. These are actual API keys that should
@@ -3012,114 +4914,111 @@ class PIIFilter:
 
 
         # Health IDs & Info
-        for m in self.HEALTH_ID_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            val = text[s:e]
-            if re.search(r"\b\d{3}\s*\d{3}\s*\d{4}\b", val) and self._nhs_ok(val):
-                add.append(RecognizerResult("HEALTH_ID", s, e, 1.05))  # Higher than PHONE
-            else:
-                add.append(RecognizerResult("HEALTH_ID", s, e, 0.95))
-        for m in self.MRN_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            add.append(RecognizerResult("MRN", s, e, 0.95))  # Increased from 0.90
-        for m in self.INSURANCE_ID_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            add.append(RecognizerResult("INSURANCE_ID", s, e, 0.95))
-        for m in self.HEALTH_INFO_RX.finditer(text):
-            add.append(RecognizerResult("HEALTH_INFO", m.start(), m.end(), 1.0))
+        if want("HEALTH_ID"):
+            for m in ctx.finditer(self.HEALTH_ID_RX):
+                s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
+                val = text[s:e]
+                if re.search(r"\b\d{3}\s*\d{3}\s*\d{4}\b", val) and self._nhs_ok(val):
+                    add.append(RecognizerResult("HEALTH_ID", s, e, 1.05))  # Higher than PHONE
+                else:
+                    add.append(RecognizerResult("HEALTH_ID", s, e, 0.95))
 
-        # Education/Employment
-        for m in self.STUDENT_NUMBER_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            add.append(RecognizerResult("STUDENT_NUMBER", s, e, 0.95))  # Increased from 0.88
-        for m in self.EMPLOYEE_ID_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            add.append(RecognizerResult("EMPLOYEE_ID", s, e, 0.95))  # Increased from 0.90
-        for m in self.PRO_LICENSE_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            add.append(RecognizerResult("PRO_LICENSE", s, e, 0.95))  # Increased from 0.88
+        # Medical records & insurance, Education/Employment
+        add_families("LABELED_RECORD_FAMILIES")
 
         # Contact/Comms
-        for m in self.SOCIAL_HANDLE_RX.finditer(text):
-            add.append(RecognizerResult("SOCIAL_HANDLE", m.start(), m.end(), 0.80))
-        for m in self.DISCORD_ID_RX.finditer(text):
-            add.append(RecognizerResult("MESSAGING_ID", m.start(), m.end(), 0.85))
-        for m in self.MESSAGING_LABELED_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            add.append(RecognizerResult("MESSAGING_ID", s, e, 0.84))
-        for m in self.ZOOM_ID_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            num = re.sub(r"[^\d]", "", text[s:e])
-            if 9 <= len(num) <= 12:
-                add.append(RecognizerResult("MEETING_ID", s, e, 0.88))
-        for m in self.MEET_CODE_RX.finditer(text):
-            add.append(RecognizerResult("MEETING_ID", m.start(1), m.end(1), 0.86))
+        if want("SOCIAL_HANDLE"):
+            for m in ctx.finditer(self.SOCIAL_HANDLE_RX):
+                add.append(RecognizerResult("SOCIAL_HANDLE", m.start(), m.end(), 0.80))
+        if want("MESSAGING_ID"):
+            for m in ctx.finditer(self.DISCORD_ID_RX):
+                add.append(RecognizerResult("MESSAGING_ID", m.start(), m.end(), 0.85))
+            for m in ctx.finditer(self.MESSAGING_LABELED_RX):
+                s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
+                add.append(RecognizerResult("MESSAGING_ID", s, e, 0.84))
+        if want("MEETING_ID"):
+            for m in ctx.finditer(self.ZOOM_ID_RX):
+                s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
+                num = re.sub(r"[^\d]", "", text[s:e])
+                if 9 <= len(num) <= 12:
+                    add.append(RecognizerResult("MEETING_ID", s, e, 0.88))
+            for m in ctx.finditer(self.MEET_CODE_RX):
+                add.append(RecognizerResult("MEETING_ID", m.start(1), m.end(1), 0.86))
 
         # Devices - boost label-led priorities
-        for m in self.MAC_RX.finditer(text):
-            add.append(RecognizerResult("MAC_ADDRESS", m.start(), m.end(), 0.90))
-        for m in self.IMEI_RX.finditer(text):
-            left = text[max(0, m.start() - 24):m.start()].lower()
-            is_labeled = bool(re.search(r"\bimei\b", left))
-            if self._imei_luhn_ok(m.group()):
-                # Ensure valid IMEIs outrank generic credit-card matches; label presence gives slight boost
-                score = 1.12 if is_labeled else 1.10
-                add.append(RecognizerResult("IMEI", m.start(), m.end(), score))
-        for m in self.AD_ID_LABEL_RX.finditer(text):
-            add.append(RecognizerResult("ADVERTISING_ID", m.start(1), m.end(1), 1.0))
-        for m in self.DEVICE_ID_LABEL_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            add.append(RecognizerResult("DEVICE_ID", s, e, 0.88))
-        for m in self.DEVICE_ID_PREFIX_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            add.append(RecognizerResult("DEVICE_ID", s, e, 1.05))  # Higher score to beat generic ID
+        if want("MAC_ADDRESS"):
+            for m in ctx.finditer(self.MAC_RX):
+                add.append(RecognizerResult("MAC_ADDRESS", m.start(), m.end(), 0.90))
+        if want("IMEI"):
+            for m in ctx.finditer(self.IMEI_RX):
+                left = ctx.window(m.start() - 24, m.start())
+                is_labeled = bool(re.search(r"\bimei\b", left))
+                if self._imei_luhn_ok(m.group()):
+                    # Ensure valid IMEIs outrank generic credit-card matches; label presence gives slight boost
+                    score = 1.12 if is_labeled else 1.10
+                    add.append(RecognizerResult("IMEI", m.start(), m.end(), score))
+        if want("ADVERTISING_ID"):
+            for m in ctx.finditer(self.AD_ID_LABEL_RX):
+                add.append(RecognizerResult("ADVERTISING_ID", m.start(1), m.end(1), 1.0))
+        if want("DEVICE_ID"):
+            for m in ctx.finditer(self.DEVICE_ID_LABEL_RX):
+                s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
+                add.append(RecognizerResult("DEVICE_ID", s, e, 0.88))
+            for m in ctx.finditer(self.DEVICE_ID_PREFIX_RX):
+                s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
+                add.append(RecognizerResult("DEVICE_ID", s, e, 1.05))  # Higher score to beat generic ID
 
         # Geographic coordinates, plus codes and what3words
-        for m in self.GEO_COORDS_RX.finditer(text):
-            try:
-                lat = float(m.group(1))
-                lon = float(m.group(2))
-                if self._geo_in_bounds(lat, lon):
-                    add.append(RecognizerResult("GEO_COORDINATES", m.start(), m.end(), 0.90))
-            except Exception:
-                pass
+        if want("GEO_COORDINATES"):
+            for m in ctx.finditer(self.GEO_COORDS_RX):
+                try:
+                    lat = float(m.group(1))
+                    lon = float(m.group(2))
+                    if self._geo_in_bounds(lat, lon):
+                        add.append(RecognizerResult("GEO_COORDINATES", m.start(), m.end(), 0.90))
+                except Exception:
+                    pass
 
-        for m in self.PLUS_CODE_RX.finditer(text):
-            add.append(RecognizerResult("PLUS_CODE", m.start(), m.end(), 0.90))
+        if want("PLUS_CODE"):
+            for m in ctx.finditer(self.PLUS_CODE_RX):
+                add.append(RecognizerResult("PLUS_CODE", m.start(), m.end(), 0.90))
 
-        for m in self.W3W_RX.finditer(text):
-            add.append(RecognizerResult("W3W", m.start(), m.end(), 0.85))
+        if want("W3W"):
+            for m in ctx.finditer(self.W3W_RX):
+                add.append(RecognizerResult("W3W", m.start(), m.end(), 0.85))
 
         # License plate labels
-        for m in self.PLATE_LABEL_RX.finditer(text):
-            s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
-            plate = re.sub(r"\s+", " ", text[s:e]).strip()
-            comp = re.sub(r"[\s\-]", "", plate)
-            if 4 <= len(comp) <= 12:
-                add.append(RecognizerResult("LICENSE_PLATE", s, e, 0.85))
+        if want("LICENSE_PLATE"):
+            for m in ctx.finditer(self.PLATE_LABEL_RX):
+                s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
+                plate = re.sub(r"\s+", " ", text[s:e]).strip()
+                comp = re.sub(r"[\s\-]", "", plate)
+                if 4 <= len(comp) <= 12:
+                    add.append(RecognizerResult("LICENSE_PLATE", s, e, 0.85))
 
         # Remove relative DATE tokens from both base results and injected matches (e.g., 'today')
         RELATIVE_DATE_WORDS = {"today","yesterday","tomorrow","tonight","this morning","this afternoon","this evening"}
         def _is_relative_date(r):
             return r.entity_type in ("DATE",) and text[r.start:r.end].strip().lower() in RELATIVE_DATE_WORDS
         results = [r for r in results if not _is_relative_date(r)]
-        add = [r for r in add if not _is_relative_date(r)]
+        add = _IndexedResults(r for r in add if not _is_relative_date(r))
 
         # Remove BANK/ACCOUNT spans that overlap explicit email matches — prevent splitting emails
-        email_spans = [(r.start, r.end) for r in add if r.entity_type in ("EMAIL", "EMAIL_ADDRESS")]
-        if email_spans:
-            def _overlaps_any(s, e, spans):
-                return any(not (e <= ss or s >= ee) for (ss, ee) in spans)
+        email_types = ("EMAIL", "EMAIL_ADDRESS")
+        if any(r.entity_type in email_types for r in add):
+            def _overlaps_any(s, e):
+                return add.overlaps(s, e, email_types)
             # Filter base results and newly injected candidates
-            results = [r for r in results if not (r.entity_type in ("BANK_ACCOUNT", "ACCOUNT_NUMBER") and _overlaps_any(r.start, r.end, email_spans))]
-            add = [r for r in add if not (r.entity_type in ("BANK_ACCOUNT", "ACCOUNT_NUMBER") and _overlaps_any(r.start, r.end, email_spans))]
+            results = [r for r in results if not (r.entity_type in ("BANK_ACCOUNT", "ACCOUNT_NUMBER") and _overlaps_any(r.start, r.end))]
+            add = [r for r in add if not (r.entity_type in ("BANK_ACCOUNT", "ACCOUNT_NUMBER") and _overlaps_any(r.start, r.end))]
 
-        merged = self._resolve_overlaps(text, results + add)
-        merged = self._filter_label_leading_locations(text, merged)
-        merged = self._filter_label_adjacent_locations(text, merged, window=28)
+        merged = self._resolve_overlaps(text, results + add, ctx)
+        if want("LOCATION"):
+            merged = self._filter_label_leading_locations(text, merged, ctx)
+            merged = self._filter_label_adjacent_locations(text, merged, window=28, ctx=ctx)
         return merged
 
-    def _merge_address_location(self, text, items):
+    def _merge_address_location(self, text, items, ctx=None):
         items = sorted(items, key=lambda r: r.start)
         merged = []
         i = 0
@@ -3157,7 +5056,7 @@ class PIIFilter:
                     continue
             merged.append(cur)
             i += 1
-        return self._resolve_overlaps(text, merged)
+        return self._resolve_overlaps(text, merged, ctx)
     
 
     def add_non_name_tokens_after_ich_bin(self, tokens):
@@ -3169,6 +5068,8 @@ class PIIFilter:
         for w in tokens:
             if isinstance(w, str) and w.strip():
                 self.DE_NON_NAME_AFTER_ICH_BIN.add(w.strip().lower())
+        if self.result_cache is not None:
+            self.result_cache.clear()  # cached results predate the new tokens
 
     # ====================
     # Public API
@@ -3177,16 +5078,224 @@ class PIIFilter:
         self,
         text: str,
         *,
+        language: str = None,
         guards_enabled: bool = True,
         guard_natural_suffix_requires_number: bool = True,
         guard_single_token_addresses: bool = True,
         guard_address_vs_person_priority: bool = True,
         guard_requires_context_without_number: bool = True,
-        guard_context_window: int = 40
+        guard_context_window: int = 40,
+        mode: str = "replace",
+        entities=None,
+        stats=None
     ) -> str:
+        """
+        Replace detected PII in ``text``. ``mode`` is "replace" (<TYPE> tags), "mask", "hash" or
+        "preserve_length" (see _render); the other options go to analyze_text. Pass a
+        PipelineStats as ``stats`` to record per-stage timings (rendering included).
+        ``entities``: a profile name (ENTITY_PROFILES) or iterable of entity types to replace
+        instead of the instance default; detectors for other types are skipped.
+        """
         if not text or not text.strip():
             return text
-        
+        text = unicodedata.normalize("NFC", text)  # analyze_text offsets refer to the NFC form
+        final = self.analyze_text(
+            text,
+            language=language,
+            guards_enabled=guards_enabled,
+            guard_natural_suffix_requires_number=guard_natural_suffix_requires_number,
+            guard_single_token_addresses=guard_single_token_addresses,
+            guard_address_vs_person_priority=guard_address_vs_person_priority,
+            guard_requires_context_without_number=guard_requires_context_without_number,
+            guard_context_window=guard_context_window,
+            entities=entities,
+            stats=stats,
+        )
+        if stats is None:
+            return self._render(text, final, mode=mode)
+        t0 = time.perf_counter()
+        out = self._render(text, final, mode=mode)
+        stats.record("render", time.perf_counter() - t0, len(final), len(final), 0, 0, language=stats.last_language)
+        return out
+
+    def analyze_text(
+        self,
+        text: str,
+        *,
+        language: str = None,
+        guards_enabled: bool = True,
+        guard_natural_suffix_requires_number: bool = True,
+        guard_single_token_addresses: bool = True,
+        guard_address_vs_person_priority: bool = True,
+        guard_requires_context_without_number: bool = True,
+        guard_context_window: int = 40,
+        entities=None,
+        stats=None
+    ) -> list:
+        """
+        Final resolved entities (RecognizerResult), sorted by (start, end) — exactly the spans
+        anonymize_text replaces, without rendering. Offsets refer to the NFC-normalized text,
+        which is ``text`` itself for NFC input. ``stats``: optional PipelineStats. ``entities``:
+        restrict detection to a profile or set of entity types (default: the instance's ``entities``).
+        With a result cache, repeated texts are answered from it (not when ``stats`` is given).
+        """
+        options = dict(
+            language=language,
+            guards_enabled=guards_enabled,
+            guard_natural_suffix_requires_number=guard_natural_suffix_requires_number,
+            guard_single_token_addresses=guard_single_token_addresses,
+            guard_address_vs_person_priority=guard_address_vs_person_priority,
+            guard_requires_context_without_number=guard_requires_context_without_number,
+            guard_context_window=guard_context_window,
+            entities=entities,
+        )
+        key = None
+        if self.result_cache is not None and stats is None and text and text.strip():
+            text = unicodedata.normalize("NFC", text)
+            key = self._result_cache_key(text, options)
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                return [copy.copy(r) for r in cached]
+        _, final = self._detect_entities(text, stats=stats, **options)
+        final = sorted(final, key=lambda r: (r.start, r.end))
+        if key is not None:
+            self.result_cache.put(key, tuple(copy.copy(r) for r in final))
+        return final
+
+    def _result_cache_key(self, text, options):
+        """(digest of the NFC text, everything else the result depends on); holds no raw text."""
+        entities = options["entities"]
+        if entities is not None:
+            entities = tuple(sorted(self._entity_selection(entities)[0]))
+        config = dict(options, entities=entities, loose_tax=self.ENABLE_LOOSE_TAX,
+                      strict_location=self.STRICT_LOCATION_POSTAL_ONLY, bank=self.pattern_bank_version)
+        return self.result_cache.fingerprint(text.encode("utf-8", "surrogatepass")), tuple(sorted(config.items()))
+
+    # Label-led families of _inject_custom_matches, each table scanned as one PatternUnion: rows of
+    # (bank pattern, entity type, score), added in row order with the span of group 1 if it took part
+    LABELED_ID_FAMILIES = (
+        ("LABELED_ID_VALUE_RX", "ID_NUMBER", 1.02),  # labeled IDs beat phone matches: above PHONE_NUMBER
+        ("LABELED_TAX_VALUE_RX", "TAX_ID", 1.0),
+        ("SSN_LABEL_RX", "ID_NUMBER", 0.94),
+        ("ITIN_LABEL_RX", "ID_NUMBER", 0.93),
+        ("EIN_LABEL_RX", "ID_NUMBER", 0.93),
+        # Labeled identity documents outrank generic passport pattern matches
+        ("DRIVER_LICENSE_LABEL_RX", "DRIVER_LICENSE", 1.05),
+        ("VOTER_ID_LABEL_RX", "VOTER_ID", 1.05),
+        ("RESIDENCE_PERMIT_LABEL_RX", "RESIDENCE_PERMIT", 1.05),
+        ("BENEFIT_ID_LABEL_RX", "BENEFIT_ID", 1.05),
+        ("MILITARY_ID_LABEL_RX", "MILITARY_ID", 1.05),
+    )
+    LABELED_RECORD_FAMILIES = (
+        ("MRN_RX", "MRN", 0.95),  # Increased from 0.90
+        ("INSURANCE_ID_RX", "INSURANCE_ID", 0.95),
+        ("HEALTH_INFO_RX", "HEALTH_INFO", 1.0),
+        ("STUDENT_NUMBER_RX", "STUDENT_NUMBER", 0.95),  # Increased from 0.88
+        ("EMPLOYEE_ID_RX", "EMPLOYEE_ID", 0.95),  # Increased from 0.90
+        ("PRO_LICENSE_RX", "PRO_LICENSE", 0.95),  # Increased from 0.88
+    )
+    FAMILY_TABLES = ("LABELED_ID_FAMILIES", "LABELED_RECORD_FAMILIES")
+
+    # Lexicons the stages probe as "any keyword within these chars?"; one automaton scan per text
+    # answers all of them (see AnalysisContext.has)
+    KEYWORD_CLASSES = (
+        "INTRO_CUES", "STREET_BLOCKERS", "ID_KEYWORDS", "PASSPORT_KEYWORDS", "ACCOUNT_LABELS",
+        "ADDRESS_CONTEXT_KEYWORDS",
+    )
+    _KEYWORD_AUTOMATA = {}  # lexicon contents -> KeywordAutomaton, shared process-wide like the bank
+
+    def _literal_gates(self, names):
+        """
+        Prefilter for the bank entries ``names`` as set on this instance: (gates, classes) where gates
+        maps id(pattern) to (pattern, class name) for each pattern with required literals (see
+        _required_literals) and classes holds those literals per class (named after the first pattern
+        needing them). Keyed by id: hashing a compiled pattern rehashes its whole program every time.
+        The keyword automaton scans the classes, so one pass over the text decides which families run.
+        """
+        gates, classes, by_literals = {}, {}, {}
+
+        def gate(path, rx):
+            literals = _required_literals(rx)
+            if literals:
+                name = by_literals.setdefault(literals, path)
+                gates[id(rx)] = (rx, name)
+                classes[name] = literals
+            return rx
+
+        for name in names:
+            _map_patterns(name, self.__dict__[name], gate, proxies=True)
+        return gates, classes
+
+    def _keyword_automaton(self, literal_classes=None):
+        classes = {name: tuple(sorted(getattr(self, name))) for name in self.KEYWORD_CLASSES}
+        classes.update(literal_classes or {})
+        key = tuple(classes.items())
+        with _PATTERN_BANK_LOCK:
+            automaton = self._KEYWORD_AUTOMATA.get(key)
+            if automaton is None:
+                automaton = self._KEYWORD_AUTOMATA[key] = KeywordAutomaton(classes)
+        return automaton
+
+    def _analysis_context(self, text):
+        """Shared per-call derived data for ``text`` (see AnalysisContext)."""
+        return AnalysisContext(text, self.keyword_automaton, self.literal_gates)
+
+    def _entity_selection(self, entities):
+        """
+        (requested, detect) for an ``entities`` argument: a profile name from ENTITY_PROFILES or an
+        iterable of ALLOWED_ENTITIES types, plus their ENTITY_DEPENDENCIES. None selects everything.
+        """
+        if entities is None:
+            return None, None
+        if isinstance(entities, str):
+            if entities not in self.ENTITY_PROFILES:
+                raise ValueError(f"entities must be one of {tuple(self.ENTITY_PROFILES)} or an iterable of entity types, got {entities!r}")
+            entities = self.ENTITY_PROFILES[entities]
+        requested = frozenset(entities)
+        unknown = sorted(requested - set(self.ALLOWED_ENTITIES))
+        if unknown:
+            raise ValueError(f"entities has unknown entity types: {unknown}")
+        detect, todo = set(requested), list(requested)
+        while todo:
+            for dep in self.ENTITY_DEPENDENCIES.get(todo.pop(), ()):
+                if dep not in detect:
+                    detect.add(dep)
+                    todo.append(dep)
+        return requested, frozenset(detect)
+
+    def _analyzer_entities(self, lang):
+        """Entity types some registered recognizer serves in ``lang`` (Presidio's own matching rule)."""
+        types = self._analyzer_entity_cache.get(lang)
+        if types is None:
+            types = self._analyzer_entity_cache[lang] = frozenset(
+                e for rec in self.analyzer.registry.recognizers
+                if rec.supported_language == lang for e in rec.supported_entities
+            )
+        return types
+
+    def _detect_entities(
+        self,
+        text: str,
+        *,
+        language: str = None,
+        guards_enabled: bool = True,
+        guard_natural_suffix_requires_number: bool = True,
+        guard_single_token_addresses: bool = True,
+        guard_address_vs_person_priority: bool = True,
+        guard_requires_context_without_number: bool = True,
+        guard_context_window: int = 40,
+        entities=None,
+        stats=None
+    ):
+        """Full detection pipeline; returns (NFC-normalized text, final RecognizerResults)."""
+        if not text or not text.strip():
+            return text, []
+        # Per-stage timing only when asked for (see PipelineStats); otherwise one None check per stage
+        clock = _StageClock(stats) if stats is not None else None
+        requested, detect = self._default_entities if entities is None else self._entity_selection(entities)
+
+        def want(*types):
+            return detect is None or not detect.isdisjoint(types)
 
             # 🔠 Normalize to NFC so intros like "M\u0306a\u0306" match "Mă"
         try:
@@ -3195,33 +5304,44 @@ class PIIFilter:
             pass
 
 
-        try:
-            lang = detect(text)
-        except Exception:
+        supported = getattr(self.analyzer, "supported_languages", {"en"})
+        if self.nlp_engine_name == "pattern":
+            # Pattern recognizers are language-agnostic; detection would only pick the spaCy model
             lang = "en"
-        if lang not in getattr(self.analyzer, "supported_languages", {"en"}):
-            lang = "en"
-
+        elif language is not None:
+            lang = language if language in supported else "en"
+        else:
+            lang = self.language_router.route(text, supported)
+
+        ctx = self._analysis_context(text)
+        if clock: clock.lap("normalize_route_language", (), lang)
+        if detect is None:
+            analyzer_entities = self.ALLOWED_ENTITIES
+        else:
+            # Only recognizers serving a selected type run; Presidio refuses a request none can serve
+            supported_here = self._analyzer_entities(lang)
+            analyzer_entities = [t for t in self.ALLOWED_ENTITIES if t in detect and t in supported_here]
         base = self.analyzer.analyze(
             text=text,
             language=lang,
-            entities=self.ALLOWED_ENTITIES,
+            entities=analyzer_entities,
             score_threshold=0.50
-        )
+        ) if analyzer_entities else []
 
+        if clock: clock.lap("analyze", base)
         # PERSON cleanup
         filtered = []
         for r in base:
             # Drop BANK/ACCOUNT results that are clearly contained in emails or contain no digits
             if r.entity_type in ("BANK_ACCOUNT", "ACCOUNT_NUMBER"):
                 span_text = text[r.start:r.end]
-                if self._span_inside_email(text, r.start, r.end):
+                if self._span_inside_email(text, r.start, r.end, ctx):
                     continue
                 if not re.search(r"\d", span_text):
                     continue
                 # Additional guard: require IBAN validation or an explicit nearby bank/account label
                 if not (self._iban_ok(span_text) or self.BIC_RX.fullmatch(span_text)):
-                    left_ctx = text[max(0, r.start - 28):r.start].lower()
+                    left_ctx = ctx.window(r.start - 28, r.start)
                     if not re.search(r"\b(iban|bic|swift|account|acct|konto|kontonummer|bank|kontonr)\b", left_ctx):
                         # Reject likely false-positive bank spans like short words or adjectives
                         continue
@@ -3238,13 +5358,13 @@ class PIIFilter:
                 if addr_m and re.search(r"\d", addr_m.group()):
                     # Guard against matching education/employment IDs as addresses (e.g., "student ID is STU-12345"
                     # where "student" contains "tal" which is a street suffix in German).
-                    broader_ctx = text[max(0, r.start - 50):r.end + 10].lower()
+                    broader_ctx = ctx.window(r.start - 50, r.end + 10)
                     if any(label in broader_ctx for label in ["student id", "student number", "studentenausweis",
                                                               "employee id", "employee number",
                                                               "professional license", "license number",
                                                               "pro license", "credential"]):
                         # This is likely an education/employment ID, not an address - skip extracting as ADDRESS
-                        if not self._plausible_person(span, text, r.start):
+                        if not self._plausible_person(span, text, r.start, ctx):
                             continue
                         filtered.append(r)
                         continue
@@ -3253,7 +5373,7 @@ class PIIFilter:
                     addr_e = r.start + (addr_m.end() + (offset if offset else 0))
                     # keep only the leading person part if it's a plausible person
                     leading = span[:addr_m.start()].strip()
-                    if leading and self._plausible_person(leading, text, r.start):
+                    if leading and self._plausible_person(leading, text, r.start, ctx):
                         new_end = r.start + (addr_m.start() + (offset if offset else 0))
                         if new_end - r.start >= 2:
                             r = RecognizerResult("PERSON", r.start, new_end, r.score)
@@ -3261,15 +5381,19 @@ class PIIFilter:
                     # inject address
                     filtered.append(RecognizerResult("ADDRESS", addr_s, addr_e, 1.02))
                     continue
-                if not self._plausible_person(span, text, r.start):
+                if not self._plausible_person(span, text, r.start, ctx):
                     continue
             filtered.append(r)
 
+        if clock: clock.lap("person_cleanup", filtered)
         # Intro persons
-        filtered = self._inject_name_intro_persons(text, filtered)
+        if want("PERSON"):
+            filtered = self._inject_name_intro_persons(text, filtered, ctx)
+        if clock: clock.lap("inject_name_intro_persons", filtered)
 
         # Custom injections
-        final = self._inject_custom_matches(text, filtered)
+        final = self._inject_custom_matches(text, filtered, detect, ctx)
+        if clock: clock.lap("inject_custom_matches", final)
 
         # Remove BANK/ACCOUNT spans that overlap with EMAIL spans (avoid replacing parts of emails)
         email_spans = [(r.start, r.end) for r in final if r.entity_type in ("EMAIL", "EMAIL_ADDRESS")]
@@ -3283,6 +5407,7 @@ class PIIFilter:
                 preserved.append(r)
             final = preserved
         
+        if clock: clock.lap("drop_accounts_inside_emails", final)
         # Drop PERSON spans that are clearly non-person single tokens (e.g., Gewerbe)
         # OR multi-token spans that start with sentence structure (pronouns + verbs)
         pruned = []
@@ -3306,6 +5431,7 @@ class PIIFilter:
                         continue
             pruned.append(r)
         final = pruned
+        if clock: clock.lap("prune_non_person_spans", final)
 
         # Drop EMAIL / PHONE_NUMBER that appear as a separate labeled line immediately
         # following an ADDRESS line to avoid 'bleed' where labels become attached.
@@ -3314,17 +5440,18 @@ class PIIFilter:
         for r in final:
             if r.entity_type in ("EMAIL", "EMAIL_ADDRESS", "PHONE_NUMBER"):
                 # find the start of the current line
-                line_start = text.rfind("\n", 0, r.start)
+                line_start = ctx.line_break_before(r.start)
                 if line_start != -1:
                     # check the token left of the line for an ADDRESS that ends before this line
                     if any(aend <= line_start for (astart, aend) in addr_spans):
                         # If the line begins with an obvious label like 'email' or 'telefon', drop the contact entity
-                        label = text[line_start + 1:r.start].lower()
+                        label = ctx.window(line_start + 1, r.start)
                         if re.search(r"\b(email|e-mail|mail|telefon|telefon:|phone|telefonnummer|tel)\b", label):
                             continue
             preserved.append(r)
         final = preserved
 
+        if clock: clock.lap("drop_contacts_after_address", final)
         # Filter out PERSON followed by a DATE via connecting prepositions (e.g., 'unter 01.01')
         def _filter_person_before_date_with_prep(text, items):
             out = []
@@ -3337,13 +5464,13 @@ class PIIFilter:
                 # Check for a DATE entity following with a connecting 'unter'
                 for d in items:
                     if d.entity_type in ("DATE",) and 0 <= d.start - r.end <= 24:
-                        mid = text[r.end:d.start].lower()
+                        mid = ctx.window(r.end, d.start)
                         if re.search(r"\bunter\b", mid):
                             dropped = True
                             break
                 # Also check raw right-context like 'unter 12.04' even if no DATE entity was produced
                 if not dropped:
-                    right = text[r.end:r.end+24].lower()
+                    right = ctx.window(r.end, r.end+24)
                     if re.search(r"\bunter\b\s*\d{1,2}[./-]\d{1,2}\b", right):
                         dropped = True
                 if dropped:
@@ -3352,13 +5479,15 @@ class PIIFilter:
                 else:
                     out.append(r)
             return out
-        final = _filter_person_before_date_with_prep(text, final)
+        if want("PERSON"):
+            final = _filter_person_before_date_with_prep(text, final)
+        if clock: clock.lap("filter_person_before_date_with_prep", final)
 
         # Filter out PERSON results that are part of STUDENT_NUMBER patterns
         def _filter_person_student_id(text, items):
             # Find all STUDENT_NUMBER spans first
             student_spans = []
-            for m in self.STUDENT_NUMBER_RX.finditer(text):
+            for m in ctx.finditer(self.STUDENT_NUMBER_RX):
                 s, e = (m.start(1), m.end(1)) if m.lastindex else (m.start(), m.end())
                 student_spans.append((s, e))
             
@@ -3376,16 +5505,22 @@ class PIIFilter:
                 if not is_student_id:
                     out.append(r)
             return out
-        final = _filter_person_student_id(text, final)
+        if want("PERSON"):
+            final = _filter_person_student_id(text, final)
+        if clock: clock.lap("filter_person_student_id", final)
 
         # Drop LOCATION when a label keyword is inline or adjacent
-        final = self._filter_locations_with_inline_or_near_labels(text, final, window=28)
+        if want("LOCATION"):
+            final = self._filter_locations_with_inline_or_near_labels(text, final, window=28)
+        if clock: clock.lap("filter_locations_with_inline_or_near_labels", final)
 
         # strict LOCATION policy — drop standalone city names unless postal/near-address
-        final = self._filter_non_postal_locations(text, final, enable=self.STRICT_LOCATION_POSTAL_ONLY)
+        if want("LOCATION"):
+            final = self._filter_non_postal_locations(text, final, enable=self.STRICT_LOCATION_POSTAL_ONLY)
+        if clock: clock.lap("filter_non_postal_locations", final)
 
         # Address guards
-        if guards_enabled:
+        if guards_enabled and want("ADDRESS"):
             if guard_natural_suffix_requires_number:
                 final = self._guard_natural_suffix_requires_number(text, final, self.NATURAL_SUFFIXES)
             if guard_single_token_addresses:
@@ -3393,105 +5528,424 @@ class PIIFilter:
             if guard_address_vs_person_priority:
                 final = self._guard_address_vs_person(final)
             if guard_requires_context_without_number:
-                final = self._guard_requires_context(text, final, self.ADDRESS_CONTEXT_KEYWORDS, guard_context_window)
+                final = self._guard_requires_context(text, final, "ADDRESS_CONTEXT_KEYWORDS", guard_context_window, ctx)
+        if clock: clock.lap("address_guards", final)
 
         # Phone/date & meeting promotion
-        final = self._demote_phone_over_date(text, final)
-        final = self._demote_phone_over_health_id(text, final)
-        final = self._promote_meeting_over_phone(text, final, window=24)
+        if want("PHONE_NUMBER"):
+            final = self._demote_phone_over_date(text, final)
+        if clock: clock.lap("demote_phone_over_date", final)
+        if want("PHONE_NUMBER"):
+            final = self._demote_phone_over_health_id(text, final)
+        if clock: clock.lap("demote_phone_over_health_id", final)
+        # Not gated: it ends with a _resolve_overlaps pass every entity type goes through
+        final = self._promote_meeting_over_phone(text, final, window=24, ctx=ctx)
+        if clock: clock.lap("promote_meeting_over_phone", final)
 
         # Address span trimming
-        final = self._trim_address_spans(text, final)
+        if want("ADDRESS"):
+            final = self._trim_address_spans(text, final, ctx)
+        if clock: clock.lap("trim_address_spans", final)
 
         # ID false-positive filter
-        final = self._filter_idnumber_false_positives(text, final)
+        if want("ID_NUMBER"):
+            final = self._filter_idnumber_false_positives(text, final)
+        if clock: clock.lap("filter_idnumber_false_positives", final)
 
         # Promote phone-like spans to ACCOUNT_NUMBER when a bank label is immediately left
-        final = self._promote_phone_to_account_if_labeled(text, final)
+        if want("PHONE_NUMBER"):
+            final = self._promote_phone_to_account_if_labeled(text, final, ctx)
+        if clock: clock.lap("promote_phone_to_account_if_labeled", final)
 
         # Merge address/location
-        final = self._merge_address_location(text, final)
+        final = self._merge_address_location(text, final, ctx)
+        if clock: clock.lap("merge_address_location", final)
+
+        # Entity subset: drop the helper types detected only for their effect on the requested ones
+        if requested is not None:
+            final = [r for r in final if r.entity_type in requested]
 
         ##print("DEBUG ENTITIES:")
         #for rr in final:
          #   print(rr.entity_type, repr(text[rr.start:rr.end]), rr.start, rr.end)
         #print("----- END DEBUG -----")
+        return text, final
+
+    # ===========================
+    # Rendering
+    # ===========================
+    # Replacement tag per entity type, built once (types not listed render as "<TYPE>" too)
+    ENTITY_TAGS = {
+        "PERSON":           "<PERSON>",
+        "EMAIL_ADDRESS":    "<EMAIL_ADDRESS>",
+        "PHONE_NUMBER":     "<PHONE_NUMBER>",
+        "FAX_NUMBER":       "<FAX_NUMBER>",
+        "ADDRESS":          "<ADDRESS>",
+        "LOCATION":         "<LOCATION>",
+        "DATE":             "<DATE>",
+        "PASSPORT":         "<PASSPORT>",
+        "ID_NUMBER":        "<ID_NUMBER>",
+        "TAX_ID":           "<TAX_ID>",
+        "IP_ADDRESS":       "<IP_ADDRESS>",
+        "EORI":             "<EORI>",
+        "COMMERCIAL_REGISTER": "<COMMERCIAL_REGISTER>",
+        "CASE_REFERENCE":   "<CASE_REFERENCE>",
+
+        "CREDIT_CARD":      "<CREDIT_CARD>",
+        "BANK_ACCOUNT":     "<BANK_ACCOUNT>",
+        "ROUTING_NUMBER":   "<ROUTING_NUMBER>",
+        "ACCOUNT_NUMBER":   "<ACCOUNT_NUMBER>",
+        "PAYMENT_TOKEN":    "<PAYMENT_TOKEN>",
+        "CRYPTO_ADDRESS":   "<CRYPTO_ADDRESS>",
+
+        "DRIVER_LICENSE":   "<DRIVER_LICENSE>",
+        "VOTER_ID":         "<VOTER_ID>",
+        "RESIDENCE_PERMIT": "<RESIDENCE_PERMIT>",
+        "BENEFIT_ID":       "<BENEFIT_ID>",
+        "MILITARY_ID":      "<MILITARY_ID>",
+
+        "HEALTH_ID":        "<HEALTH_ID>",
+        "MRN":              "<MRN>",
+        "INSURANCE_ID":     "<INSURANCE_ID>",
+        "HEALTH_INFO":      "<HEALTH_INFO>",
+
+        "STUDENT_NUMBER":   "<STUDENT_NUMBER>",
+        "EMPLOYEE_ID":      "<EMPLOYEE_ID>",
+        "PRO_LICENSE":      "<PRO_LICENSE>",
+
+        "SOCIAL_HANDLE":    "<SOCIAL_HANDLE>",
+        "MESSAGING_ID":     "<MESSAGING_ID>",
+        "MEETING_ID":       "<MEETING_ID>",
+
+        "MAC_ADDRESS":      "<MAC_ADDRESS>",
+        "IMEI":             "<IMEI>",
+        "ADVERTISING_ID":   "<ADVERTISING_ID>",
+        "DEVICE_ID":        "<DEVICE_ID>",
+
+        "GEO_COORDINATES":  "<GEO_COORDINATES>",
+        "PLUS_CODE":        "<PLUS_CODE>",
+        "W3W":              "<W3W>",
+        "LICENSE_PLATE":    "<LICENSE_PLATE>",
+
+        "BUND_ID":          "<BUND_ID>",
+        "ELSTER_ID":        "<ELSTER_ID>",
+        "SERVICEKONTO":     "<SERVICEKONTO>",
+
+        "PASSWORD":         "<PASSWORD>",
+        "PIN":              "<PIN>",
+        "TAN":              "<TAN>",
+        "PUK":              "<PUK>",
+        "RECOVERY_CODE":    "<RECOVERY_CODE>",
+
+        "FILE_NUMBER":      "<FILE_NUMBER>",
+        "TRANSACTION_NUMBER": "<TRANSACTION_NUMBER>",
+        "CUSTOMER_NUMBER":  "<CUSTOMER_NUMBER>",
+        "TICKET_ID":        "<TICKET_ID>",
+
+        "API_KEY":          "<API_KEY>",
+        "SESSION_ID":       "<SESSION_ID>",
+        "ACCESS_TOKEN":     "<ACCESS_TOKEN>",
+        "REFRESH_TOKEN":    "<REFRESH_TOKEN>",
+        "ACCESS_CODE":      "<ACCESS_CODE>",
+        "OTP_CODE":         "<OTP_CODE>",
+    }
+    RENDER_MODES = ("replace", "mask", "hash", "preserve_length")
+
+    def _render(self, text, final, mode="replace", mask_char="*"):
+        """
+        Write ``text`` with each span replaced, in one pass (list join). Same output as Presidio's
+        AnonymizerEngine with MERGE_SIMILAR_OR_CONTAINED: same-type overlaps merge, contained
+        spans drop, same-type spans separated only by spaces merge, partial overlaps are clipped.
+
+        Modes: "replace" -> <TYPE> tag; "mask" -> ``mask_char`` per character; "hash" -> SHA-256
+        hex of the span; "preserve_length" -> the tag cut/padded to the span's length, so offsets
+        of the surrounding text stay valid.
+        """
+        if mode not in self.RENDER_MODES:
+            raise ValueError(f"mode must be one of {self.RENDER_MODES}, got {mode!r}")
+        spans = self._render_spans(text, final)
+        tags = self.ENTITY_TAGS
+        out, pos = [], 0
+        for i, (ent, s, e) in enumerate(spans):
+            if i + 1 < len(spans):
+                e = min(e, spans[i + 1][1])  # a later-starting span wins the overlap
+            tag = tags.get(ent) or f"<{ent}>"
+            if mode == "replace":
+                new = tag
+            elif mode == "mask":
+                new = mask_char * (e - s)
+            elif mode == "hash":
+                new = hashlib.sha256(text[s:e].encode("utf-8")).hexdigest()
+            else:
+                n = e - s
+                new = tag[:n - 1] + ">" if len(tag) > n >= 2 else (tag + mask_char * n)[:n]
+            out += (text[pos:s], new)
+            pos = e
+        out.append(text[pos:])
+        return "".join(out)
+
+    def _render_spans(self, text, final):
+        """(entity_type, start, end) to render, sorted by start, after Presidio's conflict rules."""
+        items = sorted(final, key=lambda r: (r.start, r.end))
+        resolved = []
+        cluster = []
+        reach = -1
+        for r in items + [None]:
+            # Spans touching or overlapping form a cluster; only those can merge or conflict
+            if r is not None and r.start <= reach:
+                cluster.append(r)
+                reach = max(reach, r.end)
+                continue
+            if len(cluster) == 1:
+                c = cluster[0]
+                resolved.append((c.entity_type, c.start, c.end))
+            elif cluster:
+                resolved += self._resolve_render_cluster(cluster)
+            if r is not None:
+                cluster, reach = [r], r.end
+        # Adjacent same-type spans with only spaces between them render as one
+        merged = []
+        for ent, s, e in resolved:
+            if merged and merged[-1][0] == ent and _SPACES_ONLY_RX.match(text, merged[-1][2], s):
+                s = merged.pop()[1]
+            merged.append((ent, s, e))
+        return sorted(merged, key=lambda t: t[1])
+
+    def _resolve_render_cluster(self, cluster):
+        # Rare (the resolver already removed most overlaps): let Presidio's own quadratic
+        # conflict handling settle this small cluster so output stays identical
+        from presidio_anonymizer.entities import ConflictResolutionStrategy
+        from presidio_anonymizer.entities import RecognizerResult as AnonymizerResult
+        copies = [AnonymizerResult(r.entity_type, r.start, r.end, r.score) for r in cluster]
+        kept = self.anonymizer._remove_conflicts_and_get_text_manipulation_data(
+            copies, ConflictResolutionStrategy.MERGE_SIMILAR_OR_CONTAINED
+        )
+        return [(r.entity_type, r.start, r.end) for r in kept]
+
+    # Widest look-around a detector uses, with headroom: intro cues scan 48 chars, address blocks
+    # span 3 lines, label guards 24-40 chars. Stream windows carry this much context on each side.
+    STREAM_OVERLAP_DEFAULT = 512
+
+    def anonymize_stream(self, stream, chunk_size=64 * 1024, overlap=STREAM_OVERLAP_DEFAULT, **kwargs):
+        """
+        Anonymize a text file-like object window by window; yields output pieces in order.
+
+        Each window holds about ``chunk_size`` new characters plus ``overlap`` characters of context
+        on both sides. Only the middle is emitted, cut at a line break where possible and never
+        inside a detected entity, so memory stays flat however large the input is. ``kwargs`` go
+        to anonymize_text; without ``language`` it is routed once, from the first window.
+        """
+        if chunk_size < 1 or overlap < 0:
+            raise ValueError(f"need chunk_size >= 1 and overlap >= 0, got {chunk_size!r}, {overlap!r}")
+        mode = kwargs.pop("mode", "replace")
+        buf, done = "", 0  # buf[:done] was already emitted and only serves as left context
+        eof = False
+        while not eof:
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            if chunk:
+                buf = buf[:done] + unicodedata.normalize("NFC", buf[done:] + chunk)
+            if not eof and len(buf) - done < chunk_size + overlap:
+                continue
+            if done == len(buf):
+                continue
+            if kwargs.get("language") is None:
+                supported = getattr(self.analyzer, "supported_languages", {"en"})
+                kwargs["language"] = self.language_router.route(buf[done:], supported)
+            text, final = self._detect_entities(buf, **kwargs)
+            cut = len(text) if eof else self._stream_cut(text, final, done, len(text) - overlap)
+            if cut is None:
+                continue  # one entity spans the whole pending part; read on
+            # Entities reaching back into already-emitted context are clipped, not dropped
+            piece = [
+                RecognizerResult(r.entity_type, max(r.start, done) - done, r.end - done, r.score)
+                for r in final if r.end > done and r.start < cut
+            ]
+            yield self._render(text[done:cut], piece, mode=mode)
+            start = max(0, cut - overlap)
+            nl = text.rfind("\n", 0, start)
+            if nl != -1 and start - nl <= overlap:
+                start = nl + 1  # keep whole lines as left context
+            buf, done = text[start:], cut - start
 
-        # Replacements: single-escaped HTML tokens
-        operators = {
-            "PERSON":           OperatorConfig("replace", {"new_value": "<PERSON>"}),
-            "EMAIL_ADDRESS":    OperatorConfig("replace", {"new_value": "<EMAIL_ADDRESS>"}),
-            "PHONE_NUMBER":     OperatorConfig("replace", {"new_value": "<PHONE_NUMBER>"}),
-            "FAX_NUMBER":       OperatorConfig("replace", {"new_value": "<FAX_NUMBER>"}),
-            "ADDRESS":          OperatorConfig("replace", {"new_value": "<ADDRESS>"}),
-            "LOCATION":         OperatorConfig("replace", {"new_value": "<LOCATION>"}),
-            "DATE":             OperatorConfig("replace", {"new_value": "<DATE>"}),
-            "PASSPORT":         OperatorConfig("replace", {"new_value": "<PASSPORT>"}),
-            "ID_NUMBER":        OperatorConfig("replace", {"new_value": "<ID_NUMBER>"}),
-            "TAX_ID":           OperatorConfig("replace", {"new_value": "<TAX_ID>"}),
-            "IP_ADDRESS":       OperatorConfig("replace", {"new_value": "<IP_ADDRESS>"}),
-            "EORI":             OperatorConfig("replace", {"new_value": "<EORI>"}),
-            "COMMERCIAL_REGISTER": OperatorConfig("replace", {"new_value": "<COMMERCIAL_REGISTER>"}),
-            "CASE_REFERENCE":   OperatorConfig("replace", {"new_value": "<CASE_REFERENCE>"}),
-
-            "CREDIT_CARD":      OperatorConfig("replace", {"new_value": "<CREDIT_CARD>"}),
-            "BANK_ACCOUNT":     OperatorConfig("replace", {"new_value": "<BANK_ACCOUNT>"}),
-            "ROUTING_NUMBER":   OperatorConfig("replace", {"new_value": "<ROUTING_NUMBER>"}),
-            "ACCOUNT_NUMBER":   OperatorConfig("replace", {"new_value": "<ACCOUNT_NUMBER>"}),
-            "PAYMENT_TOKEN":    OperatorConfig("replace", {"new_value": "<PAYMENT_TOKEN>"}),
-            "CRYPTO_ADDRESS":   OperatorConfig("replace", {"new_value": "<CRYPTO_ADDRESS>"}),
-
-            "DRIVER_LICENSE":   OperatorConfig("replace", {"new_value": "<DRIVER_LICENSE>"}),
-            "VOTER_ID":         OperatorConfig("replace", {"new_value": "<VOTER_ID>"}),
-            "RESIDENCE_PERMIT": OperatorConfig("replace", {"new_value": "<RESIDENCE_PERMIT>"}),
-            "BENEFIT_ID":       OperatorConfig("replace", {"new_value": "<BENEFIT_ID>"}),
-            "MILITARY_ID":      OperatorConfig("replace", {"new_value": "<MILITARY_ID>"}),
-
-            "HEALTH_ID":        OperatorConfig("replace", {"new_value": "<HEALTH_ID>"}),
-            "MRN":              OperatorConfig("replace", {"new_value": "<MRN>"}),
-            "INSURANCE_ID":     OperatorConfig("replace", {"new_value": "<INSURANCE_ID>"}),
-            "HEALTH_INFO":      OperatorConfig("replace", {"new_value": "<HEALTH_INFO>"}),
-
-            "STUDENT_NUMBER":   OperatorConfig("replace", {"new_value": "<STUDENT_NUMBER>"}),
-            "EMPLOYEE_ID":      OperatorConfig("replace", {"new_value": "<EMPLOYEE_ID>"}),
-            "PRO_LICENSE":      OperatorConfig("replace", {"new_value": "<PRO_LICENSE>"}),
-
-            "SOCIAL_HANDLE":    OperatorConfig("replace", {"new_value": "<SOCIAL_HANDLE>"}),
-            "MESSAGING_ID":     OperatorConfig("replace", {"new_value": "<MESSAGING_ID>"}),
-            "MEETING_ID":       OperatorConfig("replace", {"new_value": "<MEETING_ID>"}),
-
-            "MAC_ADDRESS":      OperatorConfig("replace", {"new_value": "<MAC_ADDRESS>"}),
-            "IMEI":             OperatorConfig("replace", {"new_value": "<IMEI>"}),
-            "ADVERTISING_ID":   OperatorConfig("replace", {"new_value": "<ADVERTISING_ID>"}),
-            "DEVICE_ID":        OperatorConfig("replace", {"new_value": "<DEVICE_ID>"}),
-
-            "GEO_COORDINATES":  OperatorConfig("replace", {"new_value": "<GEO_COORDINATES>"}),
-            "PLUS_CODE":        OperatorConfig("replace", {"new_value": "<PLUS_CODE>"}),
-            "W3W":              OperatorConfig("replace", {"new_value": "<W3W>"}),
-            "LICENSE_PLATE":    OperatorConfig("replace", {"new_value": "<LICENSE_PLATE>"}),
-
-            "BUND_ID":          OperatorConfig("replace", {"new_value": "<BUND_ID>"}),
-            "ELSTER_ID":        OperatorConfig("replace", {"new_value": "<ELSTER_ID>"}),
-            "SERVICEKONTO":     OperatorConfig("replace", {"new_value": "<SERVICEKONTO>"}),
-
-            "PASSWORD":         OperatorConfig("replace", {"new_value": "<PASSWORD>"}),
-            "PIN":              OperatorConfig("replace", {"new_value": "<PIN>"}),
-            "TAN":              OperatorConfig("replace", {"new_value": "<TAN>"}),
-            "PUK":              OperatorConfig("replace", {"new_value": "<PUK>"}),
-            "RECOVERY_CODE":    OperatorConfig("replace", {"new_value": "<RECOVERY_CODE>"}),
-
-            "FILE_NUMBER":      OperatorConfig("replace", {"new_value": "<FILE_NUMBER>"}),
-            "TRANSACTION_NUMBER": OperatorConfig("replace", {"new_value": "<TRANSACTION_NUMBER>"}),
-            "CUSTOMER_NUMBER":  OperatorConfig("replace", {"new_value": "<CUSTOMER_NUMBER>"}),
-            "TICKET_ID":        OperatorConfig("replace", {"new_value": "<TICKET_ID>"}),
-
-            "API_KEY":          OperatorConfig("replace", {"new_value": "<API_KEY>"}),
-            "SESSION_ID":       OperatorConfig("replace", {"new_value": "<SESSION_ID>"}),
-            "ACCESS_TOKEN":     OperatorConfig("replace", {"new_value": "<ACCESS_TOKEN>"}),
-            "REFRESH_TOKEN":    OperatorConfig("replace", {"new_value": "<REFRESH_TOKEN>"}),
-            "ACCESS_CODE":      OperatorConfig("replace", {"new_value": "<ACCESS_CODE>"}),
-            "OTP_CODE":         OperatorConfig("replace", {"new_value": "<OTP_CODE>"}),
-        }       
-
-        out = self.anonymizer.anonymize(text=text, analyzer_results=final, operators=operators)
-        return out.text
+    @staticmethod
+    def _stream_cut(text, final, lo, cut):
+        """Where to end the emitted part of a stream window: <= cut, > lo, not inside an entity."""
+        nl = text.rfind("\n", lo + (cut - lo) // 2, cut)
+        if nl != -1:
+            cut = nl + 1
+        moved = True
+        while moved:
+            moved = False
+            for r in final:
+                if r.start < cut < r.end:
+                    cut, moved = r.start, True
+        while lo < cut < len(text) and unicodedata.combining(text[cut]):
+            cut -= 1
+        return cut if cut > lo else None
+
+    # Line mode: a line that continues a multi-line construct joins the segment before it -
+    # labeled address blocks ("Straße: …\nNr.: 10\nPLZ/Ort: 10115 Berlin"), a street line followed
+    # by "10115 Berlin", and values written under a "Label:" line.
+    LINE_CONTINUATION_RX = re.compile(
+        r"(?i)^[ \t]*(?:(?:nr|no|number|nummer|num|hausnummer|plz|postal|postleitzahl|zip|city|stadt|ort|"
+        r"ville|ciudad|città|citta)\b\.?[ \t]*[:/.]|\d{4,5}[ \t]+[^\W\d_])"
+    )
+
+    def analyze_lines(self, text, **kwargs):
+        """
+        Analyze text such as logs or transcripts line by line; returns results with document offsets.
+
+        Each line is an independent segment analyzed via analyze_text, so with result_cache_size
+        set, repeated lines are looked up instead of re-analyzed. Lines continuing a multi-line
+        construct (see LINE_CONTINUATION_RX) stay with the line before them, and a segment ending
+        in an ADDRESS followed by one starting with a LOCATION is re-analyzed jointly so the two
+        merge as they would in analyze_text. ``kwargs`` go to analyze_text; without ``language``
+        it is routed once for the whole text.
+        """
+        if not text or not text.strip():
+            return []
+        text = unicodedata.normalize("NFC", text)
+        if kwargs.get("language") is None:
+            supported = getattr(self.analyzer, "supported_languages", {"en"})
+            kwargs["language"] = self.language_router.route(text, supported)
+
+        segments = []  # [start, end) per segment, line breaks between segments excluded
+        pos = 0
+        for line in text.split("\n"):
+            end = pos + len(line)
+            if segments and (
+                self.LINE_CONTINUATION_RX.match(line) or text[segments[-1][0]:segments[-1][1]].rstrip().endswith(":")
+            ):
+                segments[-1][1] = end
+            else:
+                segments.append([pos, end])
+            pos = end + 1
+        found = [self.analyze_text(text[s:e], **kwargs) for s, e in segments]
+
+        i = 0
+        while i + 1 < len(segments):
+            if found[i] and found[i + 1] and found[i][-1].entity_type == "ADDRESS" \
+                    and found[i + 1][0].entity_type == "LOCATION":
+                segments[i][1] = segments.pop(i + 1)[1]
+                found.pop(i + 1)
+                found[i] = self.analyze_text(text[segments[i][0]:segments[i][1]], **kwargs)
+                continue  # the joined segment may end in an ADDRESS again
+            i += 1
+
+        results = []
+        for (start, _end), seg in zip(segments, found):
+            for r in seg:
+                r.start += start
+                r.end += start
+                results.append(r)
+        return results
+
+    def anonymize_lines(self, text, mode="replace", **kwargs):
+        """Anonymize text line by line (see analyze_lines); ``kwargs`` go to analyze_lines."""
+        if not text or not text.strip():
+            return text
+        text = unicodedata.normalize("NFC", text)
+        return self._render(text, self.analyze_lines(text, **kwargs), mode=mode)
+
+    def chat_session(self, context=None, **kwargs):
+        """
+        A ChatSession on this filter: add() messages one by one and only the new text (plus
+        ``context`` characters before it, STREAM_OVERLAP_DEFAULT by default) is analyzed per turn.
+        ``kwargs`` (separator, mode, language, guard flags) apply to every turn.
+        """
+        return ChatSession(self, context, **kwargs)
+
+    BATCH_ERROR_POLICIES = ("raise", "return")
+
+    def anonymize_batch(self, texts, *, workers=1, chunksize=64, on_error="raise", **kwargs):
+        """
+        Anonymize many texts; returns a list in input order.
+
+        ``workers > 1`` fans chunks of ``chunksize`` texts out to a process pool whose workers each
+        hold one warm PIIFilter built with this filter's constructor arguments. The pool is kept
+        for later calls until shutdown_batch_pool(). ``kwargs`` go to anonymize_text.
+
+        ``on_error``: "raise" re-raises the first failing item's exception (in input order) after
+        the batch finished; "return" puts the exception object at that item's position instead.
+        """
+        if on_error not in self.BATCH_ERROR_POLICIES:
+            raise ValueError(f"on_error must be one of {self.BATCH_ERROR_POLICIES}, got {on_error!r}")
+        if chunksize < 1:
+            raise ValueError(f"chunksize must be >= 1, got {chunksize!r}")
+        texts = list(texts)
+        chunks = [texts[i:i + chunksize] for i in range(0, len(texts), chunksize)]
+        if workers is None or workers <= 1 or len(chunks) <= 1:
+            done = [_anonymize_chunk(chunk, kwargs, self) for chunk in chunks]
+        else:
+            pool = self._get_batch_pool(workers)
+            done = pool.map(_anonymize_chunk, chunks, itertools.repeat(kwargs))
+
+        results = []
+        for ok, value in itertools.chain.from_iterable(done):
+            if not ok and on_error == "raise":
+                raise value
+            results.append(value)
+        return results
+
+    def _get_batch_pool(self, workers):
+        from concurrent.futures import ProcessPoolExecutor
+        if self._batch_pool is not None and self._batch_pool_workers != workers:
+            self.shutdown_batch_pool()
+        if self._batch_pool is None:
+            self._batch_pool = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_batch_worker, initargs=(self._init_kwargs,),
+            )
+            self._batch_pool_workers = workers
+        return self._batch_pool
+
+    def configure_async(self, executor="thread", max_workers=4, max_in_flight=None):
+        """
+        Set up the executor behind anonymize_async (replaces any previous one).
+
+        ``executor`` is "thread" (shares this filter) or "process" (one warm PIIFilter per worker
+        process; real parallelism for the pure-Python regex work). At most ``max_in_flight``
+        calls (default 2 * max_workers) are submitted at once; the rest wait on a semaphore.
+        """
+        dispatcher = _AsyncDispatcher(self, executor, max_workers, max_in_flight)
+        self.shutdown_async()
+        self._async = dispatcher
+
+    async def anonymize_async(self, text, *, timeout=None, **kwargs):
+        """
+        anonymize_text without blocking the event loop. ``timeout`` (seconds) covers waiting for
+        a slot plus the work itself and raises asyncio.TimeoutError; cancelling the awaiting task
+        drops the job if it has not started yet. ``kwargs`` go to anonymize_text.
+        """
+        if self._async is None:
+            self.configure_async()
+        counts = self._async.counts
+        try:
+            return await asyncio.wait_for(self._async.run(text, kwargs), timeout)
+        except asyncio.TimeoutError:
+            counts["timed_out"] += 1
+            raise
+        except asyncio.CancelledError:
+            counts["cancelled"] += 1
+            raise
+
+    def async_metrics(self):
+        """
+        Counters of the async facade: ``waiting`` (queue depth), ``in_flight``, ``peak_in_flight``,
+        ``max_in_flight`` and completed/failed/timed_out/cancelled totals. Use ``waiting`` for back-pressure.
+        """
+        if self._async is None:
+            self.configure_async()
+        return dict(self._async.counts, max_in_flight=self._async.max_in_flight)
+
+    def shutdown_async(self, wait=True):
+        """Stop the anonymize_async executor (a later call starts a fresh one)."""
+        if self._async is not None:
+            self._async.shutdown(wait=wait)
+
+    def shutdown_batch_pool(self):
+        """Stop the anonymize_batch worker processes (a later batch starts a fresh pool)."""
+        if self._batch_pool is not None:
+            self._batch_pool.shutdown()
+            self._batch_pool = None
+            self._batch_pool_workers = 0
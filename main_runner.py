@@ -12,6 +12,7 @@ Usage:
   python main_runner.py --text "Musterstraße 5, 10115 Berlin"
   python main_runner.py --file samples.txt --guards-off
   python main_runner.py --json
+  python main_runner.py --profile-patterns
 
 Requires:
   - presidio-analyzer
@@ -940,70 +941,22 @@ class PIIRunner:
         guard_context_window: int = 40,
     ) -> list[RecognizerResult]:
         """
-        Mirrors PIIFilter.anonymize_text up to 'final' resolved entities (before anonymizer replace).
+        Final resolved entities via PIIFilter.analyze_text (the spans anonymize_text replaces).
         Requires PIIFilter class; if only a function is available, this method is unsupported.
         """
         if not self.pf:
             raise RuntimeError("Entity analysis requires PIIFilter class. Only anonymize_text function is available.")
 
-        pf = self.pf
-        lang = _detect_lang(text)
-        if lang not in getattr(pf.analyzer, "supported_languages", {"en"}):
-            lang = "en"
-
-        # Base
-        base = pf.analyzer.analyze(
-            text=text,
-            language=lang,
-            entities=pf.ALLOWED_ENTITIES,
-            score_threshold=0.50
+        return self.pf.analyze_text(
+            text,
+            guards_enabled=guards_enabled,
+            guard_natural_suffix_requires_number=guard_natural_suffix_requires_number,
+            guard_single_token_addresses=guard_single_token_addresses,
+            guard_address_vs_person_priority=guard_address_vs_person_priority,
+            guard_requires_context_without_number=guard_requires_context_without_number,
+            guard_context_window=guard_context_window,
         )
 
-        # PERSON cleanup (trim intro + plausibility)
-        filtered = []
-        for r in base:
-            if r.entity_type == "PERSON":
-                span = text[r.start:r.end]
-                trimmed, offset = pf._trim_intro(span)
-                if offset > 0:
-                    ns = r.start + offset
-                    if (r.end - ns) >= 2:
-                        r = RecognizerResult("PERSON", ns, r.end, r.score)
-                        span = trimmed
-                if not pf._plausible_person(span, text, r.start):
-                    continue
-            filtered.append(r)
-
-        # Intro persons
-        filtered = pf._inject_name_intro_persons(text, filtered)
-
-        # Custom injections
-        final = pf._inject_custom_matches(text, filtered)
-
-        # Address guards
-        if guards_enabled:
-            if guard_natural_suffix_requires_number:
-                final = pf._guard_natural_suffix_requires_number(text, final, pf.NATURAL_SUFFIXES)
-            if guard_single_token_addresses:
-                final = pf._guard_single_token_addresses(text, final)
-            if guard_address_vs_person_priority:
-                final = pf._guard_address_vs_person(final)
-            if guard_requires_context_without_number:
-                final = pf._guard_requires_context(text, final, pf.ADDRESS_CONTEXT_KEYWORDS, guard_context_window)
-
-        # Phone/date demotion + meeting promotion
-        final = pf._demote_phone_over_date(text, final)
-        final = pf._promote_meeting_over_phone(text, final, window=24)
-
-        # Address trimming + ID false-positive filtering
-        final = pf._trim_address_spans(text, final)
-        final = pf._filter_idnumber_false_positives(text, final)
-
-        # Merge address/location
-        final = pf._merge_address_location(text, final)
-
-        return sorted(final, key=lambda r: (r.start, r.end))
-
     def anonymize(
         self,
         text: str,
@@ -1191,6 +1144,8 @@ def _build_arg_parser() -> argparse.ArgumentParser:
     g.add_argument("--no-entities", action="store_true", help="Do not print entities.")
     g.add_argument("--no-anonymized", action="store_true", help="Do not print anonymized text.")
     g.add_argument("--compare-guards", action="store_true", help="Run ON vs OFF comparison (single text only).")
+    g.add_argument("--profile-patterns", action="store_true",
+                   help="Charge every regex/recognizer with calls, scan time, matches and survivors; print the table.")
     return p
 
 
@@ -1329,8 +1284,21 @@ def _generate_side_by_side_report(filter_instance, output_file="entity_demonstra
 
 def main():
     args = _build_arg_parser().parse_args()
-    runner = PIIRunner()
+    if not args.profile_patterns:
+        _run(args, PIIRunner())
+        return
+    from pii_filter.pii_filter import PatternProfiler
+    profiler = PatternProfiler()
+    try:
+        _run(args, PIIRunner(pf=profiler), side_by_side_report=False)
+    finally:
+        print("\n" + "="*80)
+        print("⏱️  PATTERN COST (slowest first)")
+        print("="*80)
+        print(profiler.report())
+
 
+def _run(args: argparse.Namespace, runner: PIIRunner, side_by_side_report: bool = True) -> None:
     guard_kw = _guard_config_from_args(args)
     show_entities = not args.no_entities
     show_anonymized = not args.no_anonymized
@@ -1380,6 +1348,8 @@ def main():
         **guard_kw
     )
     
+    if not side_by_side_report:
+        return
     # Generate comprehensive side-by-side report
     print("\n" + "="*80)
     print("📊 GENERATING COMPREHENSIVE ENTITY DEMONSTRATION REPORT...")
@@ -1,10 +1,22 @@
+import json
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
 import pytest
-from pii_filter.pii_filter import PIIFilter
+from pii_filter.pii_filter import PIIFilter, LanguageRouter, LangdetectRouter
+
+ROOT = Path(__file__).resolve().parents[2]
 
 @pytest.fixture(scope="module")
 def f():
     return PIIFilter()
 
+@pytest.fixture(scope="module")
+def f_pattern():
+    return PIIFilter(nlp_engine="pattern")
+
 @pytest.fixture
 def large_text():
     # Generate a large text with repeated PII
@@ -15,4 +27,97 @@ def test_anonymize_performance(benchmark, f, large_text):
     benchmark(f.anonymize_text, large_text)
 
 def test_entity_detection_performance(benchmark, f, large_text):
-    benchmark(f.analyzer.analyze, text=large_text, language="en")
\ No newline at end of file
+    benchmark(f.analyzer.analyze, text=large_text, language="en")
+
+def test_anonymize_performance_pattern_only(benchmark, f_pattern, large_text):
+    benchmark(f_pattern.anonymize_text, large_text)
+
+def test_entity_detection_performance_pattern_only(benchmark, f_pattern, large_text):
+    benchmark(f_pattern.analyzer.analyze, text=large_text, language="en")
+
+
+def _peak_rss_kb(nlp_engine: str) -> int:
+    """Peak RSS (KiB on Linux) of a fresh interpreter that builds a filter and anonymizes once."""
+    code = textwrap.dedent(f"""
+        import resource
+        from pii_filter.pii_filter import PIIFilter
+        PIIFilter(nlp_engine={nlp_engine!r}).anonymize_text("My name is John Doe, call +49 30 1234567.")
+        print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    """)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return int(out.stdout.strip().splitlines()[-1])
+
+def test_pattern_only_rss(benchmark):
+    pytest.importorskip("resource")
+    rss = {mode: _peak_rss_kb(mode) for mode in PIIFilter.NLP_ENGINES}
+    benchmark.extra_info.update({f"peak_rss_kb_{mode}": kb for mode, kb in rss.items()})
+    benchmark.pedantic(lambda: None, rounds=1)
+    assert rss["pattern"] <= rss["spacy"]
+
+
+def _cold_start(kwargs: dict) -> dict:
+    """import + init + first call timings (seconds) in a fresh interpreter."""
+    code = textwrap.dedent(f"""
+        import json, time
+        t0 = time.perf_counter()
+        from pii_filter.pii_filter import PIIFilter
+        t1 = time.perf_counter()
+        pf = PIIFilter(**{kwargs!r})
+        t2 = time.perf_counter()
+        pf.anonymize_text("My name is John Doe, call +49 30 1234567.")
+        t3 = time.perf_counter()
+        print(json.dumps({{"import": t1 - t0, "init": t2 - t1, "first_call": t3 - t2,
+                          "snapshot_loaded": pf.snapshot_loaded}}))
+    """)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def test_cold_start_snapshot(benchmark, tmp_path):
+    snap = str(PIIFilter(nlp_engine="pattern").export_snapshot(tmp_path / "detectors.json"))
+    source = _cold_start({"nlp_engine": "pattern"})
+    cached = _cold_start({"nlp_engine": "pattern", "snapshot": snap})
+    for label, timings in (("source", source), ("snapshot", cached)):
+        benchmark.extra_info.update({f"{label}_{k}": v for k, v in timings.items()})
+    benchmark.pedantic(lambda: None, rounds=1)
+    assert cached["snapshot_loaded"] and not source["snapshot_loaded"]
+    assert cached["init"] < source["init"]
+
+
+def _corpus_texts():
+    texts = []
+    for path in sorted((ROOT / "tests" / "corpora").glob("*/*.json")):
+        try:
+            texts += [item["text"] for item in json.loads(path.read_text(encoding="utf-8"))]
+        except ValueError:
+            continue  # some corpus files are still empty
+    return texts
+
+@pytest.mark.parametrize("router_cls", [LangdetectRouter, LanguageRouter], ids=["langdetect", "router"])
+def test_language_routing(benchmark, router_cls):
+    texts = _corpus_texts()
+    router = router_cls(cache_size=0)  # measure detection itself, not the session cache
+    langs = benchmark(lambda: [router.route(t, ("en", "de", "es", "fr")) for t in texts])
+    assert langs == [LangdetectRouter(cache_size=0).route(t, ("en", "de", "es", "fr")) for t in texts]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_anonymize_batch_throughput(benchmark, f_pattern, workers):
+    base = "Ticket #{i}: Kunde Max Mustermann, max{i}@example.com, +49 30 {n}, Hauptstraße {i}, 10115 Berlin."
+    texts = [base.format(i=i, n=1000000 + i) for i in range(400)]
+    f_pattern.anonymize_batch(texts[:8], workers=workers, chunksize=1)  # warm the pool outside the timing
+    try:
+        benchmark.pedantic(f_pattern.anonymize_batch, args=(texts,), kwargs={"workers": workers, "chunksize": 25}, rounds=3)
+    finally:
+        f_pattern.shutdown_batch_pool()
+
+
+@pytest.mark.parametrize("renderer", ["presidio", "native"])
+def test_render_short_message(benchmark, f_pattern, renderer):
+    from presidio_anonymizer.entities import OperatorConfig
+    text = "Hi, I'm Anna Müller, call me at +49 30 1234567 or anna@example.com"
+    spans = f_pattern.analyze_text(text)
+    if renderer == "native":
+        benchmark(f_pattern._render, text, spans)
+    else:
+        ops = {ent: OperatorConfig("replace", {"new_value": tag}) for ent, tag in f_pattern.ENTITY_TAGS.items()}
+        benchmark(lambda: f_pattern.anonymizer.anonymize(text=text, analyzer_results=spans, operators=dict(ops)).text)
@@ -0,0 +1,86 @@
+"""
+ReDoS regression corpus: analysis time must stay linear in the input size.
+
+Every family below is a pathological shape for at least one pattern of the bank (or was, until it was
+rewritten). Each test times analyze_text at growing sizes and fails when the time per character grows
+like a super-linear pattern would make it grow.
+"""
+import random
+import string
+import time
+
+import pytest
+from hypothesis import given, settings, strategies as st
+from pii_filter.pii_filter import PIIFilter
+
+SIZES = (4_000, 8_000, 16_000)
+# Time per char may grow at most this much from the smallest to the largest size (4x the input).
+# Linear scans stay near 1x; a quadratic one shows up as ~4x.
+MAX_PER_CHAR_GROWTH = 2.0
+B64 = string.ascii_letters + string.digits + "+/"
+
+
+def _fill(unit, n):
+    return (unit * (n // len(unit) + 1))[:n]
+
+
+def _random(alphabet, n, seed=0):
+    rnd = random.Random(seed)
+    return "".join(rnd.choice(alphabet) for _ in range(n))
+
+
+FAMILIES = {
+    "digit_run": lambda n: _fill("1234567890", n),
+    "digit_groups": lambda n: _fill("12 ", n),
+    # candidates for the \b[A-Za-z0-9._\-+/=]{28,}\b entropy scan
+    "base64_tokens": lambda n: " ".join(_random(B64, 40, seed=i) + "==" for i in range(n // 43 + 1))[:n],
+    "base64_run": lambda n: _random(string.ascii_letters + string.digits, n),
+    "capitalized_words": lambda n: _fill("Anna Berlin Max Haupt Street Main Der Die ", n),
+    "no_whitespace_line": lambda n: _random(string.ascii_letters + string.digits + ".-_/", n),
+    "hyphenated_words": lambda n: _fill("Abc-", n),
+    "dotted_words": lambda n: _fill("ab.", n),
+    "unclosed_paren": lambda n: "Hauptstraße 5 (A" + _fill("- ", n),
+    "at_free_local_part": lambda n: _fill("a.b", n) + "@",
+}
+
+
+@pytest.fixture(scope="module")
+def f_pattern():
+    return PIIFilter(nlp_engine="pattern")
+
+
+def _seconds_per_char(pf, text, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        pf.analyze_text(text, language="en")
+        best = min(best, time.perf_counter() - t0)
+    return best / len(text)
+
+
+def _per_char_growth(pf, make):
+    per_char = [_seconds_per_char(pf, make(n)) for n in SIZES]
+    return per_char, per_char[-1] / per_char[0]
+
+
+@pytest.mark.parametrize("family", list(FAMILIES))
+def test_pathological_input_scales_linearly(benchmark, f_pattern, family):
+    per_char, growth = _per_char_growth(f_pattern, FAMILIES[family])
+    benchmark.extra_info.update({f"us_per_char_{n}": round(t * 1e6, 2) for n, t in zip(SIZES, per_char)})
+    benchmark.extra_info["per_char_growth"] = round(growth, 2)
+    benchmark.pedantic(f_pattern.analyze_text, args=(FAMILIES[family](SIZES[-1]),), rounds=1)
+    assert growth <= MAX_PER_CHAR_GROWTH, f"{family}: time/char grew {growth:.1f}x for 4x input"
+
+
+# Characters that open, extend or close the bank's patterns: digits, word runs, joiners and labels
+FRAGMENT = st.lists(
+    st.sampled_from(list("aA1 -.,:/@()+='\n") + ["Straße", "Nr. ", "IBAN ", "Tel ", "Top 3", "DE89", "x@y.de"]),
+    min_size=1, max_size=8,
+).map("".join)
+
+
+@settings(max_examples=25, deadline=None)
+@given(FRAGMENT)
+def test_random_repeated_fragment_scales_linearly(f_pattern, fragment):
+    per_char, growth = _per_char_growth(f_pattern, lambda n: _fill(fragment, n // 4))
+    assert growth <= MAX_PER_CHAR_GROWTH, f"{fragment!r}: time/char grew {growth:.1f}x for 4x input"
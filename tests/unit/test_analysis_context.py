@@ -0,0 +1,57 @@
+import re
+from hypothesis import given, settings, strategies as st
+from pii_filter.pii_filter import AnalysisContext, KeywordAutomaton, PIIFilter
+
+CLASSES = {
+    "cues": ("my name is", "ich hei", "με λένε"),
+    "overlapping": ("he", "she", "his", "hers", "a", "ab.@"),
+}
+AUTOMATON = KeywordAutomaton(CLASSES)
+# Case mappings that change length (İ) or depend on context (Σ) force the slice-then-lower path
+_text = st.lists(st.sampled_from(list("ab Mx.@\nİΣ-") + ["my name is ", "ICH HEIß", "ΜΕ ΛΈΝΕ", "a.b@c.de",
+                                                            "ushers", "sHIs"]),
+                 max_size=30).map("".join)
+
+
+@settings(max_examples=300, deadline=None)
+@given(_text, st.integers(-10, 90), st.integers(0, 60))
+def test_context_matches_direct_computation(text, start, width):
+    ctx = AnalysisContext(text, AUTOMATON)
+    end = start + width
+    window = text[max(0, start):end].lower()
+    assert ctx.window(start, end) == window
+    for name, keywords in CLASSES.items():
+        assert ctx.has(name, start, end) == any(kw in window for kw in keywords)
+    assert ctx.line_break_before(start) == text.rfind("\n", 0, start)
+    s, e = max(0, start), max(0, start) + width % 8
+    inside = any(m.start() <= s and m.end() >= e
+                 for m in re.finditer(r"[\w\.\-+%]+@[\w\.\-]+\.[A-Za-z]{2,}", text))
+    assert ctx.inside_email(s, e) == inside
+
+
+def test_offsets_stable_lowering_only():
+    assert AnalysisContext("Hallo Max", AUTOMATON).lower == "hallo max"
+    assert AnalysisContext("İstanbul", AUTOMATON).lower is None
+    assert AnalysisContext("ΟΔΟΣ ΑΘΗΝΑΣ", AUTOMATON).lower is None
+
+
+def test_automaton_reports_every_overlapping_occurrence():
+    hits = KeywordAutomaton({"k": ("he", "she", "his", "hers")}).scan("ushers")
+    assert hits.within("k", 1, 4) and hits.within("k", 2, 4) and hits.within("k", 2, 6)
+    assert not hits.within("k", 3, 6) and not hits.within("k", 0, 3)
+
+
+def test_filters_share_one_automaton():
+    assert PIIFilter(nlp_engine="pattern").keyword_automaton is PIIFilter(nlp_engine="pattern").keyword_automaton
+    custom = PIIFilter(nlp_engine="pattern", pattern_overrides={"INTRO_CUES": ("call me",)})
+    ctx = custom._analysis_context("Hello, call me Anna, my name is Bo")
+    assert ctx.has("INTRO_CUES", 0, 14) and not ctx.has("INTRO_CUES", 15, 34)
+
+
+def test_stages_share_one_context(monkeypatch):
+    f = PIIFilter(nlp_engine="pattern")
+    built = []
+    real = f._analysis_context
+    monkeypatch.setattr(f, "_analysis_context", lambda text: built.append(text) or real(text))
+    f.analyze_text("My name is Max Mustermann, mail max@example.de, Musterstraße 5, 10115 Berlin")
+    assert len(built) == 1
@@ -0,0 +1,89 @@
+import asyncio
+import time
+import pytest
+from pii_filter.pii_filter import PIIFilter
+
+TEXTS = [
+    "Contact: test{i}@example.com",
+    "IBAN: DE89 3704 0044 0532 0130 00",
+    "Call me at +49 30 123456{i}",
+    "nothing to see here {i}",
+]
+
+
+@pytest.fixture(scope="module")
+def f():
+    pf = PIIFilter(nlp_engine="pattern")
+    yield pf
+    pf.shutdown_async()
+
+
+class _SlowFilter(PIIFilter):
+    def anonymize_text(self, text, **kwargs):
+        time.sleep(0.3)
+        return super().anonymize_text(text, **kwargs)
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_results_match_and_in_flight_is_bounded(f, executor):
+    texts = [t.format(i=i) for i in range(3) for t in TEXTS]
+    f.configure_async(executor=executor, max_workers=2, max_in_flight=3)
+
+    async def run():
+        return await asyncio.gather(*(f.anonymize_async(t) for t in texts))
+
+    assert asyncio.run(run()) == [f.anonymize_text(t) for t in texts]
+    m = f.async_metrics()
+    assert m["completed"] == len(texts) and m["in_flight"] == 0 and m["waiting"] == 0
+    assert 1 <= m["peak_in_flight"] <= 3 == m["max_in_flight"]
+
+
+def test_timeout_and_event_loop_stays_responsive():
+    pf = _SlowFilter(nlp_engine="pattern")
+    pf.configure_async(max_workers=1, max_in_flight=1)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.02)
+
+    async def run():
+        slow = asyncio.ensure_future(pf.anonymize_async("Call +49 30 1234567"))
+        await ticker()
+        assert await slow == "Call <PHONE_NUMBER>"
+        with pytest.raises(asyncio.TimeoutError):
+            await pf.anonymize_async("Call +49 30 1234567", timeout=0.05)
+
+    try:
+        asyncio.run(run())
+        assert len(ticks) == 5 and ticks[-1] - ticks[0] < 0.25
+        m = pf.async_metrics()
+        assert m["timed_out"] == 1 and m["completed"] == 1
+    finally:
+        pf.shutdown_async()
+
+
+def test_waiting_counts_queue_depth():
+    pf = _SlowFilter(nlp_engine="pattern")
+    pf.configure_async(max_workers=1, max_in_flight=1)
+
+    async def run():
+        tasks = [asyncio.ensure_future(pf.anonymize_async("hello")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        depth = pf.async_metrics()["waiting"]
+        tasks[-1].cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return depth
+
+    try:
+        assert asyncio.run(run()) == 2
+        m = pf.async_metrics()
+        assert m["cancelled"] == 1 and m["completed"] == 2 and m["in_flight"] == 0
+    finally:
+        pf.shutdown_async()
+
+
+def test_invalid_executor(f):
+    with pytest.raises(ValueError):
+        f.configure_async(executor="fiber")
@@ -0,0 +1,46 @@
+import pytest
+from pii_filter.pii_filter import PIIFilter
+
+TEXTS = [
+    "Contact: test@example.com",
+    "IBAN: DE89 3704 0044 0532 0130 00",
+    "Mein Name ist Max Mustermann",
+    "Hauptstraße 5, 10115 Berlin",
+    "nothing to see here",
+] * 3
+
+
+@pytest.fixture(scope="module")
+def f():
+    pf = PIIFilter(nlp_engine="pattern")
+    yield pf
+    pf.shutdown_batch_pool()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_matches_single_calls_in_order(f, workers):
+    assert f.anonymize_batch(TEXTS, workers=workers, chunksize=4) == [f.anonymize_text(t) for t in TEXTS]
+
+
+def test_pool_is_reused_between_batches(f):
+    f.anonymize_batch(TEXTS, workers=2, chunksize=4)
+    pool = f._batch_pool
+    f.anonymize_batch(TEXTS, workers=2, chunksize=4)
+    assert f._batch_pool is pool
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_error_policy(f, workers):
+    texts = ["Contact: test@example.com", 42, "Call +49 30 1234567"]
+    with pytest.raises(AttributeError):
+        f.anonymize_batch(texts, workers=workers, chunksize=1)
+    out = f.anonymize_batch(texts, workers=workers, chunksize=1, on_error="return")
+    assert isinstance(out[1], AttributeError)
+    assert out[0] == f.anonymize_text(texts[0]) and out[2] == f.anonymize_text(texts[2])
+
+
+def test_invalid_arguments(f):
+    with pytest.raises(ValueError):
+        f.anonymize_batch(TEXTS, on_error="skip")
+    with pytest.raises(ValueError):
+        f.anonymize_batch(TEXTS, chunksize=0)
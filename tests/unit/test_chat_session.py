@@ -0,0 +1,57 @@
+import pytest
+from pii_filter.pii_filter import PIIFilter
+
+CHATS = [
+    "User: Hi, my name is John Doe\nBot: Nice to meet you, John!",
+    "User: I am called Mike\nSupport: Hello Mike 👋",
+    "User: Straße: Hauptstraße\nNr.: 10\nPLZ/Ort: 10115 Berlin\nBot: Danke!",
+    "Kunde: Ich wohne in der Musterstraße 5\n10115 Berlin\nAgent: IBAN bitte?\nKunde: DE89 3704 0044 0532 0130 00",
+]
+
+
+@pytest.fixture(scope="module")
+def f():
+    return PIIFilter(nlp_engine="pattern")
+
+
+@pytest.mark.parametrize("chat", CHATS)
+def test_session_matches_full_reanalysis(f, chat):
+    session = f.chat_session()
+    for message in chat.split("\n"):
+        session.add(message)
+    assert session.text == chat
+    assert session.anonymized() == f.anonymize_text(chat)
+
+
+def test_add_returns_the_anonymized_message(f):
+    session = f.chat_session()
+    assert session.add("Hallo!") == "Hallo!"
+    assert session.add("Meine IBAN ist DE89 3704 0044 0532 0130 00") == "Meine IBAN ist <BANK_ACCOUNT>"
+
+
+def test_turn_only_analyzes_a_bounded_window(f, monkeypatch):
+    session = f.chat_session(context=64)
+    for i in range(50):
+        session.add(f"Agent: Ticket {i} wurde aktualisiert, bitte warten Sie kurz.")
+    seen = []
+    real = f.analyze_text
+    monkeypatch.setattr(f, "analyze_text", lambda text, **kw: seen.append(text) or real(text, **kw))
+    session.add("Kunde: Mail an max@example.de")
+    assert len(seen[0]) < 64 * 2 + 40 < len(session)
+    assert session.spans[-1].entity_type == "EMAIL_ADDRESS"
+
+
+def test_settled_secret_keeps_its_label_in_the_window(f):
+    # the window used to start at the stored span itself, so "cloudflare_token=" was cut off
+    # and the token came back as plaintext
+    session = f.chat_session(context=40)
+    session.add("cloudflare_token=1234567890abcdef1234567890abcdef1234567890 ok")
+    session.add("thanks")
+    assert session.anonymized() == f.anonymize_text(session.text) == "cloudflare_token=<API_KEY> ok\nthanks"
+
+
+def test_arguments_validated(f):
+    with pytest.raises(ValueError):
+        f.chat_session(context=-1)
+    with pytest.raises(ValueError):
+        f.chat_session(mode="redact")
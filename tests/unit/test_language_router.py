@@ -0,0 +1,49 @@
+import pytest
+from pii_filter.pii_filter import PIIFilter, LanguageRouter
+
+
+@pytest.mark.parametrize("text,lang", [
+    ("My name is John and this is my address", "en"),
+    ("Mein Name ist Max Mustermann und ich wohne in Berlin", "de"),
+    ("Hola, me llamo Lucía y vivo en Madrid", "es"),
+    ("Je suis Élodie et j'habite dans le centre de Paris", "fr"),
+    ("Behördliche Registrierung", "de"),
+    ("اسمي أحمد محمد", "ar"),
+    ("12345", None),
+])
+def test_detect(text, lang):
+    assert LanguageRouter().detect(text) == lang
+
+
+def test_route_falls_back_for_unsupported_languages():
+    r = LanguageRouter()
+    assert r.route("Mein Name ist Max", ["en", "de"]) == "de"
+    assert r.route("اسمي أحمد محمد", ["en", "de"]) == "en"
+    assert r.route("12345", ["en", "de"]) == "en"
+
+
+def test_cache_is_bounded_lru():
+    r = LanguageRouter(cache_size=2)
+    for t in ("the cat", "der Hund", "el perro"):
+        r.detect(t)
+    assert list(r._cache) == ["der Hund", "el perro"]
+    r.detect("der Hund")
+    assert list(r._cache) == ["el perro", "der Hund"]
+
+
+class _CountingRouter(LanguageRouter):
+    calls = 0
+
+    def _classify(self, sample):
+        self.calls += 1
+        return super()._classify(sample)
+
+
+def test_explicit_language_skips_router_and_repeats_hit_cache():
+    router = _CountingRouter()
+    f = PIIFilter(language_router=router)
+    f.anonymize_text("Mein Name ist Max Mustermann", language="de")
+    assert router.calls == 0
+    f.anonymize_text("Mein Name ist Max Mustermann")
+    f.anonymize_text("Mein Name ist Max Mustermann")
+    assert router.calls == 1
@@ -0,0 +1,94 @@
+import re
+import pytest
+from hypothesis import given, settings, strategies as st
+from pii_filter.pii_filter import PIIFilter, PatternProfiler, _IGNORECASE_EQUIVALENTS, _required_literals
+
+LABELED = ("PASSWORD_RX", "PIN_RX", "TAN_RX", "PUK_RX", "RECOVERY_CODE_RX", "BUND_ID_RX", "ELSTER_ID_RX",
+           "SERVICEKONTO_RX", "FILE_NUMBER_RX", "TICKET_ID_RX", "EORI_RX", "COMMERCIAL_REGISTER_RX")
+TEXTS = [
+    "Login failed: password: hunter2!! PIN: 4711, TAN 123456, PUK 12345678",
+    "EORI DE123456789012345, Amtsgericht Berlin HRB 12345, Aktenzeichen 12 O 345/21, Ticket #INC-2024-0042",
+    "Mein Passwort lautet Sommer2024! und meine Geheimzahl ist 0815.",
+    "Thanks! We will get back to you within 24 hours.",
+    "PAſSWORD: hunter2, ſervicekonto SK-123456, eorı DE123456789012345",  # IGNORECASE equivalents of s/i
+]
+
+
+@pytest.fixture(scope="module")
+def f():
+    return PIIFilter(nlp_engine="pattern")
+
+
+def _gated(f):
+    return [(rx, name) for rx, name in f.literal_gates.values()]
+
+
+def _spans(results):
+    return [(r.entity_type, r.start, r.end, r.score) for r in results]
+
+
+def test_labeled_families_are_gated(f):
+    gated = {name for _, name in _gated(f)}
+    assert set(LABELED) <= gated
+    assert "password" in f.keyword_automaton.classes["PASSWORD_RX"]
+
+
+def test_extraction():
+    assert _required_literals(re.compile(r"(?i)\b(?:pin|geheimzahl)\s*[:=]\s*\d{4}")) == ("geheimzahl", "geheımzahl", "pin", "pın")
+    assert _required_literals(re.compile(r"(?i)pass")) == ("pass", "pasſ", "paſs", "paſſ")
+    assert _required_literals(re.compile(r"Konto(?:nummer)?:\s*\d+")) == ("konto",)
+    assert _required_literals(re.compile(r"(?:IBAN|[A-Z]{2})\d{10}")) is None  # one branch needs no literal
+    assert _required_literals(re.compile(r"(?:foo)?\d+")) is None
+
+
+def test_case_table_matches_cpython():
+    casefix = pytest.importorskip("re._casefix")
+    table = {ord(ch): {ord(o) for o in group if o != ch} for group in _IGNORECASE_EQUIVALENTS for ch in group}
+    assert table == {k: set(v) for k, v in casefix._EXTRA_CASES.items()}
+
+
+# Label words, their case/IGNORECASE variants and value-ish fragments the gated patterns consume
+_text = st.lists(st.sampled_from(["password", "PAſSWORD", "pın", "PIN", "TAN", "tan", "eori", "EORİ", "konto",
+                                  "Amtsgericht", "HRB", "Ticket", "#", ":", " ", "-", "/", "\n", "DE", "SK-",
+                                  "123456789012345", "4711", "12", "O", "ab", "Σ"]),
+                 max_size=14).map("".join)
+
+
+@settings(max_examples=300, deadline=None)
+@given(_text)
+def test_gate_never_skips_a_pattern_that_matches(f, text):
+    ctx = f._analysis_context(text)
+    for rx, name in _gated(f):
+        assert ctx.may_match(rx) or rx.search(text) is None, name
+
+
+def test_every_corpus_match_holds_a_literal(f):
+    for rx, name in _gated(f):
+        for text in TEXTS:
+            if rx.search(text):
+                assert any(kw in text.lower() for kw in f.keyword_automaton.classes[name]), name
+
+
+def test_gated_output_equals_ungated(f):
+    ungated = PIIFilter(nlp_engine="pattern")
+    ungated.literal_gates = {}
+    for text in TEXTS:
+        assert _spans(f.analyze_text(text)) == _spans(ungated.analyze_text(text))
+
+
+def test_absent_labels_skip_the_scan():
+    profiler = PatternProfiler(nlp_engine="pattern")
+    profiler.analyze_text(TEXTS[3])
+    for name in LABELED:
+        assert profiler.rows[name]["calls"] == 0, name
+    profiler.analyze_text(TEXTS[0])
+    assert profiler.rows["PASSWORD_RX"]["calls"] and profiler.rows["PIN_RX"]["calls"]
+
+
+def test_wrapped_and_overridden_patterns_are_gated():
+    budgeted = PIIFilter(nlp_engine="pattern", regex_engine="regex")
+    ctx = budgeted._analysis_context(TEXTS[3])
+    assert not ctx.may_match(budgeted.PASSWORD_RX)
+    custom = PIIFilter(nlp_engine="pattern", pattern_overrides={"EORI_RX": re.compile(r"(?i)\bzollnummer:?\s*(\d{6})")})
+    ctx = custom._analysis_context("Zollnummer: 123456")
+    assert ctx.may_match(custom.EORI_RX) and not ctx.may_match(custom.PASSWORD_RX)
@@ -0,0 +1,69 @@
+import pytest
+from hypothesis import given, settings, strategies as st
+from presidio_analyzer import RecognizerResult
+from pii_filter.pii_filter import PIIFilter
+
+
+@pytest.fixture(scope="module")
+def f():
+    return PIIFilter(nlp_engine="pattern")
+
+
+def _reference_resolve(f, text, items):
+    # The original O(n^2) resolver, kept verbatim as the oracle for the indexed one
+    items = sorted(items, key=lambda r: (-r.score, -f.PRIORITY.get(r.entity_type, 1), -(r.end - r.start)))
+    kept = []
+    for r in items:
+        conflict = False
+        for k in list(kept):
+            if not (r.end <= k.start or r.start >= k.end):
+                pr = f._effective_priority(text, r)
+                pk = f._effective_priority(text, k)
+                if {r.entity_type, k.entity_type} == {"FAX_NUMBER", "PHONE_NUMBER"}:
+                    left = text[max(0, min(r.start, k.start) - 24):min(r.start, k.start)].lower()
+                    right = text[max(r.end, k.end):min(len(text), max(r.end, k.end) + 24)].lower()
+                    if not (("fax" in left) or ("fax" in right)):
+                        if r.entity_type == "FAX_NUMBER":
+                            conflict = True
+                            break
+                        kept.remove(k)
+                        kept.append(r)
+                        conflict = True
+                        break
+                if (r.score > k.score) or (r.score == k.score and pr > pk) or (
+                    r.score == k.score and pr == pk and (r.end - r.start) > (k.end - k.start)
+                ):
+                    kept.remove(k)
+                    kept.append(r)
+                conflict = True
+                break
+        if not conflict:
+            kept.append(r)
+    return sorted(kept, key=lambda x: x.start)
+
+
+TEXT = "Ich heiße Anna Müller, Fax: +49 30 1234567, Tel +49 30 7654321, Hauptstraße 5, 10115 Berlin. " * 3
+
+_result = st.builds(
+    lambda ent, start, length, score: RecognizerResult(ent, start, min(len(TEXT), start + length), score),
+    st.sampled_from(["PERSON", "ADDRESS", "LOCATION", "PHONE_NUMBER", "FAX_NUMBER", "DATE", "ID_NUMBER"]),
+    st.integers(0, len(TEXT) - 1),
+    st.integers(0, 40),
+    st.sampled_from([0.85, 0.9, 0.92, 1.0, 1.01, 1.05]),
+)
+
+
+@settings(max_examples=400, deadline=None)
+@given(st.lists(_result, max_size=40))
+def test_resolver_matches_reference(f, items):
+    got = f._resolve_overlaps(TEXT, items)
+    want = _reference_resolve(f, TEXT, items)
+    assert [(r.entity_type, r.start, r.end, r.score) for r in got] == \
+           [(r.entity_type, r.start, r.end, r.score) for r in want]
+
+
+def test_fax_phone_special_case(f):
+    text = "Call +49 30 1234567 today"
+    phone = RecognizerResult("PHONE_NUMBER", 5, 19, 0.9)
+    fax = RecognizerResult("FAX_NUMBER", 5, 19, 1.0)
+    assert [r.entity_type for r in f._resolve_overlaps(text, [fax, phone])] == ["PHONE_NUMBER"]
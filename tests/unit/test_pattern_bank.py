@@ -0,0 +1,37 @@
+import re
+
+import pytest
+from pii_filter.pii_filter import PIIFilter
+from tests.conftest import has_tag
+
+
+@pytest.fixture(scope="module")
+def f():
+    return PIIFilter()
+
+
+def test_instances_share_compiled_patterns(f):
+    g = PIIFilter()
+    assert g.STRICT_ADDRESS_RX is f.STRICT_ADDRESS_RX
+    assert g.TOKEN_RXS is f.TOKEN_RXS
+    assert g.NON_PERSON_SINGLE_TOKENS is f.NON_PERSON_SINGLE_TOKENS
+
+
+def test_bank_is_read_only():
+    bank = PIIFilter.shared_pattern_bank()
+    with pytest.raises(TypeError):
+        bank["STRICT_ADDRESS_RX"] = None
+    assert isinstance(bank["STREET_BLOCKERS"], frozenset)
+    assert isinstance(bank["INTRO_PATTERNS"], tuple)
+
+
+def test_pattern_overrides_are_per_instance(f):
+    no_email = PIIFilter(pattern_overrides={"EMAIL_RX": re.compile(r"(?!x)x")})
+    assert no_email.EMAIL_RX is not f.EMAIL_RX
+    assert PIIFilter.shared_pattern_bank()["EMAIL_RX"] is f.EMAIL_RX
+    assert has_tag(f.anonymize_text("Contact: test@example.com"), "EMAIL_ADDRESS")
+
+
+def test_unknown_pattern_override_rejected():
+    with pytest.raises(ValueError):
+        PIIFilter(pattern_overrides={"NO_SUCH_RX": re.compile("x")})
@@ -0,0 +1,75 @@
+import re
+
+import pytest
+from pii_filter.pii_filter import PIIFilter, PatternProfiler
+
+TEXTS = [
+    "Mein Name ist Max Mustermann. Ich wohne in der Musterstraße 5, 10115 Berlin. Mail: max@example.de",
+    "IBAN: DE89 3704 0044 0532 0130 00, Steuer-ID: 12 345 678 901",
+    "Passport: K12345678, IP 192.168.1.10 and 2001:0db8:85a3::8a2e:0370:7334, born 12/31/1990",
+]
+
+
+@pytest.fixture(scope="module")
+def f():
+    return PIIFilter(nlp_engine="pattern")
+
+
+@pytest.fixture(scope="module")
+def profiler():
+    return PatternProfiler(nlp_engine="pattern")
+
+
+def test_profiled_filter_gives_identical_output(f, profiler):
+    for text in TEXTS:
+        assert profiler.anonymize_text(text) == f.anonymize_text(text)
+        assert [(r.entity_type, r.start, r.end) for r in profiler.analyze_text(text)] == \
+               [(r.entity_type, r.start, r.end) for r in f.analyze_text(text)]
+
+
+def test_rows_cover_nested_patterns_and_recognizers(profiler):
+    names = set(profiler.rows)
+    assert {"STRICT_ADDRESS_RX", "IBAN_RX", "IP_RXS[0]", "IP_RXS[1]", "POSTAL_EU_RXS[GB]"} <= names
+    assert any(n.startswith("ID_RXS[") for n in names)
+    assert any(n.startswith("POSTAL_CODE_RXS_BY_LEN[5]") for n in names)
+    assert any(n.startswith("recognizer:EmailRecognizer") for n in names)
+
+
+def test_full_text_scans_get_rows(profiler):
+    profiler.reset()
+    profiler.analyze_text("Customer Name: John Smith, slack_token: xoxb123456789012, card 4111 1111 1111 1111\n"
+                          "Straße: Hauptstraße\nNr.: 5\nStadt: Berlin")
+    for name in ("SLACK_TOKEN_LABEL_RX", "ADDRESS_BLOCK_RX", "CUSTOMER_NAME_LABEL_RX", "CC_CANDIDATE_RX"):
+        assert profiler.rows[name]["survived"] >= 1, name
+    # literal-gated like the other label patterns: no "cloudflare"/"key" in the text
+    for name in ("CLOUDFLARE_TOKEN_LABEL_RX", "STRIPE_KEY_LABEL_RX", "PROVIDER_API_KEY_LABEL_RX"):
+        assert profiler.rows[name]["calls"] == 0, name
+
+
+def test_counts_matches_and_survivors(profiler):
+    profiler.reset()
+    profiler.analyze_text(TEXTS[1])
+    iban = profiler.rows["IBAN_RX"]
+    assert iban["calls"] >= 1 and iban["seconds"] > 0
+    assert iban["matches"] >= 1 and 1 <= iban["survived"] <= iban["matches"]
+    # a pattern that ran but found nothing
+    assert profiler.rows["US_PASSPORT_RX"]["calls"] >= 1 and profiler.rows["US_PASSPORT_RX"]["survived"] == 0
+    assert all(r["survived"] <= r["matches"] for r in profiler.rows.values())
+
+
+def test_report_sorted_and_reset(profiler):
+    profiler.analyze_text(TEXTS[0])
+    lines = profiler.report().splitlines()
+    assert lines[0].split() == ["pattern", "calls", "ms", "matches", "survived"]
+    ms = [float(line.split()[-3]) for line in lines[1:]]
+    assert ms == sorted(ms, reverse=True) and len(ms) == sum(1 for r in profiler.rows.values() if r["calls"])
+    assert len(profiler.report(top=5).splitlines()) == 6
+    profiler.reset()
+    assert profiler.report().splitlines()[1:] == []
+
+
+def test_shared_bank_is_not_wrapped(profiler):
+    bank = PIIFilter.shared_pattern_bank()
+    assert isinstance(bank["IBAN_RX"], re.Pattern)
+    assert all(isinstance(rx, re.Pattern) for rx, _name in bank["ID_RXS"])
+    assert not isinstance(profiler.filter.IBAN_RX, re.Pattern)
@@ -0,0 +1,90 @@
+import re
+import pytest
+from hypothesis import given, settings, strategies as st
+from pii_filter.pii_filter import PIIFilter, PatternUnion
+
+TEXTS = [
+    "SSN: 123-45-6789, ITIN 912-70-1234, EIN 12-3456789, Steuer-ID: 12345678901",
+    "My driver's license is D1234567 and my voter ID: V123456; residence permit AB123456",
+    "Benefit card B12345678, military ID M1234567, Personalausweisnummer: T22000129",
+    "MRN: 12345678, insurance ID: INS-998877, diagnosed with diabetes; student ID S1234567, employee ID E-12345",
+    "Thanks! We will get back to you within 24 hours.",
+]
+# Members that overlap, share starts, nest, mix flags and need the fallback (named group, backreference)
+SYNTHETIC = {
+    "ab": re.compile(r"ab"),
+    "b_run": re.compile(r"(?i)b+c?"),
+    "a_word": re.compile(r"a\w*"),
+    "verbose": re.compile(r"(?x) c \d  # comment"),
+    "bounded": re.compile(r"\bba(\d)?"),
+    "named": re.compile(r"(?P<n>c)a"),
+    "backref": re.compile(r"(a)\1"),
+}
+
+
+@pytest.fixture(scope="module")
+def f():
+    return PIIFilter(nlp_engine="pattern")
+
+
+def _matches(found):
+    return {name: [(m.span(), m.groups()) for m in ms] for name, ms in found.items()}
+
+
+def _per_pattern(members, text, names=None):
+    return {name: list(members[name].finditer(text)) for name in (members if names is None else names)}
+
+
+def test_families_merge_into_one_alternation(f):
+    union = f.family_unions["LABELED_ID_FAMILIES"]
+    names = tuple(union.members)
+    combined, order = union._compile(names)
+    assert combined.search("ssn: 123-45-6789").lastgroup == "SSN_LABEL_RX"
+    assert list(order) == [name for name, _, _ in f.LABELED_ID_FAMILIES]
+    assert not {name for u in f.family_unions.values() for name, src in u._sources.items() if src is None}
+
+
+@pytest.mark.parametrize("table", PIIFilter.FAMILY_TABLES)
+def test_union_scan_equals_per_pattern_scans(f, table):
+    union = f.family_unions[table]
+    for text in TEXTS + ["\n".join(TEXTS)]:
+        assert _matches(union.scan(text)) == _matches(_per_pattern(union.members, text))
+        some = list(union.members)[1::2]
+        assert _matches(union.scan(text, some)) == _matches(_per_pattern(union.members, text, some))
+
+
+_fragments = st.lists(st.sampled_from(["ssn", "SSN:", "itin ", "ein ", "my ", "driver license ", "voter id ",
+                                       "Benefit card ", "B", "M", "MRN: ", "student id ", "123-45-6789",
+                                       "12-3456789", "1234567", "12345678", " ", ":", "\n", "AB", "x"]),
+                      max_size=16).map("".join)
+
+
+@settings(max_examples=200, deadline=None)
+@given(_fragments)
+def test_union_scan_equals_per_pattern_scans_generated(f, text):
+    for union in f.family_unions.values():
+        assert _matches(union.scan(text)) == _matches(_per_pattern(union.members, text))
+
+
+@settings(max_examples=300, deadline=None)
+@given(st.lists(st.sampled_from(list("abcAB1 ")), max_size=24).map("".join), st.sets(st.sampled_from(list(SYNTHETIC))))
+def test_emulates_finditer_for_overlapping_members(text, names):
+    union = PatternUnion(SYNTHETIC)
+    names = [name for name in SYNTHETIC if name in names]
+    assert _matches(union.scan(text, names)) == _matches(_per_pattern(SYNTHETIC, text, names))
+
+
+def test_unmergeable_members_fall_back():
+    union = PatternUnion(SYNTHETIC)
+    assert union._sources["named"] is None and union._sources["backref"] is None
+    assert union._sources["verbose"] is not None
+    assert PatternUnion({"empty": re.compile(r"a*"), "x": re.compile("x")})._sources["empty"] is None
+
+
+def test_analysis_unchanged_without_merging(f):
+    per_pattern = PIIFilter(nlp_engine="pattern")
+    for union in per_pattern.family_unions.values():
+        union._sources = dict.fromkeys(union._sources)
+    for text in TEXTS:
+        assert [(r.entity_type, r.start, r.end, r.score) for r in f.analyze_text(text)] == \
+               [(r.entity_type, r.start, r.end, r.score) for r in per_pattern.analyze_text(text)]
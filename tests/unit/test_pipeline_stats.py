@@ -0,0 +1,47 @@
+import pytest
+from pii_filter.pii_filter import PIIFilter, PipelineStats
+
+TEXT = "Mein Name ist Max Mustermann. Ich wohne in der Musterstraße 5, 10115 Berlin. Mail: max@example.de"
+
+
+@pytest.fixture(scope="module")
+def f():
+    return PIIFilter(nlp_engine="pattern")
+
+
+def test_stages_chain_and_output_unchanged(f):
+    stats = PipelineStats()
+    assert f.anonymize_text(TEXT, stats=stats) == f.anonymize_text(TEXT)
+    rows = list(stats.stages.items())
+    names = [stage for (_lang, stage), _ in rows]
+    assert names[:3] == ["normalize_route_language", "analyze", "person_cleanup"]
+    assert names[-2:] == ["merge_address_location", "render"]
+    assert "inject_custom_matches" in names and "address_guards" in names
+    # each stage consumes what the previous one produced
+    for (_, prev), (_, cur) in zip(rows[1:-1], rows[2:-1]):
+        assert cur["spans_in"] == prev["spans_out"]
+        assert cur["spans_out"] == cur["spans_in"] - cur["dropped"] + cur["added"]
+    assert all(lang == "en" for (lang, _stage) in stats.stages)
+    assert rows[-1][1]["spans_in"] == len(f.analyze_text(TEXT))
+
+
+def test_accumulates_and_reports(f):
+    stats = PipelineStats()
+    for _ in range(3):
+        f.analyze_text(TEXT, stats=stats)
+    assert {r["calls"] for r in stats.stages.values()} == {3}
+    assert "render" not in {stage for _lang, stage in stats.stages}
+    assert "inject_custom_matches" in stats.report()
+    stats.reset()
+    assert stats.stages == {}
+
+
+def test_record_can_be_overridden_as_hook(f):
+    seen = []
+
+    class Hook(PipelineStats):
+        def record(self, stage, seconds, *counts, language=None):
+            seen.append(stage)
+
+    f.anonymize_text(TEXT, stats=Hook())
+    assert seen[0] == "normalize_route_language" and seen[-1] == "render"
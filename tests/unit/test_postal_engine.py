@@ -0,0 +1,53 @@
+import re
+
+import pytest
+from hypothesis import given, settings, strategies as st
+from pii_filter.pii_filter import PIIFilter
+
+
+@pytest.fixture(scope="module")
+def f():
+    return PIIFilter(nlp_engine="pattern")
+
+
+def _naive_scan(f, text):
+    # Reference: the original one-finditer-per-pattern loop
+    spans = {}
+    for (country, _prefixes, _code), patt in zip(f.POSTAL_EU_FORMATS, f.POSTAL_EU_PATTERNS):
+        for m in re.finditer(patt, text, flags=re.I | re.UNICODE):
+            spans.setdefault(m.span(), []).append(country)
+    return spans
+
+
+@pytest.mark.parametrize("text", [
+    "Hauptstraße 5, 10115 Berlin",
+    "D-10115 Berlin, A-1010 Wien, CH-8001 Zürich",
+    "nl 1234 AB Amsterdam; 1234AB Utrecht",
+    "MD-2001 Chișinău / md 2001 Chișinău",
+    "SE 123 45 Stockholm, 00-950 Warszawa, 1000-001 Lisboa",
+    "SW1A 1AA London, D02 X285 Dublin, GX11 1AA Gibraltar, AD500, VLT 1117",
+    "Rechnung 2023-11-05, Betrag 1234,50 EUR, Tel +49 30 1234567",
+    "ſe 123 45 Stockholm, K-1010 Wien, Ü 10115 Berlin",
+])
+def test_postal_scan_matches_per_pattern_loop(f, text):
+    assert list(f._scan_postal_codes(text).items()) == list(_naive_scan(f, text).items())
+
+
+_postal_text = st.lists(
+    st.sampled_from(["D", "DE", "md", "MD-", "SE", "nl", "A", "x", "ſ", " ", "  ", "-", "–", "\n", ",",
+                     "1", "12", "123", "1234", "10115", "980", "4789", "00120", "AB", "1AA",
+                     "Berlin", "Saint-Denis", "São Paulo", "(Mitte)", "straße"]),
+    max_size=24,
+).map("".join)
+
+
+@settings(max_examples=300, deadline=None)
+@given(_postal_text)
+def test_postal_scan_differential(f, text):
+    assert list(f._scan_postal_codes(text).items()) == list(_naive_scan(f, text).items())
+
+
+def test_postal_location_records_country_rules(f):
+    results = f._inject_custom_matches("Adresse: 75001 Paris", [])
+    loc = [r for r in results if r.entity_type == "LOCATION"]
+    assert loc and "FR" in loc[0].recognition_metadata["postal_countries"]
@@ -0,0 +1,71 @@
+import re
+
+import pytest
+from hypothesis import given, settings, strategies as st
+from pii_filter.pii_filter import PIIFilter
+
+TEXTS = [
+    "Mein Name ist Max Mustermann. Ich wohne in der Musterstraße 5 (Mitte), 10115 Berlin.",
+    "IBAN: DE89 3704 0044 0532 0130 00, Steuer-ID: 12 345 678 901, max@example.de",
+    "Passport: K12345678, IP 192.168.1.10, born 12/31/1990, call +44 7700 900123",
+]
+# Unclosed "(" after an address: the old PAREN_DISTRICT backtracked exponentially in the run length
+UNCLOSED_PAREN = "Hauptstraße 5 (A" + "- " * 40
+# Long hyphenated junk: the slowest input for the compound-suffix address branch (well over 0.05s)
+HYPHEN_RUN = "-".join(["Abc"] * 3000)
+
+
+@pytest.fixture(scope="module")
+def f():
+    return PIIFilter(nlp_engine="pattern")
+
+
+@pytest.fixture(scope="module")
+def f_regex():
+    return PIIFilter(nlp_engine="pattern", regex_engine="regex")
+
+
+def test_regex_engine_gives_identical_output(f, f_regex):
+    for text in TEXTS + [UNCLOSED_PAREN]:
+        assert f_regex.anonymize_text(text) == f.anonymize_text(text)
+    assert not f_regex.pattern_timeouts
+
+
+def test_bank_patterns_are_budgeted(f_regex):
+    assert type(f_regex.STRICT_ADDRESS_RX).__name__ == "_BudgetedPattern"
+    assert type(f_regex.ID_RXS[0][0]).__name__ == "_BudgetedPattern"
+    assert f_regex.pattern_timeout == PIIFilter.PATTERN_TIMEOUT_DEFAULT
+    # the shared (re) bank is untouched
+    assert isinstance(PIIFilter.shared_pattern_bank()["STRICT_ADDRESS_RX"], re.Pattern)
+
+
+def test_overrun_is_reported_and_degrades(caplog):
+    pf = PIIFilter(nlp_engine="pattern", regex_engine="regex", pattern_timeout=0.05)
+    out = pf.anonymize_text("Mail max@example.de. " + HYPHEN_RUN)
+    assert out.startswith("Mail <EMAIL_ADDRESS>.")
+    assert pf.pattern_timeouts["STRICT_ADDRESS_RX"] >= 1
+    # Visible although PIIFilter lowers the root logger to ERROR
+    assert any("STRICT_ADDRESS_RX" in r.getMessage() for r in caplog.records if r.levelname == "ERROR")
+
+
+def test_engine_arguments_validated():
+    with pytest.raises(ValueError):
+        PIIFilter(nlp_engine="pattern", regex_engine="pcre")
+    with pytest.raises(ValueError):
+        PIIFilter(nlp_engine="pattern", pattern_timeout=1.0)
+
+
+OLD_PAREN_DISTRICT = (
+    r"(?:\s*\(\s*(?:[A-Z0-9ÄÖÜ][\wÀ-ÖØ-öø-ÿÄÖÜäöüß'’\.-]*"
+    r"(?:[-\s][\wÀ-ÖØ-öø-ÿÄÖÜäöüß'’\.-]*)*)\s*\))?"
+)
+
+
+@settings(max_examples=300, deadline=None)
+@given(st.sampled_from(["Hauptstraße 5", "Main Street 12", "Am Ring 3", ""]),
+       st.lists(st.sampled_from(list("Ab1 -().,'\n\tÄ") + [" (Mitte)", "Top 3", "/2", ")"]), max_size=10))
+def test_possessive_paren_district_matches_like_the_original(f, street, parts):
+    text = street + " " + "".join(parts)
+    flags = re.I | re.UNICODE | re.VERBOSE
+    old = re.compile(f.STRICT_ADDRESS_REGEX.replace(f.PAREN_DISTRICT, OLD_PAREN_DISTRICT), flags)
+    assert [m.span() for m in f.STRICT_ADDRESS_RX.finditer(text)] == [m.span() for m in old.finditer(text)]
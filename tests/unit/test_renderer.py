@@ -0,0 +1,48 @@
+import hashlib
+import pytest
+from hypothesis import given, settings, strategies as st
+from presidio_analyzer import RecognizerResult
+from presidio_anonymizer import AnonymizerEngine
+from presidio_anonymizer.entities import OperatorConfig
+from pii_filter.pii_filter import PIIFilter
+
+
+@pytest.fixture(scope="module")
+def f():
+    return PIIFilter(nlp_engine="pattern")
+
+
+_ENGINE = AnonymizerEngine()
+_text = st.text(alphabet="ab \n", min_size=1, max_size=40)
+
+
+@st.composite
+def _text_and_spans(draw):
+    text = draw(_text)
+    n = len(text)
+    spans = draw(st.lists(st.tuples(
+        st.sampled_from(("PERSON", "ADDRESS", "LOCATION", "CUSTOM_THING")),
+        st.integers(0, n), st.integers(0, 12), st.sampled_from((0.5, 0.9, 1.0)),
+    ), max_size=8))
+    return text, [RecognizerResult(t, s, min(n, s + k), sc) for t, s, k, sc in spans if min(n, s + k) > s]
+
+
+@settings(max_examples=400, deadline=None)
+@given(_text_and_spans())
+def test_replace_matches_presidio_anonymizer(f, case):
+    text, spans = case
+    operators = {ent: OperatorConfig("replace", {"new_value": tag}) for ent, tag in f.ENTITY_TAGS.items()}
+    expected = _ENGINE.anonymize(text=text, analyzer_results=spans, operators=operators).text
+    assert f._render(text, spans) == expected
+
+
+def test_modes(f):
+    text = "Call +49 30 1234567 or mail a@b.de now"
+    assert f.anonymize_text(text) == "Call <PHONE_NUMBER> or mail <EMAIL_ADDRESS> now"
+    assert f.anonymize_text(text, mode="mask") == "Call ************** or mail ****** now"
+    digest = hashlib.sha256("a@b.de".encode()).hexdigest()
+    assert f.anonymize_text(text, mode="hash").endswith(f"mail {digest} now")
+    kept = f.anonymize_text(text, mode="preserve_length")
+    assert len(kept) == len(text) and kept.startswith("Call <PHONE_NUMBER> or mail <EMAI> now")
+    with pytest.raises(ValueError):
+        f.anonymize_text(text, mode="encrypt")
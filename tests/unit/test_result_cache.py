@@ -0,0 +1,100 @@
+import hashlib
+import pytest
+import pii_filter.pii_filter as pf_mod
+from pii_filter.pii_filter import PIIFilter, ResultCache
+
+TEXTS = [
+    "Mein Name ist Max Mustermann. Ich wohne in der Musterstraße 5, 10115 Berlin. Mail: max@example.de",
+    "IBAN: DE89 3704 0044 0532 0130 00, api_key=sk-proj-abcdefghijklmnopqrstuvwxyz123456",
+    "Thanks for reaching out! We will get back to you within 24 hours.",
+]
+
+
+@pytest.fixture(scope="module")
+def f():
+    return PIIFilter(nlp_engine="pattern")
+
+
+@pytest.fixture
+def cached():
+    return PIIFilter(nlp_engine="pattern", result_cache_size=64, result_cache_ttl=300)
+
+
+def _spans(results):
+    return [(r.entity_type, r.start, r.end, r.score) for r in results]
+
+
+def test_cached_results_match_uncached(f, cached):
+    for _ in range(2):
+        for text in TEXTS:
+            assert cached.anonymize_text(text) == f.anonymize_text(text)
+            assert _spans(cached.analyze_text(text)) == _spans(f.analyze_text(text))
+    assert cached.result_cache.misses == len(TEXTS)
+    assert cached.result_cache.hits == 3 * len(TEXTS)
+
+
+def test_key_covers_configuration_and_nfc(cached):
+    text = TEXTS[0]
+    cached.analyze_text(text)
+    cached.analyze_text(text, guards_enabled=False)
+    cached.analyze_text(text, entities="contact")
+    cached.analyze_text(text, language="de")
+    assert cached.result_cache.misses == 4
+    # same subset as the "contact" profile, spelled out
+    cached.analyze_text(text, entities=["PHONE_NUMBER", "EMAIL_ADDRESS", "ADDRESS", "FAX_NUMBER", "LOCATION", "PERSON"])
+    cached.analyze_text("Ich heiße M\u0103d\u0103lina und wohne in Berlin.")
+    cached.analyze_text("Ich heiße Ma\u0306da\u0306lina und wohne in Berlin.")  # same text after NFC
+    assert cached.result_cache.hits == 2
+
+
+def test_cache_holds_no_raw_text(cached):
+    cached.anonymize_text(TEXTS[0])
+    dump = repr(list(cached.result_cache._entries.items()))
+    for fragment in ("Mustermann", "max@example.de", "10115"):
+        assert fragment not in dump
+
+
+def test_returned_results_do_not_alias_the_cache(cached):
+    first = cached.analyze_text(TEXTS[1])
+    first[0].entity_type = "PERSON"
+    assert cached.analyze_text(TEXTS[1])[0].entity_type != "PERSON"
+
+
+def test_lru_and_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(pf_mod.time, "monotonic", lambda: now[0])
+    cache = ResultCache(maxsize=2, ttl=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None and len(cache) == 2
+    now[0] += 10
+    assert cache.get("a") is None and cache.get("c") is None
+    assert len(cache) == 0 and not cache._expiry
+    cache.put("d", 4)
+    now[0] += 10
+    cache.purge()  # no get/put needed for expired entries to go
+    assert not cache._entries
+
+
+def test_fingerprints_are_keyed_per_cache():
+    a, b = ResultCache(), ResultCache()
+    data = "+49 30 12345678".encode("utf-8")
+    assert a.fingerprint(data) == a.fingerprint(data)
+    assert a.fingerprint(data) != b.fingerprint(data)
+    assert a.fingerprint(data) != hashlib.blake2b(data, digest_size=16).digest()
+
+
+def test_new_deny_tokens_invalidate(cached):
+    cached.analyze_text(TEXTS[0])
+    cached.add_non_name_tokens_after_ich_bin(["mustermann"])
+    assert len(cached.result_cache) == 0
+
+
+def test_arguments_validated():
+    with pytest.raises(ValueError):
+        PIIFilter(nlp_engine="pattern", result_cache_ttl=60)
+    with pytest.raises(ValueError):
+        PIIFilter(nlp_engine="pattern", result_cache_size=16, result_cache_ttl=0)
+    assert PIIFilter(nlp_engine="pattern").result_cache is None
@@ -0,0 +1,37 @@
+from hypothesis import given, settings, strategies as st
+from presidio_analyzer import RecognizerResult
+from pii_filter.pii_filter import _IndexedResults
+
+TYPES = ("ADDRESS", "EMAIL", "API_KEY", "LOCATION")
+
+_result = st.builds(
+    lambda t, s, n, sc: RecognizerResult(t, s, s + n, sc),
+    st.sampled_from(TYPES), st.integers(0, 60), st.integers(1, 15), st.sampled_from((0.5, 0.9)),
+)
+
+
+def _naive(items, s, e, types):
+    return [a for a in items if a.entity_type in types and not (e <= a.start or s >= a.end)]
+
+
+@settings(max_examples=200, deadline=None)
+@given(st.lists(_result, max_size=40), st.lists(st.integers(0, 39), max_size=10),
+       st.integers(0, 70), st.integers(1, 20), st.lists(st.sampled_from(TYPES), min_size=1, max_size=3))
+def test_index_matches_linear_scan(items, removals, s, n, types):
+    plain, idx = list(items), _IndexedResults(items)
+    for i in removals:
+        if i < len(plain):
+            victim = plain[i]
+            plain.remove(victim)
+            idx.remove(victim)
+    assert list(idx) == plain
+    e = s + n
+    assert [id(r) for r in idx.overlapping(s, e, types)] == [id(r) for r in _naive(plain, s, e, types)]
+    assert idx.overlaps(s, e, types) == bool(_naive(plain, s, e, types))
+
+
+def test_remove_drops_first_equal_element():
+    a, b = RecognizerResult("ADDRESS", 0, 5, 0.9), RecognizerResult("ADDRESS", 0, 5, 0.9)
+    idx = _IndexedResults([a, b])
+    idx.remove(RecognizerResult("ADDRESS", 0, 5, 0.9))
+    assert idx[0] is b and idx.overlapping(0, 5, ("ADDRESS",)) == [b]